@@ -0,0 +1,50 @@
+import argparse
+import logging
+import os
+
+from services import Instrumentation
+from weight_watcher import WorkQueue, QueueWorker, WeightWatcherResultService
+from weight_watcher.QueueWorker import DEFAULT_POLL_SECONDS
+from weight_watcher.WorkQueue import DEFAULT_LEASE_SECONDS
+
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze the models of a work queue that analyze.py --queue filled")
+    parser.add_argument("queue", help="work queue directory on the shared storage")
+    parser.add_argument("--results", default="results", help="base path of the results, shared with the coordinator")
+    parser.add_argument("--worker-id", help="name of this worker in the leases (default: <host>-<pid>)")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="must be the same for all workers and the coordinator")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="wait this long before looking for new models while other workers hold the rest")
+    parser.add_argument("--max-models", type=int, help="stop after this many models (default: when drained)")
+    parser.add_argument("--event-log",
+                        help="append a JSON line for every timed stage to this file. The ESD and power law fit are "
+                             "only timed per layer by the layer-parallel engine, weightwatcher's analyze is recorded "
+                             "as a whole per model")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+    Instrumentation.configure(arguments.event_log)
+
+    worker = QueueWorker(
+        WorkQueue(arguments.queue, arguments.lease_seconds),
+        WeightWatcherResultService(
+            arguments.results,
+            WeightWatcherResultService.detect_storage_format(arguments.results),
+            update_index=False
+        ),
+        worker_id=arguments.worker_id,
+        poll_seconds=arguments.poll_seconds
+    )
+    worker.run(arguments.max_models)
+
+
+if __name__ == '__main__':
+    main()
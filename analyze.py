@@ -0,0 +1,115 @@
+import argparse
+import logging
+import multiprocessing
+import os
+
+from models import ModelService, ModelRegistry
+from services import Instrumentation
+from weight_watcher import WeightWatcherService, WeightWatcherEngine, WeightsSource, WeightWatcherResultService, \
+    WeightWatcherResultManifest, AnalysisRunner, SpectrumPrecision, WorkQueue
+from weight_watcher.QueueWorker import run_local_worker
+from weight_watcher.SpectrumCache import DEFAULT_MAX_SIZE_BYTES
+from weight_watcher.WorkQueue import DEFAULT_LEASE_SECONDS
+
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze the models and write the results incrementally")
+    parser.add_argument("--results", default="results", help="base path of the results")
+    parser.add_argument("--architectures", nargs="*", choices=ModelRegistry.get_architecture_names(),
+                        help="only analyze these architectures (default: all)")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--engine", choices=[engine.name for engine in WeightWatcherEngine],
+                        default=WeightWatcherEngine.WEIGHTWATCHER.name)
+    parser.add_argument("--weights-source", choices=[weights_source.name for weights_source in WeightsSource],
+                        default=WeightsSource.KERAS_MODEL.name,
+                        help="read the kernels from the downloaded weights files instead of building the Keras models "
+                             "(layer-parallel engine)")
+    parser.add_argument("--approximate-min-rank", type=int,
+                        help="compute the spectra of layers with at least this many eigenvalues per matrix from their "
+                             "Gram matrices (layer-parallel engine)")
+    parser.add_argument("--precision", choices=[precision.name for precision in SpectrumPrecision],
+                        default=SpectrumPrecision.FLOAT64.name,
+                        help="compute the spectra in float32 and only recompute the layers in float64 whose float32 "
+                             "spectrum is not accurate enough (layer-parallel engine)")
+    parser.add_argument("--spectrum-cache",
+                        help="directory of the spectra shared by the models and runs, so layers with the same weights "
+                             "are computed only once (layer-parallel engine)")
+    parser.add_argument("--spectrum-cache-size", type=int, default=DEFAULT_MAX_SIZE_BYTES,
+                        help="the least recently used spectra are removed once the whole cache grows beyond this many "
+                             "bytes")
+    parser.add_argument("--stream", action="store_true",
+                        help="write every layer to <results>/partial as soon as it is analyzed (layer-parallel engine)")
+    parser.add_argument("--event-log",
+                        help="append a JSON line for every timed stage to this file. The ESD and power law fit are "
+                             "only timed per layer by the layer-parallel engine, weightwatcher's analyze is recorded "
+                             "as a whole per model")
+    parser.add_argument("--profile-dir", help="write a cProfile dump of every analyzed model to this directory")
+    parser.add_argument("--force", action="store_true", help="analyze models even if their results are up to date")
+    parser.add_argument("--queue", help="distributed mode: put the models into this work queue directory on shared "
+                                        "storage and wait for the workers (analysis_worker.py) to analyze them")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="number of worker processes to start on this node in distributed mode")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="claimed models whose worker showed no sign of life for this long are queued again")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+    Instrumentation.configure(arguments.event_log, arguments.profile_dir)
+
+    if arguments.architectures:
+        model_wrappers = []
+        for architecture_name in arguments.architectures:
+            architecture = ModelService.get_architecture_by_name(architecture_name)
+            model_wrappers += ModelService.get_all_of_architecture(architecture)
+    else:
+        model_wrappers = ModelService.get_all()
+
+    # Results that were migrated to Parquet stay in Parquet, which is the only format the dashboard reads from then on
+    storage_format = WeightWatcherResultService.detect_storage_format(arguments.results)
+    runner = AnalysisRunner(
+        WeightWatcherService(
+            engine=WeightWatcherEngine[arguments.engine],
+            partial_results_path=arguments.results if arguments.stream else None,
+            spectrum_cache_path=arguments.spectrum_cache,
+            spectrum_cache_size=arguments.spectrum_cache_size,
+            weights_source=WeightsSource[arguments.weights_source],
+            approximate_min_rank=arguments.approximate_min_rank,
+            precision=SpectrumPrecision[arguments.precision]
+        ),
+        WeightWatcherResultService(arguments.results, storage_format),
+        WeightWatcherResultManifest(os.path.join(arguments.results, "manifest.json"))
+    )
+    if arguments.queue is None:
+        runner.run(model_wrappers, processes=arguments.processes, force=arguments.force)
+        return
+
+    work_queue = WorkQueue(arguments.queue, arguments.lease_seconds)
+    runner.enqueue(model_wrappers, work_queue, force=arguments.force)
+    # The local workers are started like the ones on other nodes, with the service options taken from the queue
+    workers = [
+        multiprocessing.get_context("spawn").Process(
+            target=run_local_worker,
+            args=(arguments.queue, arguments.results, storage_format, arguments.lease_seconds),
+            kwargs={"log_level": arguments.log_level}
+        )
+        for _ in range(arguments.local_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    # Without local workers the coordinator waits for the ones on other nodes until the queue is drained
+    should_stop = None
+    if workers:
+        should_stop = lambda: not any(worker.is_alive() for worker in workers)
+    runner.collect(work_queue, should_stop=should_stop)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import logging
+import os
+
+from models import CheckpointSeries
+from services import Instrumentation
+from weight_watcher import CheckpointAnalysisService, CheckpointResultService
+
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze the checkpoints of a training run as a time series")
+    parser.add_argument("checkpoints", help="directory with the Keras checkpoints, the step is the last number in "
+                                            "their names")
+    parser.add_argument("--name", help="name of the series in the results (default: name of the directory)")
+    parser.add_argument("--results", default="results", help="base path of the results")
+    parser.add_argument("--steps", nargs="*", type=int, help="only analyze these steps (default: all)")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--engine-threads", type=int, help="threads per worker process for the layers")
+    parser.add_argument("--spectrum-cache", default=os.path.join(".cache", "spectra"),
+                        help="directory of the spectra shared by the checkpoints, so unchanged layers are computed "
+                             "only once")
+    parser.add_argument("--approximate-min-rank", type=int,
+                        help="compute the spectra of layers with at least this many eigenvalues per matrix from their "
+                             "Gram matrices")
+    parser.add_argument("--event-log", help="append a JSON line for every timed stage to this file")
+    parser.add_argument("--force", action="store_true", help="analyze checkpoints even if they have results")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+    Instrumentation.configure(arguments.event_log)
+
+    series_name = arguments.name or os.path.basename(os.path.normpath(arguments.checkpoints))
+    checkpoints = CheckpointSeries(series_name, arguments.checkpoints).get_checkpoints(arguments.steps)
+    result_service = CheckpointResultService(arguments.results)
+    if not arguments.force:
+        analyzed_steps = set(result_service.get_steps(series_name))
+        checkpoints = [checkpoint for checkpoint in checkpoints if checkpoint.step not in analyzed_steps]
+    logging.log(logging.INFO, f"Analyzing {len(checkpoints)} checkpoints of {series_name}")
+
+    analysis_service = CheckpointAnalysisService(
+        spectrum_cache_path=arguments.spectrum_cache,
+        engine_threads=arguments.engine_threads,
+        approximate_min_rank=arguments.approximate_min_rank
+    )
+    for result in analysis_service.iterate_analyses(checkpoints, arguments.processes):
+        result_service.save(result)
+    logging.log(logging.INFO, f"Stage timings: {Instrumentation.format_report()}")
+
+
+if __name__ == '__main__':
+    main()
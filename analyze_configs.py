@@ -0,0 +1,72 @@
+import argparse
+import json
+import logging
+import os
+
+from models import ModelService, ModelRegistry
+from services import Instrumentation
+from weight_watcher import WeightWatcherService, WeightWatcherEngine, WeightsSource, WeightWatcherResultService, \
+    AnalysisConfig, ConfigAnalysisRunner
+from weight_watcher.SpectrumCache import DEFAULT_MAX_SIZE_BYTES
+
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Analyze the models with several engine configs from one extraction "
+                                                 "of their layers")
+    parser.add_argument("configs", help="JSON file with a list of configs, e.g. [{\"name\": \"default\"}, "
+                                        "{\"name\": \"random\", \"randomize\": true}, "
+                                        "{\"name\": \"large\", \"min_evals\": 500, \"precision\": \"FLOAT32\"}]")
+    parser.add_argument("--results", default="results",
+                        help="base path of the results, each config is stored under <results>/configs/<name>")
+    parser.add_argument("--architectures", nargs="*", choices=ModelRegistry.get_architecture_names(),
+                        help="only analyze these architectures (default: all)")
+    parser.add_argument("--weights-source", choices=[weights_source.name for weights_source in WeightsSource],
+                        default=WeightsSource.KERAS_MODEL.name,
+                        help="read the kernels from the downloaded weights files instead of building the Keras models")
+    parser.add_argument("--engine-threads", type=int,
+                        help="threads for the layers, split between the configs (default: one per CPU)")
+    parser.add_argument("--spectrum-cache", help="directory of the spectra shared by the configs and runs")
+    parser.add_argument("--spectrum-cache-size", type=int, default=DEFAULT_MAX_SIZE_BYTES,
+                        help="the least recently used spectra are removed once the whole cache grows beyond this many "
+                             "bytes")
+    parser.add_argument("--event-log", help="append a JSON line for every timed stage to this file")
+    parser.add_argument("--force", action="store_true", help="analyze models even if the results of all configs are up to date")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+    Instrumentation.configure(arguments.event_log)
+
+    with open(arguments.configs) as configs_file:
+        configs = [AnalysisConfig.from_dict(raw_config) for raw_config in json.load(configs_file)]
+
+    if arguments.architectures:
+        model_wrappers = []
+        for architecture_name in arguments.architectures:
+            architecture = ModelService.get_architecture_by_name(architecture_name)
+            model_wrappers += ModelService.get_all_of_architecture(architecture)
+    else:
+        model_wrappers = ModelService.get_all()
+
+    weight_watcher_service = WeightWatcherService(
+        engine=WeightWatcherEngine.LAYER_PARALLEL,
+        engine_threads=arguments.engine_threads,
+        spectrum_cache_path=arguments.spectrum_cache,
+        spectrum_cache_size=arguments.spectrum_cache_size,
+        weights_source=WeightsSource[arguments.weights_source]
+    )
+    result_service = WeightWatcherResultService(
+        arguments.results,
+        WeightWatcherResultService.detect_storage_format(arguments.results)
+    )
+    ConfigAnalysisRunner(weight_watcher_service, result_service, configs).run(model_wrappers, force=arguments.force)
+    logging.log(logging.INFO, f"Stage timings: {Instrumentation.format_report()}")
+
+
+if __name__ == '__main__':
+    main()
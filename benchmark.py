@@ -0,0 +1,69 @@
+import argparse
+import json
+import logging
+import os
+import platform
+
+from benchmarks import PipelineBenchmark
+from benchmarks.PipelineBenchmark import DEFAULT_SCALES
+from models import ModelService, ModelRegistry
+from weight_watcher import WeightWatcherService, WeightWatcherEngine
+
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Time every stage of the pipeline offline and report them as JSON")
+    parser.add_argument("--results", default="results", help="base path of the stored results")
+    parser.add_argument("--architectures", nargs="*", choices=ModelRegistry.get_architecture_names(),
+                        help="only build and analyze these architectures (default: all)")
+    parser.add_argument("--engine", choices=[engine.name for engine in WeightWatcherEngine],
+                        default=WeightWatcherEngine.LAYER_PARALLEL.name)
+    parser.add_argument("--scales", nargs="*", type=int, default=DEFAULT_SCALES,
+                        help="sizes of the synthetic result trees relative to the stored one")
+    parser.add_argument("--skip-models", action="store_true", help="skip the model construction and analysis stages")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help="record the peak allocations of every stage (slows down the pure Python stages)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+
+    architectures = [ModelService.get_architecture_by_name(name) for name in arguments.architectures] \
+        if arguments.architectures else ModelService.get_architectures()
+    benchmark = PipelineBenchmark(arguments.trace_allocations)
+
+    if not arguments.skip_models:
+        model_wrappers = []
+        for architecture in architectures:
+            model_wrappers += ModelService.get_all_of_architecture(architecture, pretrained=False)
+        benchmark.run_model_construction(model_wrappers)
+        # Analyzing every variant would take hours, so only the smallest variant of each architecture is analyzed
+        smallest_model_wrappers = [
+            ModelService.get_all_of_architecture(architecture, pretrained=False)[0] for architecture in architectures
+        ]
+        benchmark.run_analysis(WeightWatcherService(engine=WeightWatcherEngine[arguments.engine]),
+                               smallest_model_wrappers)
+
+    results = benchmark.run_load_all(arguments.results, arguments.scales)
+    benchmark.run_plotting(results)
+    benchmark.run_dashboard(results)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "records": benchmark.records,
+    }
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(report, output_file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+
+if __name__ == '__main__':
+    main()
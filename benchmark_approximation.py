@@ -0,0 +1,62 @@
+import argparse
+import json
+import logging
+import os
+
+from benchmarks import ApproximationBenchmark
+from models import ModelService, ModelRegistry
+from weight_watcher import WeightWatcherResultService
+
+os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+DEFAULT_APPROXIMATE_MIN_RANK = 1024
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the approximate against the exact layer spectra")
+    parser.add_argument("--results", default="results", help="base path of the stored results to compare against")
+    parser.add_argument("--architectures", nargs="*", choices=ModelRegistry.get_architecture_names(),
+                        help="only benchmark these architectures (default: all)")
+    parser.add_argument("--approximate-min-rank", type=int, default=DEFAULT_APPROXIMATE_MIN_RANK)
+    parser.add_argument("--allow-model-build", action="store_true",
+                        help="build (and download) the Keras models whose weights files are missing")
+    parser.add_argument("--output", help="write the JSON records to this file instead of stdout")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+
+    if arguments.architectures:
+        model_wrappers = []
+        for architecture_name in arguments.architectures:
+            architecture = ModelService.get_architecture_by_name(architecture_name)
+            model_wrappers += ModelService.get_all_of_architecture(architecture)
+    else:
+        model_wrappers = ModelService.get_all()
+
+    result_service = WeightWatcherResultService(
+        arguments.results,
+        WeightWatcherResultService.detect_storage_format(arguments.results)
+    )
+    benchmark = ApproximationBenchmark(result_service, arguments.approximate_min_rank, arguments.allow_model_build)
+    records = benchmark.run(model_wrappers)
+
+    exact_seconds = sum(record["exact_seconds"] for record in records)
+    approximate_seconds = sum(record["approximate_seconds"] for record in records)
+    logging.log(
+        logging.INFO,
+        f"{len(records)} layers: {exact_seconds:.1f}s exact, {approximate_seconds:.1f}s approximate"
+    )
+
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(records, output_file, indent=4)
+    else:
+        print(json.dumps(records, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import logging
+import os.path
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Iterable, Optional
+
+from pandas import DataFrame
+
+from models import ModelWrapperBase
+from weight_watcher import LayerAnalysisEngine, LayerWeights, LayerWeightsExtractor, WeightWatcherResultService, \
+    WeightWatcherDetailsColumns
+
+COMPARED_COLUMNS = [
+    WeightWatcherDetailsColumns.ALPHA.value,
+    WeightWatcherDetailsColumns.LAMBDA_MAX.value,
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherDetailsColumns.LOG_NORM.value,
+    WeightWatcherDetailsColumns.STABLE_RANK.value,
+    WeightWatcherDetailsColumns.NUM_PL_SPIKES.value,
+    WeightWatcherDetailsColumns.ENTROPY.value,
+]
+
+
+@dataclass
+class ApproximationBenchmarkRecord:
+    model: str
+    layer_name: str
+    N: int
+    M: int
+    rf: int
+    exact_seconds: float
+    approximate_seconds: float
+    exact: Dict[str, float]
+    approximate: Dict[str, float]
+    stored_alpha: Optional[float]
+
+
+class ApproximationBenchmark:
+    # Times the exact and the approximate spectrum of every layer that the approximation applies to and records the
+    # metrics of both, together with the alpha stored in the results tree
+    def __init__(self, result_service: WeightWatcherResultService, approximate_min_rank: int,
+                 allow_model_build: bool = False):
+        self._result_service = result_service
+        self._exact_engine = LayerAnalysisEngine(max_workers=1)
+        self._approximate_engine = LayerAnalysisEngine(max_workers=1, approximate_min_rank=approximate_min_rank)
+        self._approximate_min_rank = approximate_min_rank
+        self._allow_model_build = allow_model_build
+
+    def run(self, model_wrappers: List[ModelWrapperBase]) -> List[Dict[str, Any]]:
+        records = []
+        for model_wrapper in model_wrappers:
+            stored_alphas = self._get_stored_alphas(model_wrapper)
+            # The model built by _get_layers is only released at the end of the lease
+            with model_wrapper.lease():
+                layers = self._get_layers(model_wrapper)
+                if layers is None:
+                    logging.warning(f"Skipping {model_wrapper.identification}, its weights have not been downloaded")
+                    continue
+                for layer in layers:
+                    if layer.M < self._approximate_min_rank:
+                        continue
+                    records.append(asdict(self._benchmark_layer(model_wrapper, layer, stored_alphas)))
+            logging.log(logging.INFO, f"Benchmarked {model_wrapper.identification}")
+        return records
+
+    def _benchmark_layer(self, model_wrapper: ModelWrapperBase, layer: LayerWeights,
+                         stored_alphas: Dict[str, float]) -> ApproximationBenchmarkRecord:
+        start = time.perf_counter()
+        exact = self._exact_engine.analyze_layers([layer])
+        exact_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        approximate = self._approximate_engine.analyze_layers([layer])
+        approximate_seconds = time.perf_counter() - start
+        return ApproximationBenchmarkRecord(
+            str(model_wrapper.identification),
+            layer.name,
+            layer.N,
+            layer.M,
+            layer.rf,
+            exact_seconds,
+            approximate_seconds,
+            self._get_compared_values(exact),
+            self._get_compared_values(approximate),
+            stored_alphas.get(layer.name)
+        )
+
+    def _get_layers(self, model_wrapper: ModelWrapperBase) -> Optional[Iterable[LayerWeights]]:
+        if os.path.isfile(model_wrapper.weights_path):
+            return LayerWeightsExtractor.from_weights_file(model_wrapper.weights_path)
+        if self._allow_model_build:
+            return LayerWeightsExtractor.from_keras_model(model_wrapper.model)
+        return None
+
+    def _get_stored_alphas(self, model_wrapper: ModelWrapperBase) -> Dict[str, float]:
+        if not self._result_service.exists(model_wrapper.identification):
+            return {}
+        details = self._result_service.load(model_wrapper.identification).details
+        return dict(zip(
+            details[WeightWatcherDetailsColumns.NAME.value],
+            details[WeightWatcherDetailsColumns.ALPHA.value]
+        ))
+
+    @staticmethod
+    def _get_compared_values(details: DataFrame) -> Dict[str, float]:
+        if len(details) == 0:
+            return {}
+        return {column: float(details[column].iloc[0]) for column in COMPARED_COLUMNS}
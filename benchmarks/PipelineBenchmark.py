@@ -0,0 +1,131 @@
+import logging
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from enum import Enum
+from typing import List, Dict, Any, Callable, Optional
+
+from .SyntheticResultTree import SyntheticResultTree
+from models import ModelWrapperBase
+from visualization import PlottingService, DashboardService
+from weight_watcher import WeightWatcherService, WeightWatcherResultService, WeightWatcherResult, MemoryUsage
+
+DEFAULT_SCALES = [1, 10, 100]
+
+
+class BenchmarkStage(Enum):
+    MODEL_CONSTRUCTION = "model_construction"
+    ANALYSIS = "analysis"
+    LOAD_ALL = "load_all"
+    PLOTTING = "plotting"
+    DASHBOARD = "dashboard"
+
+
+@dataclass
+class BenchmarkRecord:
+    stage: str
+    name: str
+    seconds: float
+    peak_rss_bytes: int
+    rss_delta_bytes: Optional[int]
+    # Peak of the Python and numpy allocations within the stage, only recorded when allocations are traced
+    traced_peak_bytes: Optional[int]
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+
+class PipelineBenchmark:
+    # Times every stage of the pipeline with randomly initialized models and the stored results, so it runs offline.
+    # Tracing allocations gives per-stage memory peaks, but slows down the pure Python stages noticeably.
+    def __init__(self, trace_allocations: bool = False):
+        self._trace_allocations = trace_allocations
+        self._records: List[BenchmarkRecord] = []
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return [asdict(record) for record in self._records]
+
+    def measure(self, stage: BenchmarkStage, name: str, function: Callable[[], Any], **parameters) -> Any:
+        rss_before = MemoryUsage.get_current_rss_bytes()
+        if self._trace_allocations:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            return_value = function()
+        finally:
+            seconds = time.perf_counter() - start
+            traced_peak_bytes = None
+            if self._trace_allocations:
+                traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            rss_after = MemoryUsage.get_current_rss_bytes()
+            self._records.append(BenchmarkRecord(
+                stage.value,
+                name,
+                seconds,
+                MemoryUsage.get_peak_rss_bytes(),
+                None if rss_before is None or rss_after is None else rss_after - rss_before,
+                traced_peak_bytes,
+                parameters
+            ))
+        logging.log(logging.INFO, f"{stage.value} [{name}]: {seconds:.3f}s, {MemoryUsage.format_report()}")
+        return return_value
+
+    def run_model_construction(self, model_wrappers: List[ModelWrapperBase]):
+        for model_wrapper in model_wrappers:
+            with model_wrapper.lease():
+                model = self.measure(
+                    BenchmarkStage.MODEL_CONSTRUCTION,
+                    str(model_wrapper.identification),
+                    lambda: model_wrapper.model
+                )
+                self._records[-1].parameters["parameters"] = int(model.count_params())
+
+    def run_analysis(self, weight_watcher_service: WeightWatcherService, model_wrappers: List[ModelWrapperBase]):
+        # The model is built before the measurement, so only the analysis itself is timed
+        for model_wrapper in model_wrappers:
+            with model_wrapper.lease():
+                model_wrapper.model
+                result: WeightWatcherResult = self.measure(
+                    BenchmarkStage.ANALYSIS,
+                    str(model_wrapper.identification),
+                    lambda: weight_watcher_service.analyze_model(model_wrapper),
+                    engine=weight_watcher_service.engine.name
+                )
+                self._records[-1].parameters["layers"] = len(result.details)
+
+    def run_load_all(self, results_base_path: str, scales: Optional[List[int]] = None) -> List[WeightWatcherResult]:
+        # Returns the results of the unscaled tree for the plotting and dashboard stages
+        source_service = WeightWatcherResultService(
+            results_base_path,
+            WeightWatcherResultService.detect_storage_format(results_base_path)
+        )
+        results = self.measure(BenchmarkStage.LOAD_ALL, "1x", source_service.load_all, scale=1)
+        self._records[-1].parameters["layers"] = sum(len(result.details) for result in results)
+
+        for scale in scales or DEFAULT_SCALES:
+            if scale == 1:
+                continue
+            with tempfile.TemporaryDirectory() as scaled_base_path:
+                num_layers = SyntheticResultTree.create(source_service, scaled_base_path, scale)
+                scaled_service = WeightWatcherResultService(scaled_base_path)
+                self.measure(BenchmarkStage.LOAD_ALL, f"{scale}x", scaled_service.load_all, scale=scale,
+                             layers=num_layers)
+        return results
+
+    def run_plotting(self, results: List[WeightWatcherResult]):
+        figure_specs = PlottingService.create_figure_specs(results)
+        self.measure(
+            BenchmarkStage.PLOTTING,
+            "all",
+            lambda: [figure_spec.factory() for figure_spec in figure_specs],
+            figures=len(figure_specs)
+        )
+
+    def run_dashboard(self, results: List[WeightWatcherResult]):
+        # The layout and the first figure, which is what is built before the dashboard is shown
+        dashboard_service = DashboardService()
+        figure_specs = PlottingService.create_figure_specs(results)
+        self.measure(BenchmarkStage.DASHBOARD, "layout", lambda: dashboard_service.build_dashboard(figure_specs),
+                     figures=len(figure_specs))
+        self.measure(BenchmarkStage.DASHBOARD, "first_figure", lambda: dashboard_service.get_figure_dict(0))
@@ -0,0 +1,57 @@
+import numpy
+import pandas
+
+from weight_watcher import WeightWatcherResultService, WeightWatcherResult, WeightWatcherDetailsColumns, \
+    ResultStorageFormat
+
+# Metrics that get a small multiplicative jitter, so repeated layers are not exact copies of each other
+JITTERED_DETAILS_COLUMNS = [
+    WeightWatcherDetailsColumns.ALPHA.value,
+    WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherDetailsColumns.LOG_NORM.value,
+    WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM.value,
+    WeightWatcherDetailsColumns.STABLE_RANK.value,
+]
+JITTER_SCALE = 0.01
+
+# Added again by the result service on load, so they are not written to the synthetic tree
+IDENTIFICATION_COLUMNS = [
+    "Unnamed: 0",
+    WeightWatcherDetailsColumns.ACCURACY.value,
+    WeightWatcherDetailsColumns.ARCHITECTURE.value,
+    WeightWatcherDetailsColumns.VARIANT.value,
+]
+
+
+class SyntheticResultTree:
+    # The set of models is fixed, so a larger tree repeats the layers of every stored model scale times instead
+    @staticmethod
+    def create(source_service: WeightWatcherResultService, target_base_path: str, scale: int,
+               storage_format: ResultStorageFormat = ResultStorageFormat.CSV, seed: int = 0) -> int:
+        rng = numpy.random.default_rng(seed)
+        target_service = WeightWatcherResultService(target_base_path, storage_format)
+        num_layers = 0
+        for result in source_service.load_all():
+            details = SyntheticResultTree.scale_details(result.details, scale, rng)
+            summary = result.summary.drop(columns=IDENTIFICATION_COLUMNS, errors="ignore")
+            target_service.save(WeightWatcherResult(result.model_identification, result.model_accuracy, summary,
+                                                    details))
+            num_layers += len(details)
+        return num_layers
+
+    @staticmethod
+    def scale_details(details: pandas.DataFrame, scale: int, rng: numpy.random.Generator) -> pandas.DataFrame:
+        details = details.drop(columns=IDENTIFICATION_COLUMNS, errors="ignore")
+        layer_id_column = WeightWatcherDetailsColumns.LAYER_ID.value
+        layer_id_offset = int(details[layer_id_column].max()) + 1 if len(details) > 0 else 0
+        repetitions = []
+        for repetition in range(scale):
+            repeated = details.copy()
+            repeated[layer_id_column] += repetition * layer_id_offset
+            if repetition > 0:
+                for column in JITTERED_DETAILS_COLUMNS:
+                    if column in repeated.columns:
+                        repeated[column] *= 1 + JITTER_SCALE * rng.standard_normal(len(repeated))
+            repetitions.append(repeated)
+        return pandas.concat(repetitions, ignore_index=True)
@@ -0,0 +1,3 @@
+from .ApproximationBenchmark import ApproximationBenchmark, ApproximationBenchmarkRecord
+from .PipelineBenchmark import PipelineBenchmark, BenchmarkStage, BenchmarkRecord
+from .SyntheticResultTree import SyntheticResultTree
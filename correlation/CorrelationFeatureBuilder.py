@@ -0,0 +1,81 @@
+from typing import List, Tuple, Optional
+
+import numpy
+import pandas
+from numpy import ndarray
+from pandas import DataFrame
+
+from weight_watcher import WeightWatcherResult, WeightWatcherDetailsColumns, WeightWatcherSummaryColumns, ResultIndex
+
+SUMMARY_FEATURE_COLUMNS = [
+    WeightWatcherSummaryColumns.LOG_NORM.value,
+    WeightWatcherSummaryColumns.ALPHA.value,
+    WeightWatcherSummaryColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherSummaryColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherSummaryColumns.LOG_SPECTRAL_NORM.value,
+    WeightWatcherSummaryColumns.STABLE_RANK.value,
+]
+
+DETAILS_FEATURE_COLUMNS = [
+    WeightWatcherDetailsColumns.ALPHA.value,
+    WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherDetailsColumns.LOG_NORM.value,
+    WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM.value,
+    WeightWatcherDetailsColumns.STABLE_RANK.value,
+    WeightWatcherDetailsColumns.ENTROPY.value,
+]
+
+POWER_LAW_FEATURE_COLUMNS = [
+    WeightWatcherDetailsColumns.ALPHA.value,
+    WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value,
+]
+
+DETAILS_FEATURE_AGGREGATIONS = ["mean", "median", "std", "min", "max"]
+
+MODEL_INDEX_COLUMN = "model_index"
+
+
+class CorrelationFeatureBuilder:
+    @staticmethod
+    def build(
+            results: List[WeightWatcherResult],
+            include_details: bool = False,
+            result_index: Optional[ResultIndex] = None
+    ) -> Tuple[DataFrame, ndarray, ndarray]:
+        # One row per result: the summary metrics, optionally followed by per-model aggregates of the layer metrics.
+        # Returns the features, the accuracies and the architecture names to group the cross-validation by.
+        summaries = pandas.concat([result.summary for result in results], ignore_index=True)
+        features = summaries[SUMMARY_FEATURE_COLUMNS].astype(numpy.float64)
+        if include_details:
+            features = features.join(CorrelationFeatureBuilder.get_details_features(results, result_index))
+
+        accuracies = numpy.array([result.model_accuracy for result in results], dtype=numpy.float64)
+        architectures = numpy.array([result.model_identification.architecture.name for result in results])
+        return features, accuracies, architectures
+
+    @staticmethod
+    def get_details_features(results: List[WeightWatcherResult],
+                             result_index: Optional[ResultIndex] = None) -> DataFrame:
+        # The index holds the same aggregates over all layers of every model, so no details have to be read as long
+        # as all results are indexed
+        model_identifications = [result.model_identification for result in results]
+        if result_index is not None and all(
+                model_identification in result_index for model_identification in model_identifications
+        ):
+            return result_index.get_model_aggregates(model_identifications, DETAILS_FEATURE_COLUMNS)
+
+        # All details are aggregated in one groupby instead of one pass per model
+        details = pandas.concat(
+            [result.details[DETAILS_FEATURE_COLUMNS] for result in results],
+            keys=range(len(results)),
+            names=[MODEL_INDEX_COLUMN]
+        ).astype(numpy.float64)
+        # weightwatcher marks layers without a power law fit with an alpha of -1, which also invalidates the metrics
+        # derived from alpha
+        failed_fits = details[WeightWatcherDetailsColumns.ALPHA.value] == -1
+        details.loc[failed_fits, POWER_LAW_FEATURE_COLUMNS] = numpy.nan
+        aggregates = details.groupby(level=MODEL_INDEX_COLUMN).agg(DETAILS_FEATURE_AGGREGATIONS)
+        aggregates.columns = [f"{column}_{aggregation}" for column, aggregation in aggregates.columns]
+        return aggregates.reindex(range(len(results)))
@@ -1,27 +1,202 @@
+import hashlib
 import logging
-from typing import List
+import os.path
+from enum import Enum, auto
+from typing import List, Dict, Optional, Tuple
 
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+import joblib
+import numpy
+import pandas
+from numpy import ndarray
+from pandas import DataFrame
+from scipy.stats import spearmanr, kendalltau
+from sklearn.base import clone, RegressorMixin
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import r2_score
+from sklearn.model_selection import LeaveOneGroupOut, KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
-from weight_watcher import WeightWatcherResult, WeightWatcherResultService
+from weight_watcher import WeightWatcherResult, ResultIndex
+from .CorrelationFeatureBuilder import CorrelationFeatureBuilder
+
+FALLBACK_FOLDS = 5
+
+
+class CorrelationRegressor(Enum):
+    LINEAR = auto()
+    RIDGE = auto()
+    RANDOM_FOREST = auto()
+    GRADIENT_BOOSTING = auto()
+
+
+# Missing features (e.g. layers without a power law fit) are imputed, so every regressor accepts the same matrix
+CorrelationRegressorFactories = {
+    CorrelationRegressor.LINEAR: lambda: make_pipeline(
+        SimpleImputer(strategy="median"), StandardScaler(), LinearRegression()
+    ),
+    CorrelationRegressor.RIDGE: lambda: make_pipeline(
+        SimpleImputer(strategy="median"), StandardScaler(), Ridge(alpha=1.0)
+    ),
+    CorrelationRegressor.RANDOM_FOREST: lambda: make_pipeline(
+        SimpleImputer(strategy="median"), RandomForestRegressor(n_estimators=100, max_depth=4, random_state=0)
+    ),
+    CorrelationRegressor.GRADIENT_BOOSTING: lambda: make_pipeline(
+        SimpleImputer(strategy="median"), GradientBoostingRegressor(max_depth=2, random_state=0)
+    ),
+}
 
 
 class CorrelationService:
+    def __init__(self, n_jobs: int = -1, cache_path: Optional[str] = None, result_index: Optional[ResultIndex] = None):
+        self._n_jobs = n_jobs
+        self._cache_path = cache_path
+        # Serves the aggregates of the layer metrics, instead of reading the details of every result
+        self._result_index = result_index
+        # Keyed by the hash of the feature matrix and the accuracies, so the same data is never refitted
+        self._cross_validations: Dict[str, DataFrame] = {}
+        self._fitted_regressors: Dict[str, RegressorMixin] = {}
+
     @staticmethod
-    def train_random_forest_on_summary_and_accuracy(analysis_results: List[WeightWatcherResult]):
-        logging.log(logging.INFO, f"Training random forest regressor...")
-        metrics = WeightWatcherResultService.extract_summary_metrics(analysis_results)
-        dataframe = pd.DataFrame.from_dict(metrics)
-        split_index = len(dataframe) // 2
-        train_x, test_x = dataframe[:split_index], dataframe[split_index:]
-        accuracies = [result.model_accuracy for result in analysis_results]
-        train_y, test_y = accuracies[:split_index], accuracies[split_index:]
+    def get_metric_correlations(results: List[WeightWatcherResult], include_details: bool = False,
+                                result_index: Optional[ResultIndex] = None) -> DataFrame:
+        # R² of a univariate linear fit, Spearman's rho and Kendall's tau of every metric against the accuracy
+        features, accuracies, _ = CorrelationFeatureBuilder.build(results, include_details, result_index)
+        rows = []
+        for metric in features.columns:
+            values = features[metric].to_numpy()
+            valid = numpy.isfinite(values)
+            if valid.sum() < 3 or numpy.ptp(values[valid]) == 0:
+                rows.append({"metric": metric, "r2": numpy.nan, "spearman": numpy.nan, "kendall": numpy.nan})
+                continue
+            rows.append({
+                "metric": metric,
+                "r2": numpy.corrcoef(values[valid], accuracies[valid])[0, 1] ** 2,
+                "spearman": spearmanr(values[valid], accuracies[valid]).correlation,
+                "kendall": kendalltau(values[valid], accuracies[valid]).correlation,
+            })
+        return DataFrame(rows).set_index("metric")
+
+    def cross_validate(
+            self,
+            results: List[WeightWatcherResult],
+            regressors: Optional[List[CorrelationRegressor]] = None,
+            include_details: bool = False
+    ) -> DataFrame:
+        # Leave-one-architecture-out cross-validation of every regressor, evaluated on the pooled out-of-fold
+        # predictions. All folds of all regressors and their final fits on the full data run in one parallel batch.
+        regressors = list(CorrelationRegressor) if regressors is None else regressors
+        features, accuracies, architectures = CorrelationFeatureBuilder.build(
+            results, include_details, self._result_index
+        )
+        data_key = self._get_data_key(features, accuracies, architectures)
+
+        missing_regressors = [
+            regressor for regressor in regressors
+            if self._get_cache_key(data_key, regressor) not in self._cross_validations
+        ]
+        if len(missing_regressors) > 0:
+            self._run_cross_validation(data_key, missing_regressors, features, accuracies, architectures)
+        return pandas.concat([
+            self._cross_validations[self._get_cache_key(data_key, regressor)] for regressor in regressors
+        ])
 
-        regressor = RandomForestRegressor(max_depth=2, random_state=0, max_features="auto")
-        regressor.fit(train_x, train_y)
-        coefficient_of_determination = regressor.score(test_x, test_y)
+    def get_fitted_regressor(
+            self,
+            results: List[WeightWatcherResult],
+            regressor: CorrelationRegressor,
+            include_details: bool = False
+    ) -> RegressorMixin:
+        features, accuracies, architectures = CorrelationFeatureBuilder.build(
+            results, include_details, self._result_index
+        )
+        cache_key = self._get_cache_key(self._get_data_key(features, accuracies, architectures), regressor)
+        if cache_key not in self._fitted_regressors:
+            cached_path = self._get_cached_regressor_path(cache_key)
+            if cached_path is not None and os.path.isfile(cached_path):
+                self._fitted_regressors[cache_key] = joblib.load(cached_path)
+            else:
+                self.cross_validate(results, [regressor], include_details)
+        return self._fitted_regressors[cache_key]
 
+    def train_random_forest_on_summary_and_accuracy(self, analysis_results: List[WeightWatcherResult]) -> float:
+        logging.log(logging.INFO, f"Training random forest regressor...")
+        scores = self.cross_validate(analysis_results, [CorrelationRegressor.RANDOM_FOREST])
+        coefficient_of_determination = scores["r2"].iloc[0]
         logging.log(logging.INFO, "Trained random forest regressor with coefficient of determination of "
                                   f"prediction: {coefficient_of_determination}")
+        return coefficient_of_determination
+
+    def _run_cross_validation(self, data_key: str, regressors: List[CorrelationRegressor], features: DataFrame,
+                              accuracies: ndarray, architectures: ndarray):
+        folds = self._get_folds(features, architectures)
+        all_indices = numpy.arange(len(features))
+        tasks = [
+            (regressor, train_indices, test_indices)
+            for regressor in regressors
+            for train_indices, test_indices in folds + [(all_indices, None)]
+        ]
+        logging.log(logging.INFO, f"Fitting {len(tasks)} regressors on {len(features)} models...")
+        fits = joblib.Parallel(n_jobs=self._n_jobs)(
+            joblib.delayed(self._fit_and_predict)(regressor, features, accuracies, train_indices, test_indices)
+            for regressor, train_indices, test_indices in tasks
+        )
+
+        predictions = {regressor: numpy.full(len(features), numpy.nan) for regressor in regressors}
+        for (regressor, _, test_indices), (fitted_regressor, fold_predictions) in zip(tasks, fits):
+            if test_indices is None:
+                cache_key = self._get_cache_key(data_key, regressor)
+                self._fitted_regressors[cache_key] = fitted_regressor
+                cached_path = self._get_cached_regressor_path(cache_key)
+                if cached_path is not None:
+                    os.makedirs(self._cache_path, exist_ok=True)
+                    joblib.dump(fitted_regressor, cached_path)
+            else:
+                predictions[regressor][test_indices] = fold_predictions
+
+        for regressor in regressors:
+            self._cross_validations[self._get_cache_key(data_key, regressor)] = DataFrame([{
+                "regressor": regressor.name,
+                "folds": len(folds),
+                "r2": r2_score(accuracies, predictions[regressor]),
+                "spearman": spearmanr(predictions[regressor], accuracies).correlation,
+                "kendall": kendalltau(predictions[regressor], accuracies).correlation,
+            }]).set_index("regressor")
+
+    @staticmethod
+    def _fit_and_predict(regressor: CorrelationRegressor, features: DataFrame, accuracies: ndarray,
+                         train_indices: ndarray, test_indices: Optional[ndarray]) -> Tuple[RegressorMixin, ndarray]:
+        fitted_regressor = clone(CorrelationRegressorFactories[regressor]())
+        fitted_regressor.fit(features.iloc[train_indices], accuracies[train_indices])
+        if test_indices is None:
+            return fitted_regressor, numpy.empty(0)
+        return fitted_regressor, fitted_regressor.predict(features.iloc[test_indices])
+
+    @staticmethod
+    def _get_folds(features: DataFrame, architectures: ndarray) -> List[Tuple[ndarray, ndarray]]:
+        if len(numpy.unique(architectures)) >= 2:
+            return list(LeaveOneGroupOut().split(features, groups=architectures))
+        # A single architecture (e.g. the checkpoints of one training run) cannot be split by architecture
+        logging.log(logging.WARNING, "Only one architecture in the results, falling back to shuffled k-fold")
+        folds = KFold(n_splits=min(FALLBACK_FOLDS, len(features)), shuffle=True, random_state=0)
+        return list(folds.split(features))
+
+    @staticmethod
+    def _get_data_key(features: DataFrame, accuracies: ndarray, architectures: ndarray) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(",".join(features.columns).encode())
+        digest.update(pandas.util.hash_pandas_object(features, index=False).to_numpy().tobytes())
+        digest.update(accuracies.tobytes())
+        digest.update(",".join(architectures).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _get_cache_key(data_key: str, regressor: CorrelationRegressor) -> str:
+        return f"{regressor.name}-{data_key}"
 
+    def _get_cached_regressor_path(self, cache_key: str) -> Optional[str]:
+        if self._cache_path is None:
+            return None
+        return os.path.join(self._cache_path, cache_key + ".joblib")
@@ -1 +1,2 @@
-from .CorrelationService import CorrelationService
+from .CorrelationService import CorrelationService, CorrelationRegressor
+from .CorrelationFeatureBuilder import CorrelationFeatureBuilder
@@ -1,27 +1,27 @@
-from weight_watcher import WeightWatcherResultService
+from weight_watcher import WeightWatcherResultService, CheckpointResultService
 from visualization import PlottingService, DashboardService
-from typing import List
-import plotly.graph_objects as go
 import os
 
 os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
 
 plotting_service = PlottingService()
 dashboard_service = DashboardService()
-analysis_result_repository = WeightWatcherResultService('results')
+analysis_result_repository = WeightWatcherResultService('results', WeightWatcherResultService.detect_storage_format('results'))
+checkpoint_result_repository = CheckpointResultService('results')
 
 
 def main():
-    results = analysis_result_repository.load_all()
+    results = analysis_result_repository.load_all_handles(include_partial=True)
+    result_index = analysis_result_repository.get_result_index()
 
-    plots: List[go.Figure] = []
-    plots += [plotting_service.create_summaries_figure(results, group_by_variant=False)]
-    plots += plotting_service.create_summaries_per_architecture_figures(results)
-    plots += [plotting_service.create_details_figure(results, group_by_architecture=True, group_by_variant=False)]
-    plots += plotting_service.create_details_per_architecture_figures(results)
-    plots += plotting_service.create_details_per_model_figures(results)
+    figure_specs = plotting_service.create_figure_specs(results, result_index)
+    if checkpoint_result_repository.get_series_names():
+        figure_specs += plotting_service.create_checkpoint_figure_specs(
+            checkpoint_result_repository.load_summaries(),
+            checkpoint_result_repository.load_details
+        )
 
-    dashboard_service.build_dashboard(plots)
+    dashboard_service.build_dashboard(figure_specs)
     dashboard_service.show_dashboard(True)
 
 
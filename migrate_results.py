@@ -0,0 +1,28 @@
+import argparse
+import logging
+
+from weight_watcher import WeightWatcherResultService, ResultStorageFormat
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Convert the per-variant CSV/JSON results into the Parquet datasets")
+    parser.add_argument("--results", default="results", help="base path of the results")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main():
+    arguments = parse_arguments()
+    logging.basicConfig(level=arguments.log_level)
+
+    csv_result_service = WeightWatcherResultService(arguments.results, ResultStorageFormat.CSV)
+    parquet_result_service = WeightWatcherResultService(arguments.results, ResultStorageFormat.PARQUET)
+    results = csv_result_service.load_all()
+    for result in results:
+        parquet_result_service.save(result)
+        logging.log(logging.INFO, f"Migrated {result.model_identification}")
+    logging.log(logging.INFO, f"Migrated {len(results)} results")
+
+
+if __name__ == '__main__':
+    main()
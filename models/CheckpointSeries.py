@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tensorflow as tf
+
+# The training step is the last number in the file name, e.g. "weights.00042.h5" or "ckpt-1200.keras"
+CHECKPOINT_STEP_PATTERN = re.compile(r"(\d+)\D*$")
+# Files (or SavedModel directories) that Keras' ModelCheckpoint writes
+CHECKPOINT_EXTENSIONS = (".h5", ".hdf5", ".keras", "")
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    series_name: str
+    step: int
+    path: str
+
+    def load_model(self) -> tf.keras.Model:
+        # Only needed for SavedModel and .keras checkpoints. Custom layers have to be registered with Keras beforehand.
+        import tensorflow as tf
+        return tf.keras.models.load_model(self.path, compile=False)
+
+    def __str__(self):
+        return f"{self.series_name}@{self.step}"
+
+
+class CheckpointSeries:
+    # The checkpoints one training run saved into a directory, ordered by their training step
+    def __init__(self, name: str, checkpoints_path: str):
+        self._name = name
+        self._checkpoints_path = checkpoints_path
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def checkpoints_path(self) -> str:
+        return self._checkpoints_path
+
+    def get_checkpoints(self, steps: Optional[List[int]] = None) -> List[Checkpoint]:
+        checkpoints = {}
+        for entry in os.scandir(self._checkpoints_path):
+            name, extension = os.path.splitext(entry.name)
+            if extension not in CHECKPOINT_EXTENSIONS or (extension == "" and not entry.is_dir()):
+                continue
+            match = CHECKPOINT_STEP_PATTERN.search(name)
+            if match is None:
+                continue
+            step = int(match.group(1))
+            if steps is not None and step not in steps:
+                continue
+            if step in checkpoints:
+                raise ValueError(f"'{checkpoints[step].path}' and '{entry.path}' are both checkpoints of step {step}")
+            checkpoints[step] = Checkpoint(self._name, step, entry.path)
+        return [checkpoints[step] for step in sorted(checkpoints)]
@@ -1,18 +1,22 @@
 from dataclasses import dataclass
-from enum import Enum, auto
 
 
-class ModelArchitecture(Enum):
-    ConvNeXt = auto()
-    EfficientNet = auto()
-    EfficientNetV2 = auto()
-    RegNetX = auto()
-    RegNetY = auto()
-    ResNetRS = auto()
+# Architectures and variants are identified by their names, which the model registry resolves. They are no enums, so
+# models can be added by plugins and at runtime.
+@dataclass(frozen=True)
+class ModelArchitecture:
+    name: str
+
+    def __str__(self):
+        return self.name
 
 
-class ModelVariant(Enum):
-    pass
+@dataclass(frozen=True)
+class ModelVariant:
+    name: str
+
+    def __str__(self):
+        return self.name
 
 
 @dataclass
@@ -0,0 +1,30 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .ModelIdentification import ModelIdentification
+from .ModelRegistry import ModelRegistry, ModelDefinition
+
+
+@dataclass
+class ModelMetadata:
+    identification: ModelIdentification
+    # NaN for models registered without an accuracy
+    top_1_accuracy: float
+    input_size: Optional[int] = None
+
+
+class ModelMetadataRegistry:
+    # Describes the known models without building them, so neither TensorFlow nor a model wrapper is needed
+    @staticmethod
+    def get(model_identification: ModelIdentification) -> ModelMetadata:
+        return ModelMetadataRegistry._create(ModelRegistry.get(model_identification))
+
+    @staticmethod
+    def get_all() -> List[ModelMetadata]:
+        return [ModelMetadataRegistry._create(definition) for definition in ModelRegistry.get_all()]
+
+    @staticmethod
+    def _create(definition: ModelDefinition) -> ModelMetadata:
+        top_1_accuracy = math.nan if definition.top_1_accuracy is None else definition.top_1_accuracy
+        return ModelMetadata(definition.identification, top_1_accuracy, input_size=definition.input_size)
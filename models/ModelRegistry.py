@@ -0,0 +1,135 @@
+import importlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Callable
+
+from .ModelIdentification import ModelArchitecture, ModelVariant, ModelIdentification
+
+# Packages register their models with an entry point in this group. The entry point refers to a list of
+# ModelDefinitions or to a function returning one, and is only loaded once the registry is first used.
+MODEL_ENTRY_POINT_GROUP = "weightwatcher_analysis.models"
+
+# Constructor names without a module are looked up in tf.keras.applications
+KERAS_APPLICATIONS_MODULE = "tensorflow.keras.applications"
+
+
+@dataclass
+class ModelDefinition:
+    architecture: str
+    variant: str
+    # "<module>:<attribute>" or the name of a tf.keras.applications constructor, which is only imported on build
+    constructor: Optional[str] = None
+    top_1_accuracy: Optional[float] = None
+    input_size: Optional[int] = None
+    # Name of the weights file Keras downloads into ~/.keras/models
+    weights_file_name: Optional[str] = None
+    # Passed to the constructor besides include_top=False and the weights
+    constructor_arguments: Dict[str, Any] = field(default_factory=dict)
+    # Models loaded from a SavedModel directory or a .h5/.keras file instead of being constructed
+    saved_model_path: Optional[str] = None
+
+    @property
+    def identification(self) -> ModelIdentification:
+        return ModelIdentification(ModelArchitecture(self.architecture), ModelVariant(self.variant))
+
+    def get_constructor(self) -> Callable:
+        module_name, _, attribute_name = self.constructor.rpartition(":")
+        return getattr(importlib.import_module(module_name or KERAS_APPLICATIONS_MODULE), attribute_name)
+
+
+class ModelRegistry:
+    # Process-wide table of the known models: the built-in ones, those of installed plugins and the ones registered at
+    # runtime. Nothing of a model is imported before it is built.
+    _lock = threading.RLock()
+    _definitions: Dict[str, ModelDefinition] = {}
+    _runtime_definitions: List[ModelDefinition] = []
+    _loaded = False
+
+    @staticmethod
+    def register(definition: ModelDefinition, replace: bool = False) -> ModelIdentification:
+        with ModelRegistry._lock:
+            ModelRegistry._load()
+            ModelRegistry._add(definition, replace)
+            ModelRegistry._runtime_definitions.append(definition)
+        return definition.identification
+
+    @staticmethod
+    def register_keras_application(architecture: str, variant: str, constructor: str,
+                                   top_1_accuracy: Optional[float] = None, input_size: Optional[int] = None,
+                                   weights_file_name: Optional[str] = None,
+                                   **constructor_arguments) -> ModelIdentification:
+        return ModelRegistry.register(ModelDefinition(
+            architecture, variant, constructor, top_1_accuracy, input_size, weights_file_name, constructor_arguments
+        ))
+
+    @staticmethod
+    def register_saved_model(architecture: str, variant: str, saved_model_path: str,
+                             top_1_accuracy: Optional[float] = None,
+                             input_size: Optional[int] = None) -> ModelIdentification:
+        return ModelRegistry.register(ModelDefinition(
+            architecture, variant, top_1_accuracy=top_1_accuracy, input_size=input_size,
+            saved_model_path=saved_model_path
+        ))
+
+    @staticmethod
+    def get(model_identification: ModelIdentification) -> ModelDefinition:
+        with ModelRegistry._lock:
+            ModelRegistry._load()
+            try:
+                return ModelRegistry._definitions[str(model_identification)]
+            except KeyError:
+                raise TypeError(f"'{model_identification}' is not a registered model")
+
+    @staticmethod
+    def get_all(architecture_name: Optional[str] = None) -> List[ModelDefinition]:
+        with ModelRegistry._lock:
+            ModelRegistry._load()
+            return [
+                definition for definition in ModelRegistry._definitions.values()
+                if architecture_name is None or definition.architecture == architecture_name
+            ]
+
+    @staticmethod
+    def get_architecture_names() -> List[str]:
+        return list(dict.fromkeys(definition.architecture for definition in ModelRegistry.get_all()))
+
+    @staticmethod
+    def get_runtime_definitions() -> List[ModelDefinition]:
+        # Spawned worker processes only know the built-in and plugin models, so these are handed to them
+        with ModelRegistry._lock:
+            return list(ModelRegistry._runtime_definitions)
+
+    @staticmethod
+    def _add(definition: ModelDefinition, replace: bool = False):
+        if definition.constructor is None and definition.saved_model_path is None:
+            raise ValueError(f"'{definition.identification}' has neither a constructor nor a saved model path")
+        key = str(definition.identification)
+        if not replace and key in ModelRegistry._definitions:
+            raise ValueError(f"'{key}' is already registered")
+        ModelRegistry._definitions[key] = definition
+
+    @staticmethod
+    def _load():
+        if ModelRegistry._loaded:
+            return
+        ModelRegistry._loaded = True
+        from .ModelTable import BUILT_IN_MODELS
+        for definition in BUILT_IN_MODELS:
+            ModelRegistry._add(definition)
+        for entry_point in ModelRegistry._get_entry_points():
+            try:
+                definitions = entry_point.load()
+                for definition in definitions() if callable(definitions) else definitions:
+                    ModelRegistry._add(definition)
+            except Exception:
+                logging.exception(f"Loading the models of the entry point '{entry_point.name}' failed")
+
+    @staticmethod
+    def _get_entry_points() -> List[Any]:
+        from importlib.metadata import entry_points
+        all_entry_points = entry_points()
+        # The selection interface only exists from Python 3.10 on
+        if hasattr(all_entry_points, "select"):
+            return list(all_entry_points.select(group=MODEL_ENTRY_POINT_GROUP))
+        return list(all_entry_points.get(MODEL_ENTRY_POINT_GROUP, []))
@@ -1,85 +1,61 @@
-from typing import Dict, Type, List
+from typing import List
 
-from .ConvNeXt import ConvNeXtVariant, ConvNeXtWrapper
-from .EfficientNet import EfficientNetVariant, EfficientNetWrapper
-from .EfficientNetV2 import EfficientNetV2Variant, EfficientNetV2Wrapper
-from .ModelIdentification import ModelArchitecture, ModelIdentification
-from .ModelWrapperBase import ModelVariant, ModelWrapperBase
-from .RegNetX import RegNetXVariant, RegNetXWrapper
-from .RegNetY import RegNetYVariant, RegNetYWrapper
-from .ResNetRS import ResNetRSVariant, ResNetRSWrapper
-
-
-ModelArchitectureToVariantsMapping: Dict[ModelArchitecture, Type[ModelVariant]] = {
-    ModelArchitecture.ConvNeXt: ConvNeXtVariant,
-    ModelArchitecture.EfficientNet: EfficientNetVariant,
-    ModelArchitecture.EfficientNetV2: EfficientNetV2Variant,
-    ModelArchitecture.RegNetX: RegNetXVariant,
-    ModelArchitecture.RegNetY: RegNetYVariant,
-    ModelArchitecture.ResNetRS: ResNetRSVariant
-}
-
-ModelArchitectureToWrapperClassMapping: Dict[ModelArchitecture, Type[ModelWrapperBase]] = {
-    ModelArchitecture.ConvNeXt: ConvNeXtWrapper,
-    ModelArchitecture.EfficientNet: EfficientNetWrapper,
-    ModelArchitecture.EfficientNetV2: EfficientNetV2Wrapper,
-    ModelArchitecture.RegNetX: RegNetXWrapper,
-    ModelArchitecture.RegNetY: RegNetYWrapper,
-    ModelArchitecture.ResNetRS: ResNetRSWrapper
-}
+from .ModelIdentification import ModelArchitecture, ModelIdentification, ModelVariant
+from .ModelRegistry import ModelRegistry
+from .ModelWrapperBase import ModelWrapperBase
+from .RegisteredModelWrapper import RegisteredModelWrapper
 
 
 class ModelService:
     @staticmethod
-    def get(model_identification: ModelIdentification) -> ModelWrapperBase:
+    def get(model_identification: ModelIdentification, pretrained: bool = True) -> ModelWrapperBase:
         ModelService.verify_model_identification(model_identification)
-        model_wrapper_class = ModelArchitectureToWrapperClassMapping[model_identification.architecture]
-        model_wrapper = model_wrapper_class(model_identification.variant)
-        return model_wrapper
+        return RegisteredModelWrapper(ModelRegistry.get(model_identification), pretrained)
 
     @staticmethod
-    def get_all_of_architecture(model_architecture: ModelArchitecture) -> List[ModelWrapperBase]:
+    def get_all_of_architecture(
+            model_architecture: ModelArchitecture,
+            pretrained: bool = True
+    ) -> List[ModelWrapperBase]:
         ModelService.verify_model_architecture(model_architecture)
-        wrapper_class = ModelArchitectureToWrapperClassMapping[model_architecture]
-        variants_type = ModelArchitectureToVariantsMapping[model_architecture]
-        model_wrappers = [wrapper_class(variant) for variant in variants_type]
-        return model_wrappers
+        return [
+            RegisteredModelWrapper(definition, pretrained)
+            for definition in ModelRegistry.get_all(model_architecture.name)
+        ]
+
+    @staticmethod
+    def get_all(pretrained: bool = True) -> List[ModelWrapperBase]:
+        return [RegisteredModelWrapper(definition, pretrained) for definition in ModelRegistry.get_all()]
 
     @staticmethod
-    def get_all() -> List[ModelWrapperBase]:
-        model_wrappers = []
-        for model_architecture in ModelArchitecture:
-            wrapper_class = ModelArchitectureToWrapperClassMapping[model_architecture]
-            variants_type = ModelArchitectureToVariantsMapping[model_architecture]
-            model_wrappers += [wrapper_class(variant) for variant in variants_type]
-        return model_wrappers
+    def get_architectures() -> List[ModelArchitecture]:
+        return [ModelArchitecture(architecture_name) for architecture_name in ModelRegistry.get_architecture_names()]
+
+    @staticmethod
+    def get_architecture_by_name(architecture_name: str) -> ModelArchitecture:
+        if architecture_name not in ModelRegistry.get_architecture_names():
+            raise ValueError(f"There is no model architecture '{architecture_name}'")
+        return ModelArchitecture(architecture_name)
 
     @staticmethod
     def get_model_variant_by_name(model_architecture: ModelArchitecture, variant_name: str) -> ModelVariant:
         ModelService.verify_model_architecture(model_architecture)
-        variants_type = ModelArchitectureToVariantsMapping[model_architecture]
-        variant_names = [variant.name for variant in variants_type]
+        variant_names = [definition.variant for definition in ModelRegistry.get_all(model_architecture.name)]
         if variant_name not in variant_names:
             raise ValueError(f"There is no variant '{variant_name}' for model architecture '{model_architecture.name}'")
-        return variants_type[variant_name]
+        return ModelVariant(variant_name)
 
     @staticmethod
     def verify_model_identification(model_identification: ModelIdentification):
-        try:
-            accepted_model_variants_type = ModelArchitectureToVariantsMapping[model_identification.architecture]
-        except KeyError as e:
-            raise TypeError(f"'{e.args[0]}' is not a supported model type")
-
-        try:
-            accepted_model_variants_type[model_identification.variant.name]
-        except KeyError as e:
-            raise TypeError(f"'{e.args[0]}' is not a supported variant for model type '{model_identification.architecture.name}'")
+        ModelService.verify_model_architecture(model_identification.architecture)
+        variant_names = [
+            definition.variant for definition in ModelRegistry.get_all(model_identification.architecture.name)
+        ]
+        if model_identification.variant.name not in variant_names:
+            raise TypeError(f"'{model_identification.variant.name}' is not a supported variant for model type "
+                            f"'{model_identification.architecture.name}'")
 
     @staticmethod
     def verify_model_architecture(model_architecture: ModelArchitecture):
-        try:
-            ModelArchitectureToVariantsMapping[model_architecture]
-        except KeyError as e:
-            raise TypeError(f"'{e.args[0]}' is not a supported model type")
-
-
+        if model_architecture.name not in ModelRegistry.get_architecture_names():
+            raise TypeError(f"'{model_architecture.name}' is not a supported model type")
@@ -0,0 +1,70 @@
+from typing import List
+
+from .ModelRegistry import ModelDefinition
+
+# The Keras applications are built without their preprocessing layers, EfficientNet (V1) has none to leave out
+NO_PREPROCESS = {"include_preprocessing": False}
+
+# Top-1 ImageNet accuracy as reported by the authors, input size as the pretrained weights were trained with.
+# Models of other packages are added through the entry point group of the model registry, not in this table.
+BUILT_IN_MODELS: List[ModelDefinition] = [
+    ModelDefinition("ConvNeXt", "Tiny", "ConvNeXtTiny", 82.1, 224, "convnext_tiny_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ConvNeXt", "Small", "ConvNeXtSmall", 83.1, 224, "convnext_small_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ConvNeXt", "Base", "ConvNeXtBase", 83.8, 224, "convnext_base_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ConvNeXt", "Large", "ConvNeXtLarge", 84.3, 224, "convnext_large_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ConvNeXt", "XLarge", "ConvNeXtXLarge", 85.5, 224, "convnext_xlarge_notop.h5", NO_PREPROCESS),
+
+    ModelDefinition("EfficientNet", "B0", "EfficientNetB0", 77.2, 224, "efficientnetb0_notop.h5"),
+    ModelDefinition("EfficientNet", "B1", "EfficientNetB1", 79.1, 240, "efficientnetb1_notop.h5"),
+    ModelDefinition("EfficientNet", "B2", "EfficientNetB2", 80.2, 260, "efficientnetb2_notop.h5"),
+    ModelDefinition("EfficientNet", "B3", "EfficientNetB3", 81.6, 300, "efficientnetb3_notop.h5"),
+    ModelDefinition("EfficientNet", "B4", "EfficientNetB4", 83.0, 380, "efficientnetb4_notop.h5"),
+    ModelDefinition("EfficientNet", "B5", "EfficientNetB5", 83.7, 456, "efficientnetb5_notop.h5"),
+    ModelDefinition("EfficientNet", "B6", "EfficientNetB6", 84.1, 528, "efficientnetb6_notop.h5"),
+    ModelDefinition("EfficientNet", "B7", "EfficientNetB7", 84.4, 600, "efficientnetb7_notop.h5"),
+
+    ModelDefinition("EfficientNetV2", "B0", "EfficientNetV2B0", 78.7, 224, "efficientnetv2-b0_notop.h5", NO_PREPROCESS),
+    ModelDefinition("EfficientNetV2", "B1", "EfficientNetV2B1", 79.8, 240, "efficientnetv2-b1_notop.h5", NO_PREPROCESS),
+    # The accuracy of B2 is estimated
+    ModelDefinition("EfficientNetV2", "B2", "EfficientNetV2B2", 81.8, 260, "efficientnetv2-b2_notop.h5", NO_PREPROCESS),
+    ModelDefinition("EfficientNetV2", "B3", "EfficientNetV2B3", 82.1, 300, "efficientnetv2-b3_notop.h5", NO_PREPROCESS),
+    ModelDefinition("EfficientNetV2", "S", "EfficientNetV2S", 83.9, 384, "efficientnetv2-s_notop.h5", NO_PREPROCESS),
+    ModelDefinition("EfficientNetV2", "M", "EfficientNetV2M", 85.1, 480, "efficientnetv2-m_notop.h5", NO_PREPROCESS),
+    ModelDefinition("EfficientNetV2", "L", "EfficientNetV2L", 85.7, 480, "efficientnetv2-l_notop.h5", NO_PREPROCESS),
+
+    ModelDefinition("RegNetX", "X002", "RegNetX002", 68.9, 224, "regnetx002_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X004", "RegNetX004", 72.6, 224, "regnetx004_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X006", "RegNetX006", 74.1, 224, "regnetx006_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X008", "RegNetX008", 75.2, 224, "regnetx008_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X016", "RegNetX016", 77.0, 224, "regnetx016_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X032", "RegNetX032", 78.3, 224, "regnetx032_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X040", "RegNetX040", 78.6, 224, "regnetx040_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X064", "RegNetX064", 79.2, 224, "regnetx064_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X080", "RegNetX080", 79.3, 224, "regnetx080_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X120", "RegNetX120", 79.7, 224, "regnetx120_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X160", "RegNetX160", 80.0, 224, "regnetx160_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetX", "X320", "RegNetX320", 80.5, 224, "regnetx320_notop.h5", NO_PREPROCESS),
+
+    ModelDefinition("RegNetY", "Y002", "RegNetY002", 72.3, 224, "regnety002_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y004", "RegNetY004", 74.1, 224, "regnety004_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y006", "RegNetY006", 75.5, 224, "regnety006_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y008", "RegNetY008", 76.3, 224, "regnety008_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y016", "RegNetY016", 77.9, 224, "regnety016_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y032", "RegNetY032", 78.9, 224, "regnety032_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y040", "RegNetY040", 79.4, 224, "regnety040_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y064", "RegNetY064", 79.9, 224, "regnety064_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y080", "RegNetY080", 79.9, 224, "regnety080_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y120", "RegNetY120", 80.3, 224, "regnety120_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y160", "RegNetY160", 80.4, 224, "regnety160_notop.h5", NO_PREPROCESS),
+    ModelDefinition("RegNetY", "Y320", "RegNetY320", 80.9, 224, "regnety320_notop.h5", NO_PREPROCESS),
+
+    ModelDefinition("ResNetRS", "RS50", "ResNetRS50", 78.8, 160, "resnet-rs-50-i160_notop.h5", NO_PREPROCESS),
+    # 82.8 corresponds to image resolution 192 (80.3 with 160)
+    ModelDefinition("ResNetRS", "RS101", "ResNetRS101", 81.2, 192, "resnet-rs-101-i192_notop.h5", NO_PREPROCESS),
+    # 82.8 corresponds to image resolution 256 (82.8 with 224)
+    ModelDefinition("ResNetRS", "RS152", "ResNetRS152", 83.0, 256, "resnet-rs-152-i256_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ResNetRS", "RS200", "ResNetRS200", 83.4, 256, "resnet-rs-200-i256_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ResNetRS", "RS270", "ResNetRS270", 83.8, 256, "resnet-rs-270-i256_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ResNetRS", "RS350", "ResNetRS350", 84.0, 320, "resnet-rs-350-i320_notop.h5", NO_PREPROCESS),
+    ModelDefinition("ResNetRS", "RS420", "ResNetRS420", 84.4, 320, "resnet-rs-420-i320_notop.h5", NO_PREPROCESS),
+]
@@ -1,17 +1,38 @@
+from __future__ import annotations
+
+import gc
+import os
 from abc import ABC, abstractmethod
-import tensorflow as tf
+from contextlib import contextmanager
+from typing import Iterator, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tensorflow as tf
 
 from .ModelIdentification import ModelArchitecture, ModelVariant, ModelIdentification
 
+PRETRAINED_WEIGHTS = "imagenet"
+
 
 class ModelWrapperBase(ABC):
-    def __init__(self, variant: ModelVariant):
+    def __init__(self, variant: ModelVariant, pretrained: bool = True):
         self._variant = variant
+        self._pretrained = pretrained
+        self._model: Optional[tf.keras.Model] = None
 
     @property
     def variant(self) -> ModelVariant:
         return self._variant
 
+    @property
+    def pretrained(self) -> bool:
+        return self._pretrained
+
+    @property
+    def weights(self) -> Optional[str]:
+        # Randomly initialized models are built offline, e.g. for benchmarks
+        return PRETRAINED_WEIGHTS if self._pretrained else None
+
     @property
     def identification(self) -> ModelIdentification:
         return ModelIdentification(self.architecture, self.variant)
@@ -21,6 +42,41 @@ class ModelWrapperBase(ABC):
     def model(self) -> tf.keras.Model:
         raise NotImplementedError()
 
+    @property
+    def is_built(self) -> bool:
+        return self._model is not None
+
+    @contextmanager
+    def lease(self) -> Iterator[ModelWrapperBase]:
+        # The model is built lazily on the first access to .model within the block and released when the block is left.
+        # A model that was already built before the lease is kept.
+        was_built = self.is_built
+        try:
+            yield self
+        finally:
+            if not was_built:
+                self.release()
+
+    def release(self):
+        # Drops the model and the global Keras state it registered, so the memory is returned before the next model
+        if self._model is None:
+            return
+        self._model = None
+        import tensorflow as tf
+        tf.keras.backend.clear_session()
+        gc.collect()
+
+    @property
+    @abstractmethod
+    def weights_file_name(self) -> str:
+        raise NotImplementedError()
+
+    @property
+    def weights_path(self) -> str:
+        # Location of the ImageNet weights once Keras has downloaded them
+        keras_home = os.environ.get("KERAS_HOME", os.path.join(os.path.expanduser("~"), ".keras"))
+        return os.path.join(keras_home, "models", self.weights_file_name)
+
     @property
     @abstractmethod
     def architecture(self) -> ModelArchitecture:
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import math
+import os
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import tensorflow as tf
+
+from .ModelIdentification import ModelArchitecture, ModelVariant
+from .ModelRegistry import ModelDefinition
+from .ModelWrapperBase import ModelWrapperBase
+
+# Where TensorFlow writes the weights of a SavedModel with a single shard
+SAVED_MODEL_WEIGHTS_PATH = os.path.join("variables", "variables.data-00000-of-00001")
+
+
+class RegisteredModelWrapper(ModelWrapperBase):
+    # Builds any model of the registry from its definition
+    def __init__(self, definition: ModelDefinition, pretrained: bool = True):
+        super().__init__(ModelVariant(definition.variant), pretrained)
+        self._definition = definition
+
+    @property
+    def definition(self) -> ModelDefinition:
+        return self._definition
+
+    @property
+    def model(self) -> tf.keras.Model:
+        if self._model is None:
+            # TensorFlow and the constructor's module are only imported once a model is actually built
+            if self._definition.saved_model_path is not None:
+                import tensorflow as tf
+                self._model = tf.keras.models.load_model(self._definition.saved_model_path, compile=False)
+            else:
+                model_constructor = self._definition.get_constructor()
+                self._model = model_constructor(
+                    include_top=False,
+                    weights=self.weights,
+                    **self._definition.constructor_arguments
+                )
+        return self._model
+
+    @property
+    def weights_file_name(self) -> Optional[str]:
+        return self._definition.weights_file_name
+
+    @property
+    def weights_path(self) -> str:
+        saved_model_path = self._definition.saved_model_path
+        if saved_model_path is None:
+            # Without a known file name the weights are never found, so the model is built and analyzed on every run
+            return "" if self.weights_file_name is None else super().weights_path
+        # Saved models carry their own weights, which the manifest hashes to detect changes
+        if os.path.isdir(saved_model_path):
+            return os.path.join(saved_model_path, SAVED_MODEL_WEIGHTS_PATH)
+        return saved_model_path
+
+    @property
+    def top_1_accuracy(self) -> float:
+        # Results of models registered without an accuracy are stored with NaN
+        if self._definition.top_1_accuracy is None:
+            return math.nan
+        return self._definition.top_1_accuracy
+
+    @property
+    def architecture(self) -> ModelArchitecture:
+        return ModelArchitecture(self._definition.architecture)
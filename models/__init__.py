@@ -1,3 +1,7 @@
 from .ModelService import ModelService
 from .ModelIdentification import ModelIdentification, ModelArchitecture, ModelVariant
 from .ModelWrapperBase import ModelWrapperBase
+from .ModelRegistry import ModelRegistry, ModelDefinition, MODEL_ENTRY_POINT_GROUP
+from .RegisteredModelWrapper import RegisteredModelWrapper
+from .ModelMetadata import ModelMetadata, ModelMetadataRegistry
+from .CheckpointSeries import CheckpointSeries, Checkpoint
@@ -0,0 +1,133 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Any, Iterator, Iterable, Optional, Callable, TypeVar
+
+# Set by configure and read by every process, so spawned analysis workers inherit the configuration
+EVENT_LOG_PATH_VARIABLE = "WW_ANALYSIS_EVENT_LOG"
+PROFILE_PATH_VARIABLE = "WW_ANALYSIS_PROFILE_PATH"
+
+T = TypeVar("T")
+
+
+class InstrumentationStage(Enum):
+    MODEL_BUILD = "model_build"
+    WEIGHT_EXTRACTION = "weight_extraction"
+    ESD = "esd"
+    POWER_LAW_FIT = "power_law_fit"
+    ANALYSIS = "analysis"
+    SAVE = "save"
+    LOAD = "load"
+    FIGURE = "figure"
+
+
+class Instrumentation:
+    # Process-wide stage timers. Every measurement is added to the per-stage totals, logged on DEBUG and, once an
+    # event log is configured, appended to it as one JSON object per line. Events of all worker processes go to the
+    # same file, as every line is written with a single append.
+    _lock = threading.Lock()
+    # cProfile can only be active once per process, concurrent profiled calls are run without the profiler
+    _profile_lock = threading.Lock()
+    _stage_totals: Dict[str, float] = {}
+
+    @staticmethod
+    def configure(event_log_path: Optional[str] = None, profile_path: Optional[str] = None):
+        for variable, path in [(EVENT_LOG_PATH_VARIABLE, event_log_path), (PROFILE_PATH_VARIABLE, profile_path)]:
+            if path is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = os.path.abspath(path)
+
+    @staticmethod
+    @contextmanager
+    def timer(stage: InstrumentationStage, **attributes) -> Iterator[Dict[str, Any]]:
+        # The attributes are yielded, so the block can add what it only knows at its end, e.g. the number of layers
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            Instrumentation.record(stage, time.perf_counter() - start, **attributes)
+
+    @staticmethod
+    def record(stage: InstrumentationStage, seconds: float, **attributes):
+        with Instrumentation._lock:
+            Instrumentation._stage_totals[stage.value] = Instrumentation._stage_totals.get(stage.value, 0.0) + seconds
+        logging.log(logging.DEBUG, f"{stage.value}: {seconds:.3f}s {attributes}")
+
+        event_log_path = os.environ.get(EVENT_LOG_PATH_VARIABLE)
+        if event_log_path is None:
+            return
+        event = {"timestamp": time.time(), "pid": os.getpid(), "stage": stage.value, "seconds": seconds}
+        event.update(attributes)
+        with open(event_log_path, "a") as event_log:
+            event_log.write(json.dumps(event, default=str) + "\n")
+
+    @staticmethod
+    def iterate(stage: InstrumentationStage, iterable: Iterable[T], **attributes) -> Iterator[T]:
+        # Times only the work of the iterable itself, i.e. excluding what the consumer does between the items
+        iterator = iter(iterable)
+        seconds, items = 0.0, 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    seconds += time.perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            Instrumentation.record(stage, seconds, items=items, **attributes)
+
+    @staticmethod
+    @contextmanager
+    def profile(name: str) -> Iterator[None]:
+        # Writes <profile path>/<name>.<pid>.prof, which snakeviz or pstats can read. Nothing is profiled unless a
+        # profile path is configured. py-spy needs no hook, the thread pools are named after what they run.
+        profile_path = os.environ.get(PROFILE_PATH_VARIABLE)
+        if profile_path is None or not Instrumentation._profile_lock.acquire(blocking=False):
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+            os.makedirs(profile_path, exist_ok=True)
+            file_name = re.sub(r"[^\w.-]", "_", name)
+            profiler.dump_stats(os.path.join(profile_path, f"{file_name}.{os.getpid()}.prof"))
+        finally:
+            Instrumentation._profile_lock.release()
+
+    @staticmethod
+    def timed(stage: InstrumentationStage) -> Callable[[Callable[..., T]], Callable[..., T]]:
+        # Decorator that times and, if configured, profiles every call of the function
+        def decorator(function: Callable[..., T]) -> Callable[..., T]:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs) -> T:
+                with Instrumentation.timer(stage, function=function.__qualname__), \
+                        Instrumentation.profile(function.__qualname__):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def get_stage_totals() -> Dict[str, float]:
+        with Instrumentation._lock:
+            return dict(Instrumentation._stage_totals)
+
+    @staticmethod
+    def format_report() -> str:
+        stage_totals = Instrumentation.get_stage_totals()
+        return ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stage_totals.items()) or "nothing timed"
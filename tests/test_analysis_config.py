@@ -0,0 +1,71 @@
+import numpy
+import pandas
+import pytest
+
+from weight_watcher import AnalysisConfig, LayerWeights, LayerType, WeightWatcherService
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns
+
+CONFIGS = [AnalysisConfig("default"), AnalysisConfig("random", randomize=True)]
+
+# Timings differ between runs
+TIMING_COLUMNS = [
+    WeightWatcherDetailsColumns.ESD_SECONDS.value,
+    WeightWatcherDetailsColumns.FIT_SECONDS.value,
+]
+
+
+def create_layers() -> list:
+    rng = numpy.random.default_rng(0)
+    layers = [
+        LayerWeights(0, "dense", LayerType.DENSE, rng.standard_t(3, (256, 128)).astype(numpy.float32)),
+        LayerWeights(1, "conv", LayerType.CONV2D, rng.standard_normal((3, 3, 32, 64)).astype(numpy.float32)),
+    ]
+    # Shared like the layers of analyze_model_configs, so any write to a kernel raises
+    for layer in layers:
+        layer.kernel.flags.writeable = False
+    return layers
+
+
+def test_configs_match_standalone_analyses():
+    layers = create_layers()
+    kernels = [layer.kernel.copy() for layer in layers]
+
+    config_details = WeightWatcherService.analyze_layers_with_configs(layers, CONFIGS, engine_threads=2)
+
+    for config, details in zip(CONFIGS, config_details):
+        expected_details = config.create_engine().analyze_layers(config.get_layers(create_layers()))
+        pandas.testing.assert_frame_equal(details.drop(columns=TIMING_COLUMNS),
+                                          expected_details.drop(columns=TIMING_COLUMNS))
+    assert not config_details[0].equals(config_details[1])
+    for layer, kernel in zip(layers, kernels):
+        assert not layer.kernel.flags.writeable
+        numpy.testing.assert_array_equal(layer.kernel, kernel)
+
+
+def test_randomized_layers_are_reproducible_permutations():
+    layers = create_layers()
+    randomized_layers = CONFIGS[1].get_layers(layers)
+
+    for layer, randomized_layer in zip(layers, randomized_layers):
+        assert randomized_layer.kernel.shape == layer.kernel.shape
+        numpy.testing.assert_array_equal(numpy.sort(randomized_layer.kernel, axis=None),
+                                         numpy.sort(layer.kernel, axis=None))
+    for first, second in zip(randomized_layers, CONFIGS[1].get_layers(layers)):
+        numpy.testing.assert_array_equal(first.kernel, second.kernel)
+
+
+@pytest.mark.parametrize("name", ["", "a/b", "../results", "..", "with space"])
+def test_invalid_names_are_rejected(name):
+    with pytest.raises(ValueError):
+        AnalysisConfig(name)
+
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(ValueError):
+        AnalysisConfig.verify_unique_names([AnalysisConfig("default"), AnalysisConfig("default", randomize=True)])
+
+
+def test_round_trip_through_dict():
+    config = AnalysisConfig("large", min_evals=500, randomize=True)
+
+    assert AnalysisConfig.from_dict(config.to_dict()) == config
@@ -0,0 +1,78 @@
+import json
+import os.path
+from types import SimpleNamespace
+
+import numpy
+import pandas
+import pytest
+
+from models import ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import AnalysisConfig, ConfigAnalysisRunner, LayerWeights, LayerType, WeightWatcherResult, \
+    WeightWatcherResultService, WeightWatcherService
+from weight_watcher.ConfigAnalysisRunner import CONFIG_FILE_NAME
+from weight_watcher.WeightWatcherResultService import CONFIG_RESULTS_DIRECTORY, PARTIAL_SUMMARY_COLUMNS
+
+MODEL_IDENTIFICATION = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Tiny"))
+
+
+class StubConfigService:
+    # Stands in for the WeightWatcherService, which needs weightwatcher, and records the analyzed configs
+    def __init__(self):
+        self.analyzed_configs = []
+        self.weightwatcher_version = "0.0"
+        self.engine = SimpleNamespace(name="LAYER_PARALLEL")
+
+    def get_config_result_options(self, config: AnalysisConfig):
+        return {**config.create_engine().get_result_options(), "randomize": config.randomize}
+
+    def analyze_model_configs(self, model_wrapper, configs):
+        self.analyzed_configs.append([config.name for config in configs])
+        rng = numpy.random.default_rng(0)
+        layers = [LayerWeights(0, "dense", LayerType.DENSE, rng.standard_t(3, (128, 64)).astype(numpy.float32))]
+        return {
+            config.name: WeightWatcherResult(
+                model_wrapper.identification,
+                model_wrapper.top_1_accuracy,
+                pandas.DataFrame([details[PARTIAL_SUMMARY_COLUMNS].mean()]),
+                details
+            )
+            for config, details in zip(configs, WeightWatcherService.analyze_layers_with_configs(layers, configs))
+        }
+
+
+@pytest.fixture
+def model_wrapper(tmp_path):
+    weights_path = tmp_path / "weights.h5"
+    weights_path.write_bytes(b"weights")
+    return SimpleNamespace(identification=MODEL_IDENTIFICATION, weights_path=str(weights_path), top_1_accuracy=0.8)
+
+
+def run(results_path: str, configs, model_wrapper, force: bool = False):
+    service = StubConfigService()
+    ConfigAnalysisRunner(service, WeightWatcherResultService(results_path), configs).run([model_wrapper], force)
+    return service.analyzed_configs
+
+
+def test_only_outdated_configs_are_analyzed(tmp_path, model_wrapper):
+    results_path = str(tmp_path / "results")
+    configs = [AnalysisConfig("default"), AnalysisConfig("random", randomize=True)]
+
+    assert run(results_path, configs, model_wrapper) == [["default", "random"]]
+    assert run(results_path, configs, model_wrapper) == []
+    # The same name with other settings
+    changed_configs = [AnalysisConfig("default"), AnalysisConfig("random", min_evals=20, randomize=True)]
+    assert run(results_path, changed_configs, model_wrapper) == [["random"]]
+    with open(os.path.join(results_path, CONFIG_RESULTS_DIRECTORY, "random", CONFIG_FILE_NAME)) as config_file:
+        assert AnalysisConfig.from_dict(json.load(config_file)) == changed_configs[1]
+    assert run(results_path, changed_configs, model_wrapper, force=True) == [["default", "random"]]
+
+
+def test_changed_weights_are_analyzed_again(tmp_path, model_wrapper):
+    results_path = str(tmp_path / "results")
+    configs = [AnalysisConfig("default")]
+    run(results_path, configs, model_wrapper)
+
+    with open(model_wrapper.weights_path, "wb") as weights_file:
+        weights_file.write(b"other weights")
+
+    assert run(results_path, configs, model_wrapper) == [["default"]]
@@ -0,0 +1,67 @@
+import os.path
+
+import numpy
+import pandas
+import pytest
+
+from models import ModelService, ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import LayerAnalysisEngine, LayerWeights, LayerWeightsExtractor, LayerType
+from weight_watcher.LayerAnalysisEngine import UNKNOWN
+from weight_watcher.PowerLawFitter import SUCCESS, FAILED
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "results")
+
+# Checked in results of weightwatcher's analyze, which the layer-parallel engine is compared against
+REFERENCE_MODEL = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Tiny"))
+# The spectra only differ by the rounding of the SVDs, the fits also by the optimizer weightwatcher uses for alpha
+SPECTRUM_RTOL = 1e-4
+FIT_RTOL = 1e-2
+
+
+def test_best_fit_is_only_reported_for_failed_fits():
+    rng = numpy.random.default_rng(0)
+    heavy_tailed_kernel = rng.standard_t(3, (512, 256)).astype(numpy.float32)
+    # A single non-zero eigenvalue leaves no tail to fit
+    rank_one_kernel = numpy.outer(rng.standard_normal(256), rng.standard_normal(128)).astype(numpy.float32)
+    details = LayerAnalysisEngine().analyze_layers([
+        LayerWeights(0, "dense", LayerType.DENSE, heavy_tailed_kernel),
+        LayerWeights(1, "rank_one", LayerType.DENSE, rank_one_kernel),
+    ])
+
+    best_fit = details[WeightWatcherDetailsColumns.BEST_FIT.value]
+    assert details[WeightWatcherDetailsColumns.WARNING.value].tolist() == [SUCCESS, FAILED]
+    assert best_fit.isna()[0]
+    assert best_fit[1] == UNKNOWN
+
+
+def test_matches_weightwatcher_results():
+    weights_path = ModelService.get(REFERENCE_MODEL).weights_path
+    if not os.path.exists(weights_path):
+        pytest.skip(f"The weights of {REFERENCE_MODEL} are not downloaded to '{weights_path}'")
+    reference = pandas.read_csv(
+        os.path.join(RESULTS_PATH, REFERENCE_MODEL.architecture.name, REFERENCE_MODEL.variant.name, "details.csv")
+    ).set_index(WeightWatcherDetailsColumns.NAME.value)
+
+    details = LayerAnalysisEngine().analyze_layers(LayerWeightsExtractor.from_weights_file(weights_path)) \
+        .set_index(WeightWatcherDetailsColumns.NAME.value)
+
+    assert sorted(details.index) == sorted(reference.index)
+    details = details.loc[reference.index]
+    for column in [WeightWatcherDetailsColumns.M, WeightWatcherDetailsColumns.N, WeightWatcherDetailsColumns.NUM_EVALS]:
+        numpy.testing.assert_array_equal(details[column.value], reference[column.value], err_msg=column.value)
+    for column in [
+        WeightWatcherDetailsColumns.LAMBDA_MAX,
+        WeightWatcherDetailsColumns.LOG_NORM,
+        WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM,
+        WeightWatcherDetailsColumns.STABLE_RANK,
+    ]:
+        numpy.testing.assert_allclose(details[column.value], reference[column.value], rtol=SPECTRUM_RTOL,
+                                      err_msg=column.value)
+    # Only failed fits have a best_fit, which weightwatcher reports as well
+    failed_fits = details[WeightWatcherDetailsColumns.WARNING.value] == FAILED
+    assert (details.loc[failed_fits, WeightWatcherDetailsColumns.BEST_FIT.value] ==
+            reference.loc[failed_fits, WeightWatcherDetailsColumns.BEST_FIT.value]).all()
+    for column in [WeightWatcherDetailsColumns.ALPHA, WeightWatcherDetailsColumns.XMIN]:
+        numpy.testing.assert_allclose(details[column.value], reference[column.value], rtol=FIT_RTOL,
+                                      err_msg=column.value)
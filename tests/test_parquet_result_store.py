@@ -0,0 +1,107 @@
+import functools
+
+import numpy
+import pandas
+import pytest
+
+from models import ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import LayerAnalysisEngine, LayerWeights, LayerType
+from weight_watcher.ParquetResultStore import ParquetResultStore, DETAILS_SCHEMA, SUMMARY_SCHEMA, PARTITION_COLUMNS
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+from weight_watcher.WeightWatcherResultSchema import WeightWatcherResultSchema
+
+TINY = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Tiny"))
+BASE = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Base"))
+B0 = ModelIdentification(ModelArchitecture("EfficientNet"), ModelVariant("B0"))
+
+
+def create_details(seed: int) -> pandas.DataFrame:
+    # Cached, as the timings of the analysis differ between calls
+    return analyze_layers(seed).copy()
+
+
+@functools.lru_cache(maxsize=None)
+def analyze_layers(seed: int) -> pandas.DataFrame:
+    rng = numpy.random.default_rng(seed)
+    return LayerAnalysisEngine().analyze_layers([
+        LayerWeights(0, "dense", LayerType.DENSE, rng.standard_t(3, (256, 128)).astype(numpy.float32)),
+        LayerWeights(1, "conv", LayerType.CONV2D, rng.standard_normal((3, 3, 32, 64)).astype(numpy.float32)),
+    ])
+
+
+def create_summary(seed: int) -> pandas.DataFrame:
+    rng = numpy.random.default_rng(seed)
+    columns = [field.name for field in SUMMARY_SCHEMA if field.name not in PARTITION_COLUMNS]
+    return pandas.DataFrame([dict(zip(columns, rng.random(len(columns))))])
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ParquetResultStore(str(tmp_path))
+    for seed, model_identification in enumerate([TINY, BASE, B0]):
+        store.write(model_identification, create_summary(seed), create_details(seed))
+    return store
+
+
+def get_rows(dataframe: pandas.DataFrame, model_identification: ModelIdentification) -> pandas.DataFrame:
+    return dataframe[
+        (dataframe[WeightWatcherDetailsColumns.ARCHITECTURE.value] == model_identification.architecture.name) &
+        (dataframe[WeightWatcherDetailsColumns.VARIANT.value] == model_identification.variant.name)
+    ].reset_index(drop=True)
+
+
+def test_round_trip(store):
+    details = store.read_details()
+    summaries = store.read_summaries()
+
+    assert list(details.columns) == DETAILS_SCHEMA.names
+    assert list(summaries.columns) == SUMMARY_SCHEMA.names
+    for seed, model_identification in enumerate([TINY, BASE, B0]):
+        # Compared as they are loaded, the store only keeps the dtypes of the columns that have a Parquet counterpart
+        expected_details = WeightWatcherResultSchema.apply_to_details(create_details(seed))
+        model_details = WeightWatcherResultSchema.apply_to_details(
+            get_rows(details, model_identification)[expected_details.columns]
+        )
+        pandas.testing.assert_frame_equal(model_details, expected_details, check_categorical=False)
+        expected_summary = create_summary(seed)
+        model_summary = get_rows(summaries, model_identification)[expected_summary.columns]
+        pandas.testing.assert_frame_equal(model_summary, expected_summary)
+
+
+def test_filters(store):
+    architecture = WeightWatcherDetailsColumns.ARCHITECTURE.value
+    variant = WeightWatcherDetailsColumns.VARIANT.value
+
+    convnext_details = store.read_details(architectures=["ConvNeXt"])
+    assert set(convnext_details[architecture]) == {"ConvNeXt"}
+    assert set(convnext_details[variant]) == {"Tiny", "Base"}
+    assert set(store.read_summaries(variants=["B0"])[architecture]) == {"EfficientNet"}
+    dense_details = store.read_details(layer_types=[LayerType.DENSE.value])
+    assert set(dense_details[WeightWatcherDetailsColumns.LAYER_TYPE.value]) == {LayerType.DENSE.value}
+    assert len(dense_details) == 3
+
+
+def test_write_replaces_partition(store):
+    store.write(TINY, create_summary(10), create_details(10).iloc[:1])
+
+    details = store.read_details(architectures=["ConvNeXt"], variants=["Tiny"])
+    assert len(details) == 1
+    assert details[WeightWatcherDetailsColumns.ALPHA.value][0] == create_details(10)[
+        WeightWatcherDetailsColumns.ALPHA.value][0]
+    summary = store.read_summaries(architectures=["ConvNeXt"], variants=["Tiny"])
+    assert summary[WeightWatcherSummaryColumns.ALPHA.value][0] == create_summary(10)[
+        WeightWatcherSummaryColumns.ALPHA.value][0]
+
+
+def test_exists(store, tmp_path):
+    assert ParquetResultStore.exists_at(str(tmp_path))
+    assert store.exists(TINY)
+    assert not store.exists(ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Large")))
+
+
+def test_empty_store(tmp_path):
+    store = ParquetResultStore(str(tmp_path))
+
+    assert not ParquetResultStore.exists_at(str(tmp_path))
+    assert store.read_details().empty
+    assert list(store.read_details().columns) == DETAILS_SCHEMA.names
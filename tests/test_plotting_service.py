@@ -0,0 +1,56 @@
+import pandas
+
+from visualization import PlottingService
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns
+
+ARCHITECTURE = WeightWatcherDetailsColumns.ARCHITECTURE.value
+VARIANT = WeightWatcherDetailsColumns.VARIANT.value
+ALPHA = WeightWatcherDetailsColumns.ALPHA.value
+
+
+def create_details() -> pandas.DataFrame:
+    return pandas.DataFrame({
+        ARCHITECTURE: ["ResNetRS", "ConvNeXt", "ConvNeXt", "ResNetRS", "ConvNeXt"],
+        VARIANT: ["RS50", "Tiny", "Base", "RS50", "Tiny"],
+        ALPHA: [5.0, 4.0, 3.0, 2.0, 1.0],
+    })
+
+
+def test_group_rows_by_architecture_and_variant():
+    details = create_details()
+
+    order, names, bounds = PlottingService.group_rows(details, True, True, sort_column=ALPHA)
+
+    assert names == ["ConvNeXt:Base", "ConvNeXt:Tiny", "ResNetRS:RS50"]
+    assert bounds == [(0, 1), (1, 3), (3, 5)]
+    assert list(details[ALPHA].to_numpy()[order]) == [3.0, 1.0, 4.0, 2.0, 5.0]
+
+
+def test_group_rows_without_grouping():
+    order, names, bounds = PlottingService.group_rows(create_details(), False, False)
+
+    assert names == ["all"]
+    assert bounds == [(0, 5)]
+    assert sorted(order) == list(range(5))
+
+
+def test_group_rows_of_empty_frame():
+    for group_by_architecture, group_by_variant in [(True, True), (True, False), (False, False)]:
+        order, names, bounds = PlottingService.group_rows(
+            create_details().iloc[:0],
+            group_by_architecture,
+            group_by_variant,
+            sort_column=ALPHA
+        )
+
+        assert len(order) == 0
+        assert names == []
+        assert bounds == []
+
+
+def test_split_dataframe():
+    names, frames = PlottingService.split_dataframe(create_details(), True, False)
+
+    assert names == ["ConvNeXt", "ResNetRS"]
+    assert [len(frame) for frame in frames] == [3, 2]
+    assert set(frames[1][VARIANT]) == {"RS50"}
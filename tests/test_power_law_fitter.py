@@ -0,0 +1,97 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import pytest
+from scipy.optimize import brentq
+
+from weight_watcher import PowerLawFitter, PowerLawFit
+from weight_watcher.PowerLawFitter import EVALS_THRESH, MIN_NUM_EVALS, SUCCESS, FAILED, OVER_TRAINED, UNDER_TRAINED
+
+
+def create_evals(seed: int, shape=(400, 200), degrees_of_freedom: float = 3) -> numpy.ndarray:
+    # Eigenvalues of W^T W / N for a heavy-tailed random W, sorted ascending like the engine's spectra
+    rng = numpy.random.default_rng(seed)
+    weights = rng.standard_t(degrees_of_freedom, shape)
+    return numpy.sort(numpy.linalg.eigvalsh(weights.T @ weights / shape[0]))
+
+
+def fit_reference(evals: numpy.ndarray) -> PowerLawFit:
+    # One candidate xmin at a time: the bounded MLE by root finding and the KS distance over the candidate's tail
+    xmax = float(evals[-1])
+    data = evals[evals > EVALS_THRESH]
+    if len(evals) < MIN_NUM_EVALS or len(data) == 0:
+        return PowerLawFit(-1, -1, xmax, -1, -1, -1, FAILED)
+    best = None
+    for xmin in numpy.unique(data)[:-1]:
+        tail = data[data >= xmin]
+        mean_log = numpy.mean(numpy.log(tail / xmin))
+        log_range = math.log(xmax / xmin)
+        if not 0 < mean_log < log_range / 2:
+            continue
+        a = brentq(lambda a: 1 / a - log_range / math.expm1(a * log_range) - mean_log, 1e-8, 1 / mean_log,
+                   xtol=1e-15, rtol=1e-15)
+        alpha = 1 + a
+        theoretical_cdf = -numpy.expm1(-a * numpy.log(tail / xmin)) / -math.expm1(-a * log_range)
+        empirical_cdf = numpy.arange(len(tail)) / len(tail)
+        distance = numpy.max(numpy.abs(theoretical_cdf - empirical_cdf))
+        if best is None or distance < best[0]:
+            best = (distance, alpha, float(xmin), len(tail))
+    if best is None:
+        return PowerLawFit(-1, -1, xmax, -1, -1, -1, FAILED)
+    distance, alpha, xmin, tail_length = best
+    status = OVER_TRAINED if alpha < 2.0 else UNDER_TRAINED if alpha > 6.0 else SUCCESS
+    num_pl_spikes = int(len(evals) - numpy.searchsorted(evals, xmin))
+    return PowerLawFit(alpha, xmin, xmax, float(distance), (alpha - 1) / math.sqrt(tail_length), num_pl_spikes, status)
+
+
+def assert_fits_equal(fit: PowerLawFit, expected_fit: PowerLawFit):
+    assert fit.status == expected_fit.status
+    assert fit.xmin == expected_fit.xmin
+    assert fit.xmax == expected_fit.xmax
+    assert fit.num_pl_spikes == expected_fit.num_pl_spikes
+    assert fit.alpha == pytest.approx(expected_fit.alpha, rel=1e-9)
+    assert fit.D == pytest.approx(expected_fit.D, rel=1e-9, abs=1e-12)
+    assert fit.sigma == pytest.approx(expected_fit.sigma, rel=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("degrees_of_freedom", [2.5, 4, 50])
+def test_fit_matches_reference(seed, degrees_of_freedom):
+    evals = create_evals(seed, degrees_of_freedom=degrees_of_freedom)
+
+    assert_fits_equal(PowerLawFitter.fit(evals), fit_reference(evals))
+
+
+def test_fit_of_float32_spectrum_matches_reference():
+    evals = create_evals(0).astype(numpy.float32)
+
+    assert_fits_equal(PowerLawFitter.fit(evals), fit_reference(evals.astype(numpy.float64)))
+
+
+def test_fit_with_repeated_eigenvalues():
+    # Rank deficient matrices repeat eigenvalues, only the first occurrence of a value is a candidate
+    evals = numpy.sort(numpy.concatenate([numpy.round(create_evals(1), 2), numpy.zeros(20)]))
+
+    assert_fits_equal(PowerLawFitter.fit(evals), fit_reference(evals))
+
+
+def test_fit_of_too_few_eigenvalues_fails():
+    evals = create_evals(0)[-MIN_NUM_EVALS + 1:]
+
+    fit = PowerLawFitter.fit(evals)
+
+    assert fit.status == FAILED
+    assert fit.alpha == -1 and fit.xmax == evals[-1]
+
+
+def test_fit_batch_equals_single_fits():
+    evals_per_layer = [create_evals(seed, shape) for seed, shape in enumerate([(300, 100), (500, 250), (64, 64)])]
+    evals_per_layer.append(create_evals(0)[:5])
+
+    with ThreadPoolExecutor(2) as executor:
+        batch_fits = PowerLawFitter.fit_batch(evals_per_layer, executor)
+    assert len(batch_fits) == len(evals_per_layer)
+    for fit, evals in zip(batch_fits, evals_per_layer):
+        assert fit == PowerLawFitter.fit(evals)
+    assert PowerLawFitter.fit_batch([]) == []
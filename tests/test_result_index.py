@@ -0,0 +1,142 @@
+import json
+import os.path
+
+import numpy
+import pandas
+import pytest
+
+from models import ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import ResultIndex
+from weight_watcher.ResultIndex import IndexMetricBins, FIT_METRIC_COLUMNS, INDEX_QUANTILES, MODELS_COLUMN, \
+    LAYERS_COLUMN
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "results")
+
+# ResNetRS has layers whose power law fit failed
+MODEL_IDENTIFICATIONS = [
+    ModelIdentification(ModelArchitecture(architecture), ModelVariant(variant))
+    for architecture, variant in [
+        ("ConvNeXt", "Tiny"), ("ConvNeXt", "Small"), ("ConvNeXt", "Base"),
+        ("ResNetRS", "RS50"), ("ResNetRS", "RS101"),
+    ]
+]
+
+
+def load_details(model_identification: ModelIdentification) -> pandas.DataFrame:
+    return pandas.read_csv(os.path.join(
+        RESULTS_PATH, model_identification.architecture.name, model_identification.variant.name, "details.csv"
+    ))
+
+
+def load_summary(model_identification: ModelIdentification) -> pandas.DataFrame:
+    with open(os.path.join(
+            RESULTS_PATH, model_identification.architecture.name, model_identification.variant.name, "summary.json"
+    )) as summary_file:
+        return pandas.DataFrame([json.load(summary_file)])
+
+
+def get_metric_values(details: pandas.DataFrame, metric: str) -> numpy.ndarray:
+    values = details[metric].to_numpy(dtype=numpy.float64)
+    if metric in FIT_METRIC_COLUMNS:
+        values = values[details[WeightWatcherDetailsColumns.ALPHA.value].to_numpy() != -1]
+    return values[numpy.isfinite(values)]
+
+
+@pytest.fixture
+def result_index(tmp_path):
+    result_index = ResultIndex(str(tmp_path / "index.json"))
+    for model_identification in MODEL_IDENTIFICATIONS:
+        result_index.update(model_identification, 0.8, load_summary(model_identification),
+                            load_details(model_identification), save=False)
+    result_index.save()
+    return result_index
+
+
+def test_model_statistics(result_index):
+    for model_identification in MODEL_IDENTIFICATIONS:
+        details = load_details(model_identification)
+        entry = result_index.get(model_identification)
+
+        assert entry.layers == len(details)
+        for metric in IndexMetricBins:
+            values = get_metric_values(details, metric)
+            statistics = entry.metrics[metric]
+            assert statistics.count == len(values)
+            assert statistics.mean == pytest.approx(values.mean())
+            assert statistics.std == pytest.approx(values.std(ddof=1))
+            assert statistics.min == values.min() and statistics.max == values.max()
+            numpy.testing.assert_allclose(statistics.quantiles, numpy.quantile(values, INDEX_QUANTILES))
+            assert sum(statistics.histogram) == len(values)
+
+
+def test_pooled_architecture_statistics(result_index):
+    aggregates = result_index.get_architecture_aggregates()
+
+    for architecture in ["ConvNeXt", "ResNetRS"]:
+        details = pandas.concat([
+            load_details(model_identification) for model_identification in MODEL_IDENTIFICATIONS
+            if model_identification.architecture.name == architecture
+        ])
+        row = aggregates.loc[architecture]
+        assert row[MODELS_COLUMN] == len([
+            model_identification for model_identification in MODEL_IDENTIFICATIONS
+            if model_identification.architecture.name == architecture
+        ])
+        assert row[LAYERS_COLUMN] == len(details)
+        for metric, bins in IndexMetricBins.items():
+            values = get_metric_values(details, metric)
+            # Pooled exactly from the per-model counts, means and standard deviations
+            assert row[f"{metric}_mean"] == pytest.approx(values.mean(), rel=1e-9)
+            assert row[f"{metric}_std"] == pytest.approx(values.std(ddof=1), rel=1e-9)
+            assert row[f"{metric}_min"] == values.min() and row[f"{metric}_max"] == values.max()
+            # Interpolated from the summed histograms, so only within the bin of the exact quantile
+            edges = numpy.log10(bins.edges) if bins.log else bins.edges
+            bin_width = edges[1] - edges[0]
+            for quantile in INDEX_QUANTILES:
+                pooled_quantile = row[f"{metric}_q{int(quantile * 100)}"]
+                exact_quantile = numpy.quantile(values, quantile)
+                if bins.log:
+                    pooled_quantile, exact_quantile = numpy.log10(pooled_quantile), numpy.log10(exact_quantile)
+                if edges[0] <= exact_quantile <= edges[-1]:
+                    assert abs(pooled_quantile - exact_quantile) <= bin_width, (metric, quantile)
+
+
+def test_histograms_add_up(result_index):
+    edges, histograms = result_index.get_histograms(WeightWatcherDetailsColumns.ALPHA.value)
+
+    assert len(edges) == IndexMetricBins[WeightWatcherDetailsColumns.ALPHA.value].bins + 1
+    assert sorted(histograms) == ["ConvNeXt", "ResNetRS"]
+    assert histograms["ResNetRS"].sum() == sum(
+        len(get_metric_values(load_details(model_identification), WeightWatcherDetailsColumns.ALPHA.value))
+        for model_identification in MODEL_IDENTIFICATIONS if model_identification.architecture.name == "ResNetRS"
+    )
+
+
+def test_single_layer_models_have_no_std(tmp_path):
+    result_index = ResultIndex(str(tmp_path / "index.json"))
+    model_identification = MODEL_IDENTIFICATIONS[0]
+    details = load_details(model_identification).iloc[:1]
+    result_index.update(model_identification, 0.8, load_summary(model_identification), details, save=False)
+
+    row = result_index.get_architecture_aggregates().loc["ConvNeXt"]
+    alpha = WeightWatcherDetailsColumns.ALPHA.value
+    assert row[f"{alpha}_mean"] == details[alpha].iloc[0]
+    assert numpy.isnan(row[f"{alpha}_std"])
+
+
+def test_save_and_load(result_index, tmp_path):
+    loaded_index = ResultIndex(str(tmp_path / "index.json"))
+
+    assert sorted(loaded_index.model_names) == sorted(result_index.model_names)
+    for model_identification in MODEL_IDENTIFICATIONS:
+        assert loaded_index.get(model_identification) == result_index.get(model_identification)
+    pandas.testing.assert_frame_equal(loaded_index.get_architecture_aggregates(),
+                                      result_index.get_architecture_aggregates())
+
+
+def test_invalidate(result_index, tmp_path):
+    result_index.invalidate(MODEL_IDENTIFICATIONS[0])
+
+    assert MODEL_IDENTIFICATIONS[0] not in result_index
+    assert MODEL_IDENTIFICATIONS[0] not in ResultIndex(str(tmp_path / "index.json"))
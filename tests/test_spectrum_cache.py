@@ -0,0 +1,80 @@
+import os
+
+import numpy
+
+from weight_watcher.SpectrumCache import SpectrumCache, SPECTRUM_FILE_EXTENSION
+
+
+def create_cache(tmp_path, entries: int, max_entries: int) -> SpectrumCache:
+    singular_values = numpy.arange(100, dtype=numpy.float64)
+    entry_size = 0
+    cache = SpectrumCache(str(tmp_path))
+    for index in range(entries):
+        key = f"key{index}"
+        cache.put(key, singular_values + index)
+        # Distinct access times, oldest first
+        path = os.path.join(tmp_path, key + SPECTRUM_FILE_EXTENSION)
+        os.utime(path, (1000 + index, 1000 + index))
+        entry_size = os.path.getsize(path)
+    return SpectrumCache(str(tmp_path), max_size_bytes=max_entries * entry_size)
+
+
+def test_put_and_get(tmp_path):
+    cache = SpectrumCache(str(tmp_path))
+    singular_values = numpy.linspace(0, 1, 50)
+    cache.put("key", singular_values)
+
+    numpy.testing.assert_array_equal(cache.get("key"), singular_values)
+    assert cache.get("missing") is None
+
+
+def test_get_key_depends_on_values_dtype_and_shape():
+    kernel = numpy.arange(12, dtype=numpy.float32).reshape(3, 4)
+
+    assert SpectrumCache.get_key(kernel) == SpectrumCache.get_key(kernel.copy())
+    assert SpectrumCache.get_key(kernel) != SpectrumCache.get_key(kernel.reshape(4, 3))
+    assert SpectrumCache.get_key(kernel) != SpectrumCache.get_key(kernel.astype(numpy.float64))
+    assert SpectrumCache.get_key(kernel) != SpectrumCache.get_key(kernel + 1)
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = create_cache(tmp_path, entries=4, max_entries=2)
+    # Reading the oldest entry makes it the most recently used one
+    assert cache.get("key0") is not None
+
+    cache.evict()
+
+    assert cache.get("key0") is not None
+    assert cache.get("key3") is not None
+    assert cache.get("key1") is None
+    assert cache.get("key2") is None
+
+
+def test_evict_keeps_cache_within_size(tmp_path):
+    cache = create_cache(tmp_path, entries=3, max_entries=3)
+
+    cache.evict()
+
+    assert all(cache.get(f"key{index}") is not None for index in range(3))
+
+
+def test_evict_without_directory(tmp_path):
+    SpectrumCache(str(tmp_path / "missing")).evict()
+
+
+def test_evict_applies_limit_across_root(tmp_path):
+    singular_values = numpy.arange(100, dtype=numpy.float64)
+    caches = [SpectrumCache(str(tmp_path / model / "esd")) for model in ["model0", "model1"]]
+    for index in range(4):
+        cache = caches[index % 2]
+        cache.put(f"key{index}", singular_values + index)
+        path = os.path.join(tmp_path, f"model{index % 2}", "esd", f"key{index}" + SPECTRUM_FILE_EXTENSION)
+        os.utime(path, (1000 + index, 1000 + index))
+    entry_size = os.path.getsize(path)
+
+    SpectrumCache(str(tmp_path / "model0" / "esd"), max_size_bytes=2 * entry_size, root_path=str(tmp_path)).evict()
+
+    assert caches[0].get("key0") is None
+    assert caches[1].get("key1") is None
+    assert caches[0].get("key2") is not None
+    assert caches[1].get("key3") is not None
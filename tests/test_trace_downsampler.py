@@ -0,0 +1,75 @@
+import numpy
+import pytest
+
+from visualization import TraceDownsampler, DownsamplingMethod
+
+
+def create_trace(length: int = 1000, seed: int = 0):
+    rng = numpy.random.default_rng(seed)
+    x = numpy.arange(length, dtype=numpy.float64)
+    y = numpy.sin(x / 50) + rng.normal(0, 0.05, length)
+    return x, y
+
+
+@pytest.mark.parametrize("method", list(DownsamplingMethod))
+def test_short_traces_are_kept(method):
+    x, y = create_trace(50)
+
+    numpy.testing.assert_array_equal(TraceDownsampler.downsample(x, y, 100, method), numpy.arange(50))
+
+
+def test_no_downsampling():
+    x, y = create_trace()
+
+    numpy.testing.assert_array_equal(TraceDownsampler.downsample(x, y, 100, DownsamplingMethod.NONE),
+                                     numpy.arange(1000))
+
+
+def test_lttb_selects_one_point_per_bucket():
+    x, y = create_trace()
+
+    indices = TraceDownsampler.lttb(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert numpy.all(numpy.diff(indices) > 0)
+
+
+def test_lttb_keeps_spikes():
+    x, y = create_trace()
+    y[500] = 10
+
+    assert 500 in TraceDownsampler.lttb(x, y, 50)
+
+
+def test_min_max_keeps_envelope():
+    x, y = create_trace()
+
+    indices = TraceDownsampler.min_max(y, 100)
+
+    assert len(indices) <= 102
+    assert indices[0] == 0 and indices[-1] == 999
+    assert numpy.argmin(y) in indices and numpy.argmax(y) in indices
+    for bucket in numpy.array_split(numpy.arange(1000), 50):
+        assert bucket[numpy.argmin(y[bucket])] in indices
+        assert bucket[numpy.argmax(y[bucket])] in indices
+
+
+def test_outliers_are_kept():
+    x, y = create_trace()
+    outliers = [100, 333, 777]
+    y[outliers] = [20, -20, 30]
+
+    for method in [DownsamplingMethod.LTTB, DownsamplingMethod.MIN_MAX]:
+        indices = TraceDownsampler.downsample(x, y, 20, method)
+
+        assert set(outliers) <= set(indices)
+        assert numpy.all(numpy.diff(indices) > 0)
+
+
+def test_get_outliers_keeps_the_most_extreme():
+    y = numpy.zeros(100)
+    y[[1, 2, 3]] = [5, 50, -10]
+    y[10:90] = numpy.linspace(-1, 1, 80)
+
+    assert sorted(TraceDownsampler.get_outliers(y, 2)) == [2, 3]
@@ -0,0 +1,37 @@
+import dataclasses
+
+import pandas
+
+from models import ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import WeightWatcherResultHandle
+
+MODEL_IDENTIFICATION = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Tiny"))
+
+
+def create_handle(loads: list) -> WeightWatcherResultHandle:
+    def load_details():
+        loads.append(1)
+        return pandas.DataFrame({"alpha": [3.0, 4.0]})
+
+    return WeightWatcherResultHandle(MODEL_IDENTIFICATION, 0.8, pandas.DataFrame({"alpha": [3.5]}), load_details)
+
+
+def test_details_are_loaded_on_access():
+    loads = []
+    handle = create_handle(loads)
+
+    assert list(handle.details["alpha"]) == [3.0, 4.0]
+    assert len(loads) == 1
+
+
+def test_generated_methods_do_not_load_details():
+    loads = []
+    handle = create_handle(loads)
+
+    assert repr(handle) == "WeightWatcherResultHandle(ConvNeXt:Tiny)"
+    assert handle == handle
+    assert handle != create_handle(loads)
+    replaced_handle = dataclasses.replace(handle, model_accuracy=0.9)
+    assert replaced_handle.model_accuracy == 0.9
+    assert replaced_handle.details_loader is handle.details_loader
+    assert not loads
@@ -0,0 +1,57 @@
+import json
+from types import SimpleNamespace
+
+from models import ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import WeightWatcherResultManifest
+
+MODEL_IDENTIFICATION = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("Tiny"))
+RESULT_OPTIONS = {
+    "engine": "LAYER_PARALLEL",
+    "weights_source": "WEIGHTS_FILE",
+    "min_evals": 50,
+    "max_evals": 10000,
+    "approximate_min_rank": None,
+    "precision": "FLOAT64",
+    "float32_tail_tolerance": 0.001,
+}
+
+
+def create_model_wrapper(tmp_path):
+    weights_path = tmp_path / "weights.h5"
+    weights_path.write_bytes(b"weights")
+    return SimpleNamespace(identification=MODEL_IDENTIFICATION, weights_path=str(weights_path))
+
+
+def test_entry_depends_on_result_options(tmp_path):
+    manifest = WeightWatcherResultManifest(str(tmp_path / "manifest.json"))
+    model_wrapper = create_model_wrapper(tmp_path)
+    entry = manifest.create_entry(model_wrapper, "0.6.1", "LAYER_PARALLEL", RESULT_OPTIONS)
+    manifest.update(MODEL_IDENTIFICATION, entry)
+
+    reordered_options = dict(reversed(list(RESULT_OPTIONS.items())))
+    changed_options = [{**RESULT_OPTIONS, "min_evals": 10}, {**RESULT_OPTIONS, "approximate_min_rank": 1024},
+                       {**RESULT_OPTIONS, "precision": "FLOAT32"}]
+    loaded_manifest = WeightWatcherResultManifest(str(tmp_path / "manifest.json"))
+    assert loaded_manifest.get(MODEL_IDENTIFICATION) == entry
+    assert loaded_manifest.create_entry(model_wrapper, "0.6.1", "LAYER_PARALLEL", reordered_options) == entry
+    for options in changed_options:
+        assert loaded_manifest.create_entry(model_wrapper, "0.6.1", "LAYER_PARALLEL", options) != entry
+
+
+def test_entries_without_options_hash_are_outdated(tmp_path):
+    model_wrapper = create_model_wrapper(tmp_path)
+    entry = WeightWatcherResultManifest(str(tmp_path / "manifest.json")) \
+        .create_entry(model_wrapper, "0.6.1", "LAYER_PARALLEL", RESULT_OPTIONS)
+    raw_entry = {key: value for key, value in vars(entry).items() if key != "options_hash"}
+    (tmp_path / "manifest.json").write_text(json.dumps({str(MODEL_IDENTIFICATION): raw_entry}))
+
+    manifest = WeightWatcherResultManifest(str(tmp_path / "manifest.json"))
+    assert manifest.get(MODEL_IDENTIFICATION).options_hash is None
+    assert manifest.get(MODEL_IDENTIFICATION) != entry
+
+
+def test_missing_weights_have_no_entry(tmp_path):
+    manifest = WeightWatcherResultManifest(str(tmp_path / "manifest.json"))
+    model_wrapper = SimpleNamespace(identification=MODEL_IDENTIFICATION, weights_path=str(tmp_path / "missing.h5"))
+
+    assert manifest.create_entry(model_wrapper, "0.6.1", "LAYER_PARALLEL", RESULT_OPTIONS) is None
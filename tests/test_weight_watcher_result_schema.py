@@ -0,0 +1,75 @@
+import os.path
+
+import numpy
+import pandas
+import pytest
+
+from weight_watcher.WeightWatcherResultSchema import WeightWatcherResultSchema, DETAILS_DTYPES, CATEGORY, \
+    OPTIONAL_DETAILS_COLUMNS
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "results")
+
+ARCHITECTURE = WeightWatcherDetailsColumns.ARCHITECTURE.value
+LAYER_TYPE = WeightWatcherDetailsColumns.LAYER_TYPE.value
+
+
+def load_details(architecture: str, variant: str) -> pandas.DataFrame:
+    details = pandas.read_csv(os.path.join(RESULTS_PATH, architecture, variant, "details.csv"))
+    details = WeightWatcherResultSchema.apply_to_details(details)
+    details[ARCHITECTURE] = WeightWatcherResultSchema.get_constant_categorical(architecture, len(details))
+    return details
+
+
+def test_apply_to_details():
+    details = WeightWatcherResultSchema.apply_to_details(
+        pandas.read_csv(os.path.join(RESULTS_PATH, "ConvNeXt", "Tiny", "details.csv"))
+    )
+
+    assert "Unnamed: 0" not in details.columns
+    for column in OPTIONAL_DETAILS_COLUMNS:
+        assert column in details.columns
+    for column, dtype in DETAILS_DTYPES.items():
+        if column in details.columns:
+            assert str(details[column].dtype) == dtype, column
+
+
+def test_apply_to_details_requires_the_columns():
+    details = pandas.read_csv(os.path.join(RESULTS_PATH, "ConvNeXt", "Tiny", "details.csv"))
+
+    with pytest.raises(ValueError, match=WeightWatcherDetailsColumns.ALPHA.value):
+        WeightWatcherResultSchema.apply_to_details(details.drop(columns=[WeightWatcherDetailsColumns.ALPHA.value]))
+
+
+def test_concat_unifies_categories():
+    frames = [load_details("ResNetRS", "RS50"), load_details("ConvNeXt", "Tiny"), load_details("EfficientNet", "B0")]
+
+    details = WeightWatcherResultSchema.concat(frames, ignore_index=True)
+
+    assert len(details) == sum(len(frame) for frame in frames)
+    for column, dtype in DETAILS_DTYPES.items():
+        if dtype == CATEGORY and column in details.columns:
+            assert details[column].dtype == CATEGORY, column
+            categories = list(details[column].cat.categories)
+            assert categories == sorted(categories)
+    assert list(details[ARCHITECTURE].cat.categories) == ["ConvNeXt", "EfficientNet", "ResNetRS"]
+    # The values are unchanged, only their codes
+    expected = pandas.concat([frame.astype({LAYER_TYPE: str, ARCHITECTURE: str}) for frame in frames],
+                             ignore_index=True)
+    assert list(details[ARCHITECTURE].astype(str)) == list(expected[ARCHITECTURE])
+    assert list(details[LAYER_TYPE].astype(str)) == list(expected[LAYER_TYPE])
+    numpy.testing.assert_array_equal(details[WeightWatcherDetailsColumns.ALPHA.value],
+                                     expected[WeightWatcherDetailsColumns.ALPHA.value])
+
+
+def test_concat_does_not_change_the_frames():
+    frames = [load_details("ResNetRS", "RS50"), load_details("ConvNeXt", "Tiny")]
+
+    WeightWatcherResultSchema.concat(frames)
+
+    assert list(frames[0][ARCHITECTURE].cat.categories) == ["ResNetRS"]
+    assert list(frames[1][ARCHITECTURE].cat.categories) == ["ConvNeXt"]
+
+
+def test_concat_of_no_frames():
+    assert WeightWatcherResultSchema.concat([]).empty
@@ -0,0 +1,55 @@
+import math
+
+import numpy
+import pandas
+import pytest
+
+from models import ModelRegistry, RegisteredModelWrapper, ModelIdentification, ModelArchitecture, ModelVariant
+from weight_watcher import LayerAnalysisEngine, LayerWeights, LayerType, WeightWatcherResult, \
+    WeightWatcherResultService, ResultStorageFormat
+from weight_watcher.WeightWatcherResult import WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+from weight_watcher.WeightWatcherResultService import PARTIAL_SUMMARY_COLUMNS
+
+# Registered at runtime without an accuracy, like models loaded from a SavedModel directory
+RUNTIME_MODEL = ModelRegistry.register_saved_model("RuntimeNet", "Tiny", "runtime_net")
+UNREGISTERED_MODEL = ModelIdentification(ModelArchitecture("ConvNeXt"), ModelVariant("FineTuned"))
+
+
+def create_result() -> WeightWatcherResult:
+    rng = numpy.random.default_rng(0)
+    details = LayerAnalysisEngine().analyze_layers([
+        LayerWeights(0, "dense", LayerType.DENSE, rng.standard_t(3, (256, 128)).astype(numpy.float32)),
+    ])
+    summary = pandas.DataFrame([details[PARTIAL_SUMMARY_COLUMNS].mean()])
+    model_wrapper = RegisteredModelWrapper(ModelRegistry.get(RUNTIME_MODEL))
+    return WeightWatcherResult(RUNTIME_MODEL, model_wrapper.top_1_accuracy, summary, details)
+
+
+@pytest.mark.parametrize("storage_format", list(ResultStorageFormat))
+def test_save_and_load_model_without_accuracy(tmp_path, storage_format):
+    result_service = WeightWatcherResultService(str(tmp_path), storage_format)
+    result_service.save(create_result())
+
+    result = result_service.load(RUNTIME_MODEL)
+    assert math.isnan(result.model_accuracy)
+    assert result.details[WeightWatcherDetailsColumns.ACCURACY.value].isna().all()
+    assert len(result.details) == 1
+    [handle] = result_service.load_all_handles()
+    assert math.isnan(handle.model_accuracy)
+    summaries = result_service.get_result_index().get_summaries([RUNTIME_MODEL])
+    assert summaries[WeightWatcherSummaryColumns.ACCURACY.value].isna().all()
+    # The index file is read again by a new service
+    reloaded_index = WeightWatcherResultService(str(tmp_path), storage_format).get_result_index()
+    assert math.isnan(reloaded_index.get(RUNTIME_MODEL).accuracy)
+
+
+@pytest.mark.parametrize("storage_format", list(ResultStorageFormat))
+def test_load_skips_unregistered_variants(tmp_path, storage_format):
+    result_service = WeightWatcherResultService(str(tmp_path), storage_format)
+    result = create_result()
+    result_service.save(result)
+    # Results of a variant that another process registered at runtime on a built-in architecture
+    result_service.save(WeightWatcherResult(UNREGISTERED_MODEL, result.model_accuracy, result.summary, result.details))
+
+    assert [result.model_identification for result in result_service.load_all()] == [RUNTIME_MODEL]
+    assert [handle.model_identification for handle in result_service.load_all_handles()] == [RUNTIME_MODEL]
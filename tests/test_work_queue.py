@@ -0,0 +1,194 @@
+import multiprocessing
+import os.path
+import time
+from types import SimpleNamespace
+
+from weight_watcher import WorkQueue, WorkItem, QueueWorker
+from weight_watcher.WorkQueue import CLAIMED_DIRECTORY
+
+# Short leases, so expired ones are noticed within the tests
+LEASE_SECONDS = 1.0
+POLL_SECONDS = 0.05
+TIMEOUT_SECONDS = 60
+
+
+class StubAnalysisService:
+    # Stands in for the WeightWatcherService of the workers, the options of the items control what it does
+    def __init__(self, item: WorkItem):
+        self._item = item
+
+    def analyze_model_leased(self, model_wrapper):
+        options = self._item.options
+        if options.get("hang_marker") is not None and self._item.attempts == 0:
+            # The first attempt never finishes, until the worker is killed
+            with open(options["hang_marker"], "w"):
+                pass
+            time.sleep(TIMEOUT_SECONDS)
+        if options.get("fail"):
+            raise RuntimeError("The analysis failed")
+        time.sleep(options.get("seconds", 0))
+        return SimpleNamespace(model_identification=model_wrapper.identification)
+
+
+class StubResultService:
+    # Appends the worker to a file per model, so every analysis of a model leaves a line
+    def __init__(self, results_path: str, worker_id: str):
+        self._results_path = results_path
+        self._worker_id = worker_id
+
+    def save(self, result):
+        with open(os.path.join(self._results_path, str(result.model_identification)), "a") as result_file:
+            result_file.write(self._worker_id + "\n")
+
+    def remove_partial(self, model_identification):
+        pass
+
+
+class StubQueueWorker(QueueWorker):
+    def _get_weight_watcher_service(self, item: WorkItem):
+        return StubAnalysisService(item)
+
+    @staticmethod
+    def _get_model_wrapper(item: WorkItem):
+        return SimpleNamespace(identification=item.model_identification)
+
+
+def run_stub_worker(queue_path: str, results_path: str, worker_id: str):
+    work_queue = WorkQueue(queue_path, LEASE_SECONDS)
+    StubQueueWorker(work_queue, StubResultService(results_path, worker_id), worker_id, POLL_SECONDS).run()
+
+
+def start_worker(queue_path: str, results_path: str, worker_id: str) -> multiprocessing.Process:
+    # Spawned like the local workers of analyze.py
+    worker = multiprocessing.get_context("spawn").Process(
+        target=run_stub_worker,
+        args=(queue_path, results_path, worker_id)
+    )
+    worker.start()
+    return worker
+
+
+def get_analyses(results_path: str, item: WorkItem):
+    try:
+        with open(os.path.join(results_path, str(item.model_identification))) as result_file:
+            return result_file.read().split()
+    except FileNotFoundError:
+        return []
+
+
+def create_queue(tmp_path, lease_seconds: float = LEASE_SECONDS, max_attempts: int = 3):
+    results_path = tmp_path / "results"
+    results_path.mkdir(exist_ok=True)
+    return WorkQueue(str(tmp_path / "queue"), lease_seconds, max_attempts), str(results_path)
+
+
+def wait_for(condition, timeout: float = TIMEOUT_SECONDS):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(POLL_SECONDS)
+
+
+def test_put_skips_queued_items(tmp_path):
+    work_queue, _ = create_queue(tmp_path)
+
+    assert work_queue.put(WorkItem("ConvNeXt", "Tiny", {}))
+    assert not work_queue.put(WorkItem("ConvNeXt", "Tiny", {}))
+    claimed_item = work_queue.claim("worker")
+    assert not work_queue.put(WorkItem("ConvNeXt", "Tiny", {}))
+    assert work_queue.claim("other") is None
+
+    assert work_queue.complete(claimed_item)
+    assert work_queue.is_drained()
+    assert work_queue.put(WorkItem("ConvNeXt", "Tiny", {}))
+    assert work_queue.get_done() == []
+
+
+def test_every_item_is_analyzed_exactly_once(tmp_path):
+    work_queue, results_path = create_queue(tmp_path)
+    items = [WorkItem("Model", f"v{index}", {"seconds": 0.05}) for index in range(12)]
+    items.append(WorkItem("Model", "failing", {"fail": True}))
+    for item in items:
+        assert work_queue.put(item)
+
+    workers = [start_worker(work_queue.queue_path, results_path, f"worker{index}") for index in range(3)]
+    for worker in workers:
+        worker.join(TIMEOUT_SECONDS)
+        assert worker.exitcode == 0
+
+    assert work_queue.is_drained()
+    for item in items[:-1]:
+        assert len(get_analyses(results_path, item)) == 1
+    assert sorted(item.variant for item in work_queue.get_done()) == sorted(item.variant for item in items[:-1])
+    failed_items = work_queue.get_failed()
+    assert [item.variant for item in failed_items] == ["failing"]
+    assert "The analysis failed" in failed_items[0].error
+    assert get_analyses(results_path, items[-1]) == []
+
+
+def test_item_of_killed_worker_is_analyzed_again(tmp_path):
+    work_queue, results_path = create_queue(tmp_path)
+    hang_marker = str(tmp_path / "hanging")
+    item = WorkItem("Model", "hanging", {"hang_marker": hang_marker})
+    work_queue.put(item)
+
+    killed_worker = start_worker(work_queue.queue_path, results_path, "killed")
+    wait_for(lambda: os.path.exists(hang_marker))
+    killed_worker.kill()
+    killed_worker.join(TIMEOUT_SECONDS)
+    assert work_queue.get_counts()[CLAIMED_DIRECTORY] == 1
+
+    worker = start_worker(work_queue.queue_path, results_path, "worker")
+    worker.join(TIMEOUT_SECONDS)
+    assert worker.exitcode == 0
+
+    assert get_analyses(results_path, item) == ["worker"]
+    done_items = work_queue.get_done()
+    assert len(done_items) == 1
+    assert done_items[0].attempts == 1
+
+
+def test_heartbeat_keeps_the_lease(tmp_path):
+    work_queue, _ = create_queue(tmp_path, lease_seconds=0.3)
+    work_queue.put(WorkItem("Model", "v0", {}))
+
+    claimed_item = work_queue.claim("worker")
+    with work_queue.keep_alive(claimed_item):
+        for _ in range(10):
+            time.sleep(0.1)
+            assert work_queue.requeue_expired() == 0
+
+    assert not claimed_item.lease_lost.is_set()
+    assert work_queue.complete(claimed_item)
+
+
+def test_expired_lease_is_lost(tmp_path):
+    work_queue, _ = create_queue(tmp_path, lease_seconds=0.3)
+    work_queue.put(WorkItem("Model", "v0", {}))
+
+    claimed_item = work_queue.claim("worker")
+    time.sleep(0.4)
+    assert work_queue.requeue_expired() == 1
+    with work_queue.keep_alive(claimed_item):
+        wait_for(claimed_item.lease_lost.is_set, timeout=5)
+
+    assert not work_queue.complete(claimed_item)
+    requeued_item = work_queue.claim("other")
+    assert requeued_item.item.attempts == 1
+    assert work_queue.complete(requeued_item)
+
+
+def test_items_fail_after_max_attempts(tmp_path):
+    work_queue, _ = create_queue(tmp_path, lease_seconds=0.05, max_attempts=2)
+    work_queue.put(WorkItem("Model", "v0", {}))
+
+    for expected_requeued_items in [1, 0]:
+        assert work_queue.claim("worker") is not None
+        time.sleep(0.1)
+        assert work_queue.requeue_expired() == expected_requeued_items
+
+    assert work_queue.is_drained()
+    failed_items = work_queue.get_failed()
+    assert len(failed_items) == 1
+    assert failed_items[0].attempts == 2
+    assert "expired 2 times" in failed_items[0].error
@@ -1,21 +1,32 @@
-from typing import List, Optional
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any
 
 from jupyter_dash import JupyterDash
 import dash_core_components as dcc
 import dash_html_components as html
 from dash import Input, Output
-import plotly.graph_objects as go
+
+from .FigureSpec import FigureSpec
+
+DEFAULT_MAX_CACHED_FIGURES = 32
 
 
 class DashboardService:
-    def __init__(self):
+    def __init__(self, max_cached_figures: int = DEFAULT_MAX_CACHED_FIGURES):
         self._app = JupyterDash(__name__)
-        self._figures: Optional[List[go.Figure]] = None
-        self._active_figure: Optional[go.Figure] = None
+        self._figure_specs: Optional[List[FigureSpec]] = None
+        # The most recently displayed figures as plain JSON dicts, which Dash serializes without validating the figure
+        # again. The least recently used one is dropped first.
+        self._figure_cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._max_cached_figures = max_cached_figures
+        self._figure_cache_lock = threading.Lock()
 
-    def build_dashboard(self, figures: List[go.Figure]):
-        self._figures = figures
-        figure_mapping = {figure.layout.title.text: index for index, figure in enumerate(self._figures)}
+    def build_dashboard(self, figure_specs: List[FigureSpec]):
+        self._figure_specs = figure_specs
+        with self._figure_cache_lock:
+            self._figure_cache.clear()
         self._app.layout = html.Div([
             html.H1("Visual analysis"),
             html.Label([
@@ -24,19 +35,32 @@ class DashboardService:
                     id='plot-dropdown',
                     clearable=False,
                     value=0,
-                    options=[{'label': key, 'value': value} for key, value in figure_mapping.items()])
+                    options=[{'label': spec.title, 'value': index} for index, spec in enumerate(self._figure_specs)])
             ]),
             dcc.Graph(id='main-graph'),
         ])
 
-        # Define callback to update graph
+        # Define callback to update graph, the figure is only built once it is selected
         @self._app.callback(
             Output('main-graph', 'figure'),
             Input("plot-dropdown", "value")
         )
-        def display_figure(figure_title: int):
-            self._active_figure = self._figures[figure_title]
-            return self._active_figure
+        def display_figure(figure_index: int):
+            return self.get_figure_dict(figure_index)
+
+    def get_figure_dict(self, figure_index: int) -> Dict[str, Any]:
+        with self._figure_cache_lock:
+            if figure_index in self._figure_cache:
+                self._figure_cache.move_to_end(figure_index)
+                return self._figure_cache[figure_index]
+
+        # Converted once through JSON, so the cached dict holds lists instead of numpy arrays and plotly objects
+        figure_dict = json.loads(self._figure_specs[figure_index].factory().to_json())
+        with self._figure_cache_lock:
+            self._figure_cache[figure_index] = figure_dict
+            while len(self._figure_cache) > self._max_cached_figures:
+                self._figure_cache.popitem(last=False)
+        return figure_dict
 
     def show_dashboard(self, external: bool = False):
         # Run app and display result inline in the notebook
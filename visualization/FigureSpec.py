@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import plotly.graph_objects as go
+
+
+@dataclass
+class FigureSpec:
+    title: str
+    factory: Callable[[], go.Figure]
@@ -1,13 +1,21 @@
+import functools
 import math
-from typing import List, Dict
+from enum import Enum, auto
+from typing import List, Dict, Optional, Tuple, Callable
 
+import numpy
 import pandas
+from numpy import ndarray
 from pandas import DataFrame
 from plotly.subplots import make_subplots
 import plotly.express as px
 import plotly.graph_objects as go
 
-from weight_watcher import WeightWatcherResult, WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+from services import Instrumentation, InstrumentationStage
+from weight_watcher import WeightWatcherResult, WeightWatcherDetailsColumns, WeightWatcherSummaryColumns, \
+    WeightWatcherResultSchema, ResultIndex, IndexMetricBins, CheckpointColumns
+from .FigureSpec import FigureSpec
+from .TraceDownsampler import TraceDownsampler, DownsamplingMethod
 
 RELEVANT_DETAILS_COLUMNS = [
     WeightWatcherDetailsColumns.ALPHA.value,
@@ -38,12 +46,121 @@ RELEVANT_SUMMARY_COLUMNS = [
 ]
 
 COLUMNS_SUMMARY_FIGURE = 1
+COLUMNS_AGGREGATES_FIGURE = 1
+COLUMNS_CHECKPOINTS_FIGURE = 1
+
+CHECKPOINT_LAYER_METRICS = [
+    WeightWatcherDetailsColumns.ALPHA.value,
+    WeightWatcherDetailsColumns.LOG_NORM.value,
+]
 COLUMNS_DETAILS_FIGURE = 1
 
 COLORS = px.colors.qualitative.Plotly
 
+# Above this number of points per subplot, SVG rendering becomes sluggish in the browser
+WEBGL_POINT_THRESHOLD = 1000
+DEFAULT_MAX_POINTS_PER_TRACE = 2000
+
+
+class RenderingMode(Enum):
+    AUTO = auto()
+    SVG = auto()
+    WEBGL = auto()
+
 
 class PlottingService:
+    @staticmethod
+    def create_figure_specs(
+            results: List[WeightWatcherResult],
+            result_index: Optional[ResultIndex] = None
+    ) -> List[FigureSpec]:
+        # Same figures as the create_*_figure(s) methods, but nothing is built until a factory is called. The
+        # summaries are concatenated once for all summary figures and, given an index, the aggregates over the layers
+        # of every architecture are plotted from it without reading any details.
+        results_per_architecture = PlottingService.group_results_by_architecture(results)
+        summaries = PlottingService.get_summaries(results, result_index)
+        architecture_summaries = dict(list(summaries.groupby(WeightWatcherSummaryColumns.ARCHITECTURE.value,
+                                                             observed=True, sort=False)))
+        specs = [
+            FigureSpec("Summary [all]", functools.partial(
+                PlottingService.create_summaries_figure_from_frame, summaries, group_by_variant=False
+            ))
+        ]
+        specs += [
+            FigureSpec(f"Summary [{architecture_name}]", functools.partial(
+                PlottingService.create_summaries_figure_from_frame,
+                architecture_summaries[architecture_name],
+                group_by_architecture=False,
+                group_by_variant=True,
+                figure_title=f"Summary [{architecture_name}]"
+            ))
+            for architecture_name in results_per_architecture
+        ]
+        if result_index is not None:
+            specs += [
+                FigureSpec("Aggregates [all]", functools.partial(
+                    PlottingService.create_architecture_aggregates_figure, result_index
+                )),
+                FigureSpec("Histograms [all]", functools.partial(
+                    PlottingService.create_histograms_figure, result_index
+                )),
+            ]
+        specs += [
+            FigureSpec("Details [all]", functools.partial(
+                PlottingService.create_details_figure,
+                results,
+                group_by_architecture=True,
+                group_by_variant=False,
+                downsampling=DownsamplingMethod.MIN_MAX
+            ))
+        ]
+        specs += [
+            FigureSpec(f"Details [{architecture_name}]", functools.partial(
+                PlottingService.create_details_figure,
+                architecture_results,
+                lines=True,
+                group_by_architecture=False,
+                group_by_variant=True,
+                figure_title=f"Details [{architecture_name}]"
+            ))
+            for architecture_name, architecture_results in results_per_architecture.items()
+        ]
+        specs += [
+            FigureSpec(f"Details [{result.model_identification}]", functools.partial(
+                PlottingService.create_details_figure,
+                [result],
+                lines=True,
+                group_by_architecture=True,
+                group_by_variant=True,
+                figure_title=f"Details [{result.model_identification}]"
+            ))
+            for result in results
+        ]
+        return specs
+
+    @staticmethod
+    def create_checkpoint_figure_specs(
+            summaries: DataFrame,
+            load_details: Callable[[str], DataFrame]
+    ) -> List[FigureSpec]:
+        # The summary metrics of all training runs over their steps, and per run the metrics of every layer
+        series_names = summaries[CheckpointColumns.SERIES.value].unique().tolist() if len(summaries) > 0 else []
+        specs = [
+            FigureSpec("Checkpoints [all]", functools.partial(
+                PlottingService.create_checkpoint_series_figure, summaries
+            ))
+        ]
+        specs += [
+            FigureSpec(f"Checkpoints [{series_name}]", lambda series_name=series_name: (
+                PlottingService.create_checkpoint_layers_figure(
+                    load_details(series_name),
+                    figure_title=f"Checkpoints [{series_name}]"
+                )
+            ))
+            for series_name in series_names
+        ]
+        return specs
+
     @staticmethod
     def create_summaries_per_architecture_figures(results: List[WeightWatcherResult]) -> List[go.Figure]:
         figures = []
@@ -64,18 +181,37 @@ class PlottingService:
             group_by_variant=True,
             figure_title: str = "Summary [all]"
     ) -> go.Figure:
-        df = pandas.concat([result.summary for result in results])
-        names, trace_dfs = PlottingService.split_dataframe(df, group_by_architecture, group_by_variant)
+        return PlottingService.create_summaries_figure_from_frame(
+            WeightWatcherResultSchema.concat([result.summary for result in results]),
+            group_by_architecture,
+            group_by_variant,
+            figure_title
+        )
+
+    @staticmethod
+    @Instrumentation.timed(InstrumentationStage.FIGURE)
+    def create_summaries_figure_from_frame(
+            df: DataFrame,
+            group_by_architecture=True,
+            group_by_variant=True,
+            figure_title: str = "Summary [all]"
+    ) -> go.Figure:
+        order, names, bounds = PlottingService.group_rows(df, group_by_architecture, group_by_variant)
+        df = df.iloc[order]
+        labels = PlottingService.get_labels(df)
+        accuracies = df[WeightWatcherSummaryColumns.ACCURACY.value].to_numpy()
         rows = math.ceil(len(RELEVANT_SUMMARY_COLUMNS) / float(COLUMNS_SUMMARY_FIGURE))
         fig = make_subplots(rows=rows, cols=COLUMNS_SUMMARY_FIGURE)
+        traces, trace_rows, trace_cols = [], [], []
         for column_index, column_key in enumerate(RELEVANT_SUMMARY_COLUMNS):
             col = (column_index % COLUMNS_SUMMARY_FIGURE) + 1
             row = (column_index // COLUMNS_SUMMARY_FIGURE) + 1
-            for name, df in zip(names, trace_dfs):
-                scatter = go.Scatter(
-                    x=df[column_key],
-                    y=df[WeightWatcherSummaryColumns.ACCURACY.value],
-                    text=df[WeightWatcherSummaryColumns.ARCHITECTURE.value] + ":" + df[WeightWatcherSummaryColumns.VARIANT.value],
+            values = df[column_key].to_numpy()
+            for name, (start, end) in zip(names, bounds):
+                traces.append(go.Scatter(
+                    x=values[start:end],
+                    y=accuracies[start:end],
+                    text=labels[start:end],
                     mode="markers+text",
                     marker=dict(
                         size=10,
@@ -84,14 +220,169 @@ class PlottingService:
                     legendgrouptitle={"text": column_key},
                     name=name,
                     showlegend=True,
-                )
-                fig.add_trace(scatter, row=row, col=col)
-                fig.update_xaxes(title_text=column_key, row=row, col=col)
+                ))
+                trace_rows.append(row)
+                trace_cols.append(col)
+            fig.update_xaxes(title_text=column_key, row=row, col=col)
+        fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
         fig.update_yaxes(title_text="accuracy")
         fig.update_layout(title_text=figure_title, height=rows * 750)
         fig.update_traces(textposition='top center')
         return fig
 
+    @staticmethod
+    @Instrumentation.timed(InstrumentationStage.FIGURE)
+    def create_architecture_aggregates_figure(
+            result_index: ResultIndex,
+            figure_title: str = "Aggregates [all]"
+    ) -> go.Figure:
+        # One box per architecture and metric drawn from the statistics in the index: the whiskers end at the 10th and
+        # 90th percentile, as the index keeps no outliers
+        aggregates = result_index.get_architecture_aggregates(RELEVANT_DETAILS_COLUMNS)
+        architecture_names = aggregates.index.tolist()
+        rows = math.ceil(len(RELEVANT_DETAILS_COLUMNS) / float(COLUMNS_AGGREGATES_FIGURE))
+        fig = make_subplots(rows=rows, cols=COLUMNS_AGGREGATES_FIGURE)
+        traces, trace_rows, trace_cols = [], [], []
+        for metric_index, metric_key in enumerate(RELEVANT_DETAILS_COLUMNS):
+            col = (metric_index % COLUMNS_AGGREGATES_FIGURE) + 1
+            row = (metric_index // COLUMNS_AGGREGATES_FIGURE) + 1
+            for architecture_index, architecture_name in enumerate(architecture_names):
+                traces.append(go.Box(
+                    x=[architecture_name],
+                    q1=[aggregates.at[architecture_name, f"{metric_key}_q25"]],
+                    median=[aggregates.at[architecture_name, f"{metric_key}_q50"]],
+                    q3=[aggregates.at[architecture_name, f"{metric_key}_q75"]],
+                    lowerfence=[aggregates.at[architecture_name, f"{metric_key}_q10"]],
+                    upperfence=[aggregates.at[architecture_name, f"{metric_key}_q90"]],
+                    mean=[aggregates.at[architecture_name, f"{metric_key}_mean"]],
+                    sd=[aggregates.at[architecture_name, f"{metric_key}_std"]],
+                    marker_color=COLORS[architecture_index % len(COLORS)],
+                    legendgroup=architecture_name,
+                    name=architecture_name,
+                    showlegend=metric_index == 0,
+                ))
+                trace_rows.append(row)
+                trace_cols.append(col)
+            fig.update_yaxes(title_text=metric_key, row=row, col=col)
+        fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
+        fig.update_layout(title_text=figure_title, height=rows * 400)
+        return fig
+
+    @staticmethod
+    @Instrumentation.timed(InstrumentationStage.FIGURE)
+    def create_histograms_figure(
+            result_index: ResultIndex,
+            figure_title: str = "Histograms [all]"
+    ) -> go.Figure:
+        # The layer histograms of every architecture, summed up from the histograms of its models in the index
+        rows = math.ceil(len(RELEVANT_DETAILS_COLUMNS) / float(COLUMNS_AGGREGATES_FIGURE))
+        fig = make_subplots(rows=rows, cols=COLUMNS_AGGREGATES_FIGURE)
+        traces, trace_rows, trace_cols = [], [], []
+        for metric_index, metric_key in enumerate(RELEVANT_DETAILS_COLUMNS):
+            col = (metric_index % COLUMNS_AGGREGATES_FIGURE) + 1
+            row = (metric_index // COLUMNS_AGGREGATES_FIGURE) + 1
+            edges, histograms = result_index.get_histograms(metric_key)
+            log = IndexMetricBins[metric_key].log
+            centers = numpy.sqrt(edges[:-1] * edges[1:]) if log else (edges[:-1] + edges[1:]) / 2
+            for architecture_index, (architecture_name, histogram) in enumerate(histograms.items()):
+                traces.append(go.Bar(
+                    x=centers,
+                    y=histogram,
+                    marker_color=COLORS[architecture_index % len(COLORS)],
+                    opacity=0.6,
+                    legendgroup=architecture_name,
+                    name=architecture_name,
+                    showlegend=metric_index == 0,
+                ))
+                trace_rows.append(row)
+                trace_cols.append(col)
+            fig.update_xaxes(title_text=metric_key, type="log" if log else "linear", row=row, col=col)
+        fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
+        fig.update_yaxes(title_text="layers")
+        fig.update_layout(title_text=figure_title, height=rows * 400, barmode="overlay", bargap=0)
+        return fig
+
+    @staticmethod
+    @Instrumentation.timed(InstrumentationStage.FIGURE)
+    def create_checkpoint_series_figure(
+            summaries: DataFrame,
+            figure_title: str = "Checkpoints [all]"
+    ) -> go.Figure:
+        # One line per training run and summary metric against the step of the checkpoints
+        df = summaries.sort_values([CheckpointColumns.SERIES.value, CheckpointColumns.STEP.value], kind="stable")
+        rows = math.ceil(len(RELEVANT_SUMMARY_COLUMNS) / float(COLUMNS_CHECKPOINTS_FIGURE))
+        fig = make_subplots(rows=rows, cols=COLUMNS_CHECKPOINTS_FIGURE)
+        traces, trace_rows, trace_cols = [], [], []
+        for column_index, column_key in enumerate(RELEVANT_SUMMARY_COLUMNS):
+            col = (column_index % COLUMNS_CHECKPOINTS_FIGURE) + 1
+            row = (column_index // COLUMNS_CHECKPOINTS_FIGURE) + 1
+            for series_name, series in df.groupby(CheckpointColumns.SERIES.value, observed=True, sort=True):
+                traces.append(go.Scatter(
+                    x=series[CheckpointColumns.STEP.value].to_numpy(),
+                    y=series[column_key].to_numpy(),
+                    mode="markers+lines",
+                    marker=dict(
+                        size=4,
+                    ),
+                    legendgroup=column_key,
+                    legendgrouptitle={"text": column_key},
+                    name=str(series_name),
+                    showlegend=True,
+                ))
+                trace_rows.append(row)
+                trace_cols.append(col)
+            fig.update_yaxes(title_text=column_key, row=row, col=col)
+        fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
+        fig.update_xaxes(title_text=CheckpointColumns.STEP.value)
+        fig.update_layout(title_text=figure_title, height=rows * 400)
+        return fig
+
+    @staticmethod
+    @Instrumentation.timed(InstrumentationStage.FIGURE)
+    def create_checkpoint_layers_figure(
+            details: DataFrame,
+            metrics: Optional[List[str]] = None,
+            figure_title: str = "Checkpoints [layers]"
+    ) -> go.Figure:
+        # One line per layer and metric against the step of the checkpoints of a single training run
+        metrics = CHECKPOINT_LAYER_METRICS if metrics is None else metrics
+        df = details.sort_values(
+            [WeightWatcherDetailsColumns.LAYER_ID.value, CheckpointColumns.STEP.value],
+            kind="stable"
+        )
+        scatter_type = go.Scattergl if len(df) > WEBGL_POINT_THRESHOLD else go.Scatter
+        layer_ids = df[WeightWatcherDetailsColumns.LAYER_ID.value].to_numpy()
+        starts = numpy.flatnonzero(numpy.r_[True, layer_ids[1:] != layer_ids[:-1]]) if len(df) > 0 else \
+            numpy.zeros(0, dtype=numpy.int64)
+        ends = numpy.r_[starts[1:], len(df)]
+        names = df[WeightWatcherDetailsColumns.NAME.value].astype(str).to_numpy()
+        steps = df[CheckpointColumns.STEP.value].to_numpy()
+
+        rows = math.ceil(len(metrics) / float(COLUMNS_CHECKPOINTS_FIGURE))
+        fig = make_subplots(rows=rows, cols=COLUMNS_CHECKPOINTS_FIGURE)
+        traces, trace_rows, trace_cols = [], [], []
+        for metric_index, metric_key in enumerate(metrics):
+            col = (metric_index % COLUMNS_CHECKPOINTS_FIGURE) + 1
+            row = (metric_index // COLUMNS_CHECKPOINTS_FIGURE) + 1
+            values = df[metric_key].to_numpy()
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                traces.append(scatter_type(
+                    x=steps[start:end],
+                    y=values[start:end],
+                    mode="lines",
+                    legendgroup=metric_key,
+                    legendgrouptitle={"text": metric_key},
+                    name=f"{layer_ids[start]}:{names[start]}",
+                    showlegend=True,
+                ))
+                trace_rows.append(row)
+                trace_cols.append(col)
+            fig.update_yaxes(title_text=metric_key, row=row, col=col)
+        fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
+        fig.update_xaxes(title_text=CheckpointColumns.STEP.value)
+        fig.update_layout(title_text=figure_title, height=rows * 600)
+        return fig
+
     @staticmethod
     def create_details_per_architecture_figures(results: List[WeightWatcherResult]) -> List[go.Figure]:
         figures = []
@@ -121,27 +412,45 @@ class PlottingService:
         return figures
 
     @staticmethod
+    @Instrumentation.timed(InstrumentationStage.FIGURE)
     def create_details_figure(
             results: List[WeightWatcherResult],
             lines: bool = False,
             group_by_architecture=True,
             group_by_variant=True,
-            figure_title: str = "Details [all]"
+            figure_title: str = "Details [all]",
+            rendering_mode: RenderingMode = RenderingMode.AUTO,
+            downsampling: DownsamplingMethod = DownsamplingMethod.NONE,
+            max_points_per_trace: int = DEFAULT_MAX_POINTS_PER_TRACE
     ) -> go.Figure:
-        df: DataFrame = pandas.concat([result.details for result in results])
-        names, trace_dfs = PlottingService.split_dataframe(df, group_by_architecture, group_by_variant)
+        df: DataFrame = WeightWatcherResultSchema.concat([result.details for result in results])
+        # Downsampling needs the points of every trace ordered along the x-axis
+        sort_column = None if downsampling is DownsamplingMethod.NONE else WeightWatcherDetailsColumns.LAYER_ID.value
+        order, names, bounds = PlottingService.group_rows(df, group_by_architecture, group_by_variant, sort_column)
+        df = df.iloc[order]
+        labels = PlottingService.get_labels(df)
+        layer_ids = df[WeightWatcherDetailsColumns.LAYER_ID.value].to_numpy()
+        if rendering_mode is RenderingMode.AUTO:
+            rendering_mode = RenderingMode.WEBGL if len(df) > WEBGL_POINT_THRESHOLD else RenderingMode.SVG
+        scatter_type = go.Scattergl if rendering_mode is RenderingMode.WEBGL else go.Scatter
+
         rows = math.ceil(len(RELEVANT_DETAILS_COLUMNS) / float(COLUMNS_DETAILS_FIGURE))
         fig = make_subplots(rows=rows, cols=COLUMNS_DETAILS_FIGURE)
+        traces, trace_rows, trace_cols = [], [], []
         for metric_index, metric_key in enumerate(RELEVANT_DETAILS_COLUMNS):
             col = (metric_index % COLUMNS_DETAILS_FIGURE) + 1
             row = (metric_index // COLUMNS_DETAILS_FIGURE) + 1
-
-            for name, df in zip(names, trace_dfs):
-                scatter = go.Scatter(
-                    x=df[WeightWatcherDetailsColumns.LAYER_ID.value],
-                    y=df[metric_key],
-                    text=df[WeightWatcherDetailsColumns.ARCHITECTURE.value] + ":" + df[
-                        WeightWatcherDetailsColumns.VARIANT.value],
+            values = df[metric_key].to_numpy()
+            for name, (start, end) in zip(names, bounds):
+                points = slice(start, end)
+                if downsampling is not DownsamplingMethod.NONE:
+                    points = start + PlottingService.downsample_trace(
+                        layer_ids[start:end], values[start:end], downsampling, max_points_per_trace
+                    )
+                traces.append(scatter_type(
+                    x=layer_ids[points],
+                    y=values[points],
+                    text=labels[points],
                     mode="markers+lines" if lines else "markers",
                     marker=dict(
                         size=4,
@@ -150,15 +459,39 @@ class PlottingService:
                     legendgrouptitle={"text": metric_key},
                     name=name,
                     showlegend=True,
-                )
-                fig.add_trace(scatter, row=row, col=col)
-                fig.update_yaxes(title_text=metric_key, row=row, col=col)
+                ))
+                trace_rows.append(row)
+                trace_cols.append(col)
+            fig.update_yaxes(title_text=metric_key, row=row, col=col)
 
-            fig.update_xaxes(title_text=WeightWatcherDetailsColumns.LAYER_ID.value)
-            fig.update_layout(title_text=figure_title, height=rows * 400)
-            fig.update_traces(textposition='top center')
+        fig.add_traces(traces, rows=trace_rows, cols=trace_cols)
+        fig.update_xaxes(title_text=WeightWatcherDetailsColumns.LAYER_ID.value)
+        fig.update_layout(title_text=figure_title, height=rows * 400)
+        fig.update_traces(textposition='top center')
         return fig
 
+    @staticmethod
+    def downsample_trace(layer_ids: ndarray, values: ndarray, method: DownsamplingMethod, max_points: int) -> ndarray:
+        # Missing metric values are not drawn anyway, so they are dropped before selecting the points to keep
+        values = values.astype(numpy.float64)
+        finite_points = numpy.flatnonzero(numpy.isfinite(values))
+        indices = TraceDownsampler.downsample(layer_ids[finite_points], values[finite_points], max_points, method)
+        return finite_points[indices]
+
+    @staticmethod
+    def get_summaries(results: List[WeightWatcherResult], result_index: Optional[ResultIndex] = None) -> DataFrame:
+        # The summaries of the indexed results are taken from the index as one frame, only the others (e.g. of
+        # analyses that are still running) are concatenated onto it
+        if result_index is None:
+            return WeightWatcherResultSchema.concat([result.summary for result in results])
+        indexed_results = [result for result in results if result.model_identification in result_index]
+        other_results = [result for result in results if result.model_identification not in result_index]
+        indexed_summaries = result_index.get_summaries([result.model_identification for result in indexed_results])
+        return WeightWatcherResultSchema.concat(
+            [indexed_summaries] + [result.summary for result in other_results],
+            ignore_index=True
+        )
+
     @staticmethod
     def group_results_by_architecture(results: List[WeightWatcherResult]) -> Dict[str, List[WeightWatcherResult]]:
         architectures = {}
@@ -171,22 +504,53 @@ class PlottingService:
 
     @staticmethod
     def split_dataframe(df: DataFrame, group_by_architecture: bool, group_by_variant: bool):
-        names = ["all"]
-        trace_dfs = [df]
-        if group_by_architecture:
-            architecture_groups = df.groupby(WeightWatcherDetailsColumns.ARCHITECTURE.value)
-            trace_dfs = [architecture_group[1] for architecture_group in architecture_groups]
-            names = [architecture_group[0] for architecture_group in architecture_groups]
+        order, names, bounds = PlottingService.group_rows(df, group_by_architecture, group_by_variant)
+        df = df.iloc[order]
+        return names, [df.iloc[start:end] for start, end in bounds]
 
+    @staticmethod
+    def group_rows(
+            df: DataFrame,
+            group_by_architecture: bool,
+            group_by_variant: bool,
+            sort_column: Optional[str] = None
+    ) -> Tuple[ndarray, List[str], List[Tuple[int, int]]]:
+        # Sorts the rows once by their trace (and by sort_column within a trace) and returns that row order together
+        # with the name and the [start, end) bounds of every trace in it. No rows (e.g. filters that match nothing)
+        # give no traces.
+        if df.empty:
+            return numpy.zeros(0, dtype=numpy.int64), [], []
+        group_columns = []
+        if group_by_architecture:
+            group_columns.append(WeightWatcherDetailsColumns.ARCHITECTURE.value)
         if group_by_variant:
-            new_trace_dfs = []
-            variant_names = []
-            for group_name, trace_df in zip(names, trace_dfs):
-                variant_groups = trace_df.groupby(WeightWatcherDetailsColumns.VARIANT.value)
-                new_trace_dfs += [variant_group[1] for variant_group in variant_groups]
-                variant_names += [f"{group_name}:{variant_group[0]}" if group_by_architecture else variant_group[0] for
-                                  variant_group in variant_groups]
-            trace_dfs = new_trace_dfs
-            names = variant_names
-
-        return names, trace_dfs
+            group_columns.append(WeightWatcherDetailsColumns.VARIANT.value)
+
+        group_codes = numpy.zeros(len(df), dtype=numpy.int64)
+        group_uniques = []
+        for column in group_columns:
+            codes, uniques = pandas.factorize(df[column], sort=True)
+            group_codes = group_codes * len(uniques) + codes
+            group_uniques.append(uniques)
+
+        sort_keys = [group_codes] if sort_column is None else [df[sort_column].to_numpy(), group_codes]
+        order = numpy.lexsort(sort_keys)
+        sorted_codes = group_codes[order]
+        starts = numpy.flatnonzero(numpy.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        ends = numpy.r_[starts[1:], len(df)]
+
+        names = []
+        for code in sorted_codes[starts]:
+            name_parts = []
+            for uniques in reversed(group_uniques):
+                code, unique_index = divmod(code, len(uniques))
+                name_parts.insert(0, str(uniques[unique_index]))
+            names.append(":".join(name_parts) if name_parts else "all")
+        return order, names, list(zip(starts.tolist(), ends.tolist()))
+
+    @staticmethod
+    def get_labels(df: DataFrame) -> ndarray:
+        return (
+            df[WeightWatcherDetailsColumns.ARCHITECTURE.value].astype(str) + ":" +
+            df[WeightWatcherDetailsColumns.VARIANT.value].astype(str)
+        ).to_numpy()
@@ -0,0 +1,78 @@
+from enum import Enum, auto
+
+import numpy
+from numpy import ndarray
+
+# Points further than this many (normal-consistent) median absolute deviations from the median are always kept,
+# up to a quarter of the point budget on top of it for heavy-tailed metrics
+OUTLIER_MAD_FACTOR = 3.5
+MAD_NORMAL_CONSISTENCY = 1.4826
+MAX_OUTLIER_SHARE = 0.25
+
+
+class DownsamplingMethod(Enum):
+    NONE = auto()
+    LTTB = auto()
+    MIN_MAX = auto()
+
+
+class TraceDownsampler:
+    # Selects a subset of the points of a trace. x has to be sorted ascending; the returned indices are sorted as well
+    # and always include the first and last point and the outliers in y.
+    @staticmethod
+    def downsample(x: ndarray, y: ndarray, max_points: int, method: DownsamplingMethod) -> ndarray:
+        if method is DownsamplingMethod.NONE or len(x) <= max_points:
+            return numpy.arange(len(x))
+        if method is DownsamplingMethod.LTTB:
+            indices = TraceDownsampler.lttb(x, y, max_points)
+        else:
+            indices = TraceDownsampler.min_max(y, max_points)
+        outliers = TraceDownsampler.get_outliers(y, int(max_points * MAX_OUTLIER_SHARE))
+        return numpy.union1d(indices, outliers)
+
+    @staticmethod
+    def lttb(x: ndarray, y: ndarray, max_points: int) -> ndarray:
+        # Largest-Triangle-Three-Buckets: from every bucket the point spanning the largest triangle with the previously
+        # selected point and the average of the next bucket is kept
+        x = x.astype(numpy.float64)
+        y = y.astype(numpy.float64)
+        max_points = max(max_points, 3)
+        bucket_bounds = numpy.linspace(1, len(x) - 1, max_points - 1).astype(int)
+        indices = numpy.empty(max_points, dtype=int)
+        indices[0] = 0
+        indices[-1] = len(x) - 1
+        previous = 0
+        for bucket_index in range(max_points - 2):
+            start, end = bucket_bounds[bucket_index], bucket_bounds[bucket_index + 1]
+            next_start, next_end = end, bucket_bounds[bucket_index + 2] if bucket_index + 2 < max_points - 1 else len(x)
+            next_x = x[next_start:next_end].mean()
+            next_y = y[next_start:next_end].mean()
+            areas = numpy.abs(
+                (x[previous] - next_x) * (y[start:end] - y[previous]) -
+                (x[previous] - x[start:end]) * (next_y - y[previous])
+            )
+            previous = start + int(numpy.argmax(areas))
+            indices[bucket_index + 1] = previous
+        return indices
+
+    @staticmethod
+    def min_max(y: ndarray, max_points: int) -> ndarray:
+        # Keeps the minimum and the maximum of every bucket, so the envelope of the trace is preserved
+        buckets = numpy.array_split(numpy.arange(len(y)), max(1, max_points // 2))
+        indices = [0, len(y) - 1]
+        for bucket in buckets:
+            if len(bucket) == 0:
+                continue
+            indices.append(bucket[numpy.argmin(y[bucket])])
+            indices.append(bucket[numpy.argmax(y[bucket])])
+        return numpy.unique(indices)
+
+    @staticmethod
+    def get_outliers(y: ndarray, max_outliers: int) -> ndarray:
+        # The most extreme points first, if there are more outliers than max_outliers
+        deviation = numpy.abs(y - numpy.median(y))
+        mad = MAD_NORMAL_CONSISTENCY * numpy.median(deviation)
+        outliers = numpy.flatnonzero(deviation > OUTLIER_MAD_FACTOR * mad)
+        if len(outliers) > max_outliers:
+            outliers = outliers[numpy.argsort(deviation[outliers])[len(outliers) - max_outliers:]]
+        return outliers
@@ -1,2 +1,4 @@
-from .PlottingService import PlottingService
+from .PlottingService import PlottingService, RenderingMode
 from .DashboardService import DashboardService
+from .FigureSpec import FigureSpec
+from .TraceDownsampler import TraceDownsampler, DownsamplingMethod
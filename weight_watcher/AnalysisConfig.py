@@ -0,0 +1,74 @@
+import re
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, List
+
+import numpy
+
+from .LayerAnalysisEngine import LayerAnalysisEngine, SpectrumPrecision, DEFAULT_MIN_EVALS, DEFAULT_MAX_EVALS
+from .LayerWeights import LayerWeights
+
+# Seed of the element permutations of randomized configs, combined with the layer id so every layer gets its own
+RANDOMIZE_SEED = 42
+
+CONFIG_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+@dataclass(frozen=True)
+class AnalysisConfig:
+    # One set of settings of the layer-parallel engine. Its results are stored under the name, which is therefore
+    # restricted to characters that are safe in paths.
+    name: str
+    min_evals: int = DEFAULT_MIN_EVALS
+    max_evals: int = DEFAULT_MAX_EVALS
+    approximate_min_rank: Optional[int] = None
+    precision: SpectrumPrecision = SpectrumPrecision.FLOAT64
+    # Analyze the kernels with their elements shuffled, like weightwatcher's randomize: the randomized spectra are the
+    # Marchenko-Pastur baseline, and large eigenvalues that remain after shuffling point to correlation traps
+    randomize: bool = False
+
+    def __post_init__(self):
+        if not CONFIG_NAME_PATTERN.match(self.name) or self.name in (".", ".."):
+            raise ValueError(
+                f"'{self.name}' is not a valid config name, only letters, digits, '_', '.' and '-' are allowed"
+            )
+
+    @staticmethod
+    def verify_unique_names(configs: List["AnalysisConfig"]):
+        # The results of configs with the same name would overwrite each other
+        config_names = [config.name for config in configs]
+        if len(set(config_names)) != len(config_names):
+            raise ValueError(f"The config names {config_names} are not unique")
+
+    def create_engine(self, max_workers: Optional[int] = None) -> LayerAnalysisEngine:
+        return LayerAnalysisEngine(
+            max_workers=max_workers,
+            min_evals=self.min_evals,
+            max_evals=self.max_evals,
+            approximate_min_rank=self.approximate_min_rank,
+            precision=self.precision
+        )
+
+    def get_layers(self, layers: List[LayerWeights]) -> List[LayerWeights]:
+        if not self.randomize:
+            return layers
+        return [
+            LayerWeights(
+                layer.layer_id,
+                layer.name,
+                layer.layer_type,
+                numpy.random.default_rng([RANDOMIZE_SEED, layer.layer_id]).permutation(
+                    layer.kernel.ravel()
+                ).reshape(layer.kernel.shape)
+            )
+            for layer in layers
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "precision": self.precision.name}
+
+    @staticmethod
+    def from_dict(raw_config: Dict[str, Any]) -> "AnalysisConfig":
+        raw_config = dict(raw_config)
+        if "precision" in raw_config:
+            raw_config["precision"] = SpectrumPrecision[raw_config["precision"]]
+        return AnalysisConfig(**raw_config)
@@ -0,0 +1,128 @@
+import logging
+import time
+from dataclasses import asdict
+from typing import List, Optional, Callable
+
+from .MemoryUsage import MemoryUsage
+from .WeightWatcherResultManifest import WeightWatcherResultManifest, WeightWatcherResultManifestEntry
+from .WeightWatcherResultService import WeightWatcherResultService
+from .WeightWatcherService import WeightWatcherService
+from .WorkQueue import WorkQueue, WorkItem, PENDING_DIRECTORY, CLAIMED_DIRECTORY
+from models import ModelWrapperBase, ModelService, ModelRegistry
+from services import Instrumentation
+
+
+class AnalysisRunner:
+    def __init__(self, weight_watcher_service: WeightWatcherService, result_service: WeightWatcherResultService,
+                 manifest: WeightWatcherResultManifest):
+        self._weight_watcher_service = weight_watcher_service
+        self._result_service = result_service
+        self._manifest = manifest
+
+    def run(self, model_wrappers: List[ModelWrapperBase], processes: int = 1, force: bool = False) -> int:
+        stale_model_wrappers = [
+            model_wrapper for model_wrapper in model_wrappers
+            if force or not self.is_up_to_date(model_wrapper)
+        ]
+        logging.log(logging.INFO, f"{len(model_wrappers) - len(stale_model_wrappers)} of {len(model_wrappers)} "
+                                  f"results are up to date, analyzing {len(stale_model_wrappers)} models")
+
+        model_wrappers_by_name = {str(model_wrapper.identification): model_wrapper for model_wrapper in stale_model_wrappers}
+        saved_results = 0
+        for result in self._weight_watcher_service.iterate_analyses(stale_model_wrappers, processes):
+            model_wrapper = model_wrappers_by_name[str(result.model_identification)]
+            # The entry is dropped first, so a run killed in the middle of saving re-analyzes the model next time
+            self._manifest.invalidate(result.model_identification)
+            self._result_service.invalidate(result.model_identification)
+            self._result_service.save(result)
+            self._result_service.remove_partial(result.model_identification)
+            entry = self._create_manifest_entry(model_wrapper)
+            if entry is None:
+                logging.warning(f"No weights found at '{model_wrapper.weights_path}', "
+                                f"{model_wrapper.identification} will be analyzed again on the next run")
+            else:
+                self._manifest.update(result.model_identification, entry)
+            saved_results += 1
+            logging.log(logging.INFO, f"Saved {result.model_identification} "
+                                      f"({saved_results}/{len(stale_model_wrappers)})")
+        logging.log(logging.INFO, f"Analyzed {saved_results} models, {MemoryUsage.format_report()}")
+        # Only the stages of this process, the event log also has the ones of the worker processes
+        logging.log(logging.INFO, f"Stage timings: {Instrumentation.format_report()}")
+        return saved_results
+
+    def enqueue(self, model_wrappers: List[ModelWrapperBase], work_queue: WorkQueue, force: bool = False) -> int:
+        # Distributed mode: the stale models are put into the queue for the workers, which analyze them with the
+        # options of this runner's service and save the results. collect() then updates the manifest and the index.
+        options = self._weight_watcher_service.get_options()
+        queued_items = 0
+        for model_wrapper in model_wrappers:
+            if not force and self.is_up_to_date(model_wrapper):
+                continue
+            model_identification = model_wrapper.identification
+            item = WorkItem(
+                model_identification.architecture.name,
+                model_identification.variant.name,
+                options,
+                asdict(ModelRegistry.get(model_identification))
+            )
+            # As in run(), the entries are dropped before the result is replaced
+            self._manifest.invalidate(model_identification)
+            self._result_service.invalidate(model_identification)
+            if work_queue.put(item):
+                queued_items += 1
+        logging.log(logging.INFO, f"Queued {queued_items} of {len(model_wrappers)} models in '{work_queue.queue_path}'")
+        return queued_items
+
+    def collect(self, work_queue: WorkQueue, poll_seconds: float = 10.0,
+                should_stop: Optional[Callable[[], bool]] = None) -> int:
+        # Waits until the queue is drained (or should_stop returns True) and records the results of the done items in
+        # the manifest. Expired leases are re-queued here as well, in case no worker is left to do it.
+        collected_items = 0
+        previous_counts = None
+        while True:
+            work_queue.requeue_expired()
+            collected_items += self._collect_done(work_queue)
+            if work_queue.is_drained() or (should_stop is not None and should_stop()):
+                break
+            counts = work_queue.get_counts()
+            if counts != previous_counts:
+                logging.log(logging.INFO, f"Waiting for {counts[PENDING_DIRECTORY]} pending and "
+                                          f"{counts[CLAIMED_DIRECTORY]} claimed models")
+                previous_counts = counts
+            time.sleep(poll_seconds)
+        collected_items += self._collect_done(work_queue)
+
+        for item in work_queue.get_failed():
+            logging.warning(f"Analysis of {item.model_identification} failed: {item.error}")
+        # The workers do not update the result index, so their results are added here
+        self._result_service.get_result_index()
+        logging.log(logging.INFO, f"Collected {collected_items} models")
+        return collected_items
+
+    def _collect_done(self, work_queue: WorkQueue) -> int:
+        done_items = work_queue.get_done()
+        for item in done_items:
+            model_wrapper = ModelService.get(item.model_identification)
+            entry = self._create_manifest_entry(model_wrapper)
+            if entry is None:
+                logging.warning(f"No weights found at '{model_wrapper.weights_path}', "
+                                f"{model_wrapper.identification} will be analyzed again on the next run")
+            else:
+                self._manifest.update(item.model_identification, entry)
+            work_queue.acknowledge(item)
+            logging.log(logging.INFO, f"Collected {item.model_identification}")
+        return len(done_items)
+
+    def is_up_to_date(self, model_wrapper: ModelWrapperBase) -> bool:
+        if not self._result_service.exists(model_wrapper.identification):
+            return False
+        entry = self._create_manifest_entry(model_wrapper)
+        return entry is not None and entry == self._manifest.get(model_wrapper.identification)
+
+    def _create_manifest_entry(self, model_wrapper: ModelWrapperBase) -> Optional[WeightWatcherResultManifestEntry]:
+        return self._manifest.create_entry(
+            model_wrapper,
+            self._weight_watcher_service.weightwatcher_version,
+            self._weight_watcher_service.engine.name,
+            self._weight_watcher_service.get_result_options()
+        )
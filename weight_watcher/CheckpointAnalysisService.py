@@ -0,0 +1,135 @@
+import logging
+import multiprocessing
+import os.path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Iterator, Iterable, Optional
+
+from pandas import DataFrame
+
+from .LayerAnalysisEngine import LayerAnalysisEngine
+from .LayerWeights import LayerWeights, LayerWeightsExtractor
+from .SpectrumCache import SpectrumCache
+from .WeightWatcherResult import CheckpointResult, WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+from models import Checkpoint
+from services import Instrumentation, InstrumentationStage
+
+# Every checkpoint of a series adds the spectra of its changed layers, so the cache is larger than for single models
+DEFAULT_CHECKPOINT_SPECTRUM_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+
+SUMMARY_METRIC_COLUMNS = [
+    WeightWatcherSummaryColumns.LOG_NORM.value,
+    WeightWatcherSummaryColumns.ALPHA.value,
+    WeightWatcherSummaryColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherSummaryColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherSummaryColumns.LOG_SPECTRAL_NORM.value,
+    WeightWatcherSummaryColumns.STABLE_RANK.value,
+]
+
+
+class CheckpointAnalysisService:
+    # Analyzes the checkpoints of a training run with the layer-parallel engine. All checkpoints of a series share one
+    # spectrum cache, which is keyed by the hash of the weights, so the spectra of layers that did not change between
+    # checkpoints (e.g. frozen layers) are computed only once.
+    def __init__(self, spectrum_cache_path: Optional[str] = None, engine_threads: Optional[int] = None,
+                 spectrum_cache_size: int = DEFAULT_CHECKPOINT_SPECTRUM_CACHE_SIZE,
+                 approximate_min_rank: Optional[int] = None):
+        self._spectrum_cache_path = spectrum_cache_path
+        self._engine_threads = engine_threads
+        self._spectrum_cache_size = spectrum_cache_size
+        self._approximate_min_rank = approximate_min_rank
+        self._layer_analysis_engine = LayerAnalysisEngine(
+            max_workers=engine_threads,
+            approximate_min_rank=approximate_min_rank
+        )
+
+    def analyze_checkpoint(self, checkpoint: Checkpoint) -> CheckpointResult:
+        logging.log(logging.INFO, f"Analyzing {checkpoint}")
+        analysis_timer = Instrumentation.timer(
+            InstrumentationStage.ANALYSIS,
+            model=str(checkpoint),
+            engine="CHECKPOINT"
+        )
+        with analysis_timer as event, Instrumentation.profile(str(checkpoint)):
+            details = self._layer_analysis_engine.analyze_layers(
+                self._get_layers(checkpoint),
+                self._get_spectrum_cache(checkpoint.series_name)
+            )
+            event["layers"] = len(details)
+        # Spectra read from the cache are reported with an ESD time of 0
+        reused_layers = int((
+            (details[WeightWatcherDetailsColumns.ESD_SECONDS.value] == 0) &
+            ~details[WeightWatcherDetailsColumns.APPROXIMATE.value]
+        ).sum())
+        logging.log(logging.INFO, f"Analyzed {checkpoint}: reused the spectra of {reused_layers} of "
+                                  f"{len(details)} layers")
+        return CheckpointResult(checkpoint, self.get_summary(details), details)
+
+    def iterate_analyses(self, checkpoints: List[Checkpoint], processes: int = 1) -> Iterator[CheckpointResult]:
+        # Results are yielded as soon as each analysis finishes; a failing checkpoint is logged and skipped
+        if processes <= 1:
+            for checkpoint in checkpoints:
+                try:
+                    yield self.analyze_checkpoint(checkpoint)
+                except Exception:
+                    logging.exception(f"Analysis of {checkpoint} failed")
+            return
+
+        # The first checkpoint is analyzed on its own, so the spectra of the layers that stay frozen are in the cache
+        # before the workers start on the others
+        yield from self.iterate_analyses(checkpoints[:1])
+        with ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker,
+                initargs=(logging.getLogger().level, self._spectrum_cache_path, self._engine_threads,
+                          self._spectrum_cache_size, self._approximate_min_rank)
+        ) as executor:
+            futures = {
+                executor.submit(_analyze_in_worker, checkpoint): checkpoint
+                for checkpoint in checkpoints[1:]
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception:
+                    logging.exception(f"Analysis of {futures[future]} failed")
+
+    @staticmethod
+    def get_summary(details: DataFrame) -> DataFrame:
+        # Same as weightwatcher's summary: the mean of the metrics over all layers
+        return DataFrame([details[SUMMARY_METRIC_COLUMNS].mean()])
+
+    @staticmethod
+    def _get_layers(checkpoint: Checkpoint) -> Iterable[LayerWeights]:
+        # HDF5 checkpoints are read without building the model, both full models and save_weights_only files
+        if LayerWeightsExtractor.is_weights_file(checkpoint.path):
+            layers = LayerWeightsExtractor.from_weights_file(checkpoint.path)
+        else:
+            with Instrumentation.timer(InstrumentationStage.MODEL_BUILD, model=str(checkpoint)):
+                model = checkpoint.load_model()
+            layers = LayerWeightsExtractor.from_keras_model(model)
+        return Instrumentation.iterate(InstrumentationStage.WEIGHT_EXTRACTION, layers, model=str(checkpoint))
+
+    def _get_spectrum_cache(self, series_name: str) -> Optional[SpectrumCache]:
+        if self._spectrum_cache_path is None:
+            return None
+        return SpectrumCache(
+            os.path.join(self._spectrum_cache_path, series_name, "esd"),
+            self._spectrum_cache_size,
+            self._spectrum_cache_path
+        )
+
+
+_worker_service: Optional[CheckpointAnalysisService] = None
+
+
+def _initialize_worker(log_level, spectrum_cache_path: Optional[str], engine_threads: Optional[int],
+                       spectrum_cache_size: int, approximate_min_rank: Optional[int]):
+    global _worker_service
+    logging.basicConfig(level=log_level)
+    _worker_service = CheckpointAnalysisService(spectrum_cache_path, engine_threads, spectrum_cache_size,
+                                                approximate_min_rank)
+
+
+def _analyze_in_worker(checkpoint: Checkpoint) -> CheckpointResult:
+    return _worker_service.analyze_checkpoint(checkpoint)
@@ -0,0 +1,111 @@
+import os.path
+import tempfile
+from typing import List, Optional, Callable, IO, Any
+
+import numpy
+import pandas
+from pandas import DataFrame
+
+from .WeightWatcherResult import CheckpointResult, CheckpointColumns
+from .WeightWatcherResultSchema import WeightWatcherResultSchema
+from models import Checkpoint
+
+CHECKPOINT_RESULTS_DIRECTORY = "checkpoints"
+CHECKPOINT_SUMMARY_FILE_NAME = "summary.csv"
+CHECKPOINT_DETAILS_DIRECTORY = "details"
+
+
+class CheckpointResultService:
+    # Stores the results of a training run as a time series under <results>/checkpoints/<series>: summary.csv holds one
+    # row per analyzed step and details/<step>.csv the layers of that step
+    def __init__(self, results_base_path: str):
+        self._checkpoint_results_path = os.path.join(results_base_path, CHECKPOINT_RESULTS_DIRECTORY)
+
+    def save(self, result: CheckpointResult):
+        checkpoint = result.checkpoint
+        details_path = self._get_details_path(checkpoint.series_name, checkpoint.step)
+        os.makedirs(os.path.dirname(details_path), exist_ok=True)
+        details = WeightWatcherResultSchema.apply_to_details(result.details)
+        self._write_atomically(details_path, lambda details_file: details.to_csv(details_file, index=False))
+
+        # The summary of the step is written last, so a step is only listed once its details are complete
+        summary = result.summary.copy()
+        summary.insert(0, CheckpointColumns.STEP.value, checkpoint.step)
+        summaries = self._read_summaries(checkpoint.series_name)
+        if summaries is not None:
+            summaries = summaries[summaries[CheckpointColumns.STEP.value] != checkpoint.step]
+            summary = pandas.concat([summaries, summary], ignore_index=True)
+        summary = summary.sort_values(CheckpointColumns.STEP.value)
+        self._write_atomically(
+            os.path.join(self._get_series_path(checkpoint.series_name), CHECKPOINT_SUMMARY_FILE_NAME),
+            lambda summary_file: summary.to_csv(summary_file, index=False)
+        )
+
+    def exists(self, checkpoint: Checkpoint) -> bool:
+        return checkpoint.step in self.get_steps(checkpoint.series_name)
+
+    def get_series_names(self) -> List[str]:
+        if not os.path.isdir(self._checkpoint_results_path):
+            return []
+        return sorted(
+            series_name for series_name in os.listdir(self._checkpoint_results_path)
+            if os.path.isfile(os.path.join(self._checkpoint_results_path, series_name, CHECKPOINT_SUMMARY_FILE_NAME))
+        )
+
+    def get_steps(self, series_name: str) -> List[int]:
+        summaries = self._read_summaries(series_name)
+        return [] if summaries is None else summaries[CheckpointColumns.STEP.value].tolist()
+
+    def load_summaries(self, series_names: Optional[List[str]] = None) -> DataFrame:
+        # One row per series and step, ordered by both
+        series_names = self.get_series_names() if series_names is None else series_names
+        summaries = []
+        for series_name in series_names:
+            summary = self._read_summaries(series_name)
+            if summary is None:
+                continue
+            summary.insert(0, CheckpointColumns.SERIES.value, WeightWatcherResultSchema.get_constant_categorical(
+                series_name, len(summary)
+            ))
+            summaries.append(summary)
+        return WeightWatcherResultSchema.concat(summaries, ignore_index=True)
+
+    def load_details(self, series_name: str, steps: Optional[List[int]] = None) -> DataFrame:
+        # The layers of all (or the given) steps of a series in one frame, ordered by step and layer id
+        steps = self.get_steps(series_name) if steps is None else steps
+        details = []
+        for step in steps:
+            step_details = pandas.read_csv(
+                self._get_details_path(series_name, step),
+                dtype=WeightWatcherResultSchema.get_csv_dtypes()
+            )
+            step_details = WeightWatcherResultSchema.apply_to_details(step_details)
+            step_details.insert(0, CheckpointColumns.STEP.value, numpy.full(len(step_details), step, dtype=numpy.int64))
+            step_details.insert(0, CheckpointColumns.SERIES.value, WeightWatcherResultSchema.get_constant_categorical(
+                series_name, len(step_details)
+            ))
+            details.append(step_details)
+        return WeightWatcherResultSchema.concat(details, ignore_index=True)
+
+    def _read_summaries(self, series_name: str) -> Optional[DataFrame]:
+        try:
+            return pandas.read_csv(os.path.join(self._get_series_path(series_name), CHECKPOINT_SUMMARY_FILE_NAME))
+        except FileNotFoundError:
+            return None
+
+    def _get_series_path(self, series_name: str) -> str:
+        return os.path.join(self._checkpoint_results_path, series_name)
+
+    def _get_details_path(self, series_name: str, step: int) -> str:
+        return os.path.join(self._get_series_path(series_name), CHECKPOINT_DETAILS_DIRECTORY, f"{step}.csv")
+
+    @staticmethod
+    def _write_atomically(path: str, write: Callable[[IO], Any]):
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w", newline="") as temporary_file:
+                write(temporary_file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
@@ -0,0 +1,108 @@
+import json
+import logging
+import os.path
+from typing import List, Optional, Dict, Any
+
+from .AnalysisConfig import AnalysisConfig
+from .WeightWatcherResult import WeightWatcherResult
+from .WeightWatcherResultManifest import WeightWatcherResultManifest, WeightWatcherResultManifestEntry
+from .WeightWatcherResultService import WeightWatcherResultService, CONFIG_RESULTS_DIRECTORY
+from .WeightWatcherService import WeightWatcherService
+from models import ModelWrapperBase
+
+CONFIG_FILE_NAME = "config.json"
+CONFIG_MANIFEST_FILE_NAME = "manifest.json"
+
+
+class ConfigAnalysisRunner:
+    # Analyzes the models with several configs from one extraction of their layers. Every config is stored like the
+    # results of a run under <results>/configs/<name>, with its own manifest, so only the configs whose results are
+    # missing or outdated (e.g. after the settings of a config changed under the same name) are analyzed again.
+    def __init__(self, weight_watcher_service: WeightWatcherService, result_service: WeightWatcherResultService,
+                 configs: List[AnalysisConfig]):
+        AnalysisConfig.verify_unique_names(configs)
+        self._weight_watcher_service = weight_watcher_service
+        self._configs = configs
+        self._result_services = {
+            config.name: result_service.get_config_result_service(config.name) for config in configs
+        }
+        self._config_paths = {
+            config.name: os.path.join(result_service.results_base_path, CONFIG_RESULTS_DIRECTORY, config.name)
+            for config in configs
+        }
+        self._manifests = {
+            config_name: WeightWatcherResultManifest(os.path.join(config_path, CONFIG_MANIFEST_FILE_NAME))
+            for config_name, config_path in self._config_paths.items()
+        }
+
+    def run(self, model_wrappers: List[ModelWrapperBase], force: bool = False) -> int:
+        self._save_configs()
+        analyzed_models = 0
+        for model_wrapper in model_wrappers:
+            stale_configs = [
+                config for config in self._configs
+                if force or not self.is_up_to_date(model_wrapper, config)
+            ]
+            if not stale_configs:
+                continue
+            try:
+                results = self._weight_watcher_service.analyze_model_configs(model_wrapper, stale_configs)
+            except Exception:
+                logging.exception(f"Analysis of {model_wrapper.identification} failed")
+                continue
+            for config in stale_configs:
+                self._save(model_wrapper, config, results[config.name])
+            analyzed_models += 1
+        logging.log(logging.INFO, f"Analyzed {analyzed_models} of {len(model_wrappers)} models, the others are up to "
+                                  f"date for all configs")
+        return analyzed_models
+
+    def is_up_to_date(self, model_wrapper: ModelWrapperBase, config: AnalysisConfig) -> bool:
+        if not self._result_services[config.name].exists(model_wrapper.identification):
+            return False
+        entry = self._create_manifest_entry(model_wrapper, config)
+        return entry is not None and entry == self._manifests[config.name].get(model_wrapper.identification)
+
+    def _save(self, model_wrapper: ModelWrapperBase, config: AnalysisConfig, result: WeightWatcherResult):
+        # As in AnalysisRunner, the entry is dropped first, so a run killed while saving analyzes the model again
+        manifest = self._manifests[config.name]
+        result_service = self._result_services[config.name]
+        manifest.invalidate(result.model_identification)
+        result_service.invalidate(result.model_identification)
+        result_service.save(result)
+        entry = self._create_manifest_entry(model_wrapper, config)
+        if entry is None:
+            logging.warning(f"No weights found at '{model_wrapper.weights_path}', "
+                            f"{model_wrapper.identification} will be analyzed again on the next run")
+        else:
+            manifest.update(result.model_identification, entry)
+
+    def _save_configs(self):
+        # The settings are stored next to the results of every config. Results of previous settings stay until their
+        # models are analyzed again, the manifest of the config marks them as outdated.
+        for config in self._configs:
+            config_file_path = os.path.join(self._config_paths[config.name], CONFIG_FILE_NAME)
+            stored_config = self._load_config(config_file_path)
+            if stored_config is not None and stored_config != config.to_dict():
+                logging.log(logging.INFO, f"The settings of config '{config.name}' changed, its results are analyzed "
+                                          f"again")
+            os.makedirs(self._config_paths[config.name], exist_ok=True)
+            with open(config_file_path, "w") as config_file:
+                json.dump(config.to_dict(), config_file, indent=4)
+
+    def _create_manifest_entry(self, model_wrapper: ModelWrapperBase,
+                               config: AnalysisConfig) -> Optional[WeightWatcherResultManifestEntry]:
+        return self._manifests[config.name].create_entry(
+            model_wrapper,
+            self._weight_watcher_service.weightwatcher_version,
+            self._weight_watcher_service.engine.name,
+            self._weight_watcher_service.get_config_result_options(config)
+        )
+
+    @staticmethod
+    def _load_config(config_file_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(config_file_path) as config_file:
+                return json.load(config_file)
+        except FileNotFoundError:
+            return None
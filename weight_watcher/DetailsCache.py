@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from pandas import DataFrame
+
+DEFAULT_MAX_MEMORY_BYTES = 512 * 1024 * 1024
+
+
+class DetailsCache:
+    # LRU of details DataFrames bounded by their memory usage. The most recently loaded frame is always kept, even if
+    # it exceeds the bound on its own.
+    def __init__(self, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES):
+        self._max_memory_bytes = max_memory_bytes
+        self._entries: "OrderedDict[str, DataFrame]" = OrderedDict()
+        self._entry_sizes = {}
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    def get(self, key: str, load: Callable[[], DataFrame]) -> DataFrame:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        details = load()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = details
+                self._entry_sizes[key] = int(details.memory_usage(deep=True).sum())
+                self._memory_bytes += self._entry_sizes[key]
+                self._evict()
+        return details
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                self._memory_bytes -= self._entry_sizes.pop(key)
+
+    def _evict(self):
+        while self._memory_bytes > self._max_memory_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._memory_bytes -= self._entry_sizes.pop(key)
@@ -0,0 +1,410 @@
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional, Any, Callable
+
+import numpy
+from numpy import ndarray
+from pandas import DataFrame
+
+from .LayerWeights import LayerWeights, LayerWeightsExtractor, LayerType
+from .PowerLawFitter import PowerLawFit, PowerLawFitter, FAILED
+from .SpectrumCache import SpectrumCache
+from .WeightWatcherResult import WeightWatcherDetailsColumns
+
+# Defaults and thresholds as used by weightwatcher's analyze
+DEFAULT_MIN_EVALS = 50
+DEFAULT_MAX_EVALS = 10000
+WEAK_RANK_LOSS_TOLERANCE = 0.000001
+# weightwatcher scales Conv2D matrices by sqrt(conv2d_count / 2), where conv2d_count is 1 unless slicing (ww2x)
+CONV2D_EVALS_SCALE = 0.5
+# best_fit of layers whose power law fit failed
+UNKNOWN = "unknown"
+
+# Upper bound of matrices per stacked SVD call, so large shape groups are spread over the thread pool
+MAX_MATRICES_PER_TASK = 64
+
+# Approximate mode: instead of the SVD of every N x M matrix W, the eigenvalues of its M x M Gram matrix W^T W are
+# computed. The top of the spectrum, which the power law fit and the norms depend on, is as accurate as with the SVD,
+# but eigenvalues below sqrt(eps) * lambda_max are not, so the rank metrics are not reported for approximated layers.
+
+# Float32 mode: the spectra are computed in single precision and a layer is recomputed in double precision when the
+# error estimate of its float32 spectrum is too large. The estimate is sqrt(N) * eps * sigma_max for the singular
+# values, and sqrt(N) * eps * lambda_max for the eigenvalues of the Gram matrices, which is well above the errors
+# seen for weight matrices.
+FLOAT32_EPS = float(numpy.finfo(numpy.float32).eps)
+FLOAT64_EPS = float(numpy.finfo(numpy.float64).eps)
+# Relative error of the eigenvalues of the power law tail up to which a float32 spectrum is kept
+DEFAULT_FLOAT32_TAIL_TOLERANCE = 0.001
+
+DETAILS_COLUMNS = [
+    column.value for column in WeightWatcherDetailsColumns
+    if column not in (
+        WeightWatcherDetailsColumns.ACCURACY,
+        WeightWatcherDetailsColumns.ARCHITECTURE,
+        WeightWatcherDetailsColumns.VARIANT
+    )
+]
+
+
+class SpectrumPrecision(Enum):
+    FLOAT64 = "float64"
+    FLOAT32 = "float32"
+
+
+@dataclass
+class LayerSpectrum:
+    evals: ndarray
+    sv_max: float
+    rank_loss: int
+    # Time spent computing the spectrum, 0 when it was read from the spectrum cache
+    seconds: float = 0.0
+    precision: SpectrumPrecision = SpectrumPrecision.FLOAT64
+
+
+class LayerAnalysisEngine:
+    def __init__(self, max_workers: Optional[int] = None, min_evals: int = DEFAULT_MIN_EVALS,
+                 max_evals: int = DEFAULT_MAX_EVALS, approximate_min_rank: Optional[int] = None,
+                 precision: SpectrumPrecision = SpectrumPrecision.FLOAT64,
+                 float32_tail_tolerance: float = DEFAULT_FLOAT32_TAIL_TOLERANCE):
+        self._max_workers = max_workers
+        self._min_evals = min_evals
+        self._max_evals = max_evals
+        # Layers with M >= approximate_min_rank get their spectra from the Gram matrices, None disables this
+        self._approximate_min_rank = approximate_min_rank
+        self._precision = precision
+        self._float32_tail_tolerance = float32_tail_tolerance
+
+    def get_result_options(self) -> Dict[str, Any]:
+        # The settings that change the details of a model, as JSON
+        return {
+            "min_evals": self._min_evals,
+            "max_evals": self._max_evals,
+            # Approximated layers have no rank metrics, so switching the approximation changes the details
+            "approximate_min_rank": self._approximate_min_rank,
+            # The precision column and, within the tolerance, the metrics of float32 spectra differ
+            "precision": self._precision.name,
+            "float32_tail_tolerance": self._float32_tail_tolerance,
+        }
+
+    def analyze(self, model, spectrum_cache: Optional[SpectrumCache] = None) -> DataFrame:
+        return self.analyze_layers(LayerWeightsExtractor.from_keras_model(model), spectrum_cache)
+
+    def analyze_layers(self, layers: Iterable[LayerWeights], spectrum_cache: Optional[SpectrumCache] = None) -> DataFrame:
+        layers = [layer for layer in layers if self._is_supported(layer)]
+        exact_layers = [layer for layer in layers if not self._is_approximated(layer)]
+        approximated_layers = [layer for layer in layers if self._is_approximated(layer)]
+        with ThreadPoolExecutor(self._max_workers, thread_name_prefix="layer-analysis") as executor:
+            spectra, fits, fit_seconds = self._compute_and_fit_spectra(exact_layers, executor, spectrum_cache)
+            rows = list(executor.map(self._get_details_row, exact_layers, spectra, fits, fit_seconds))
+            rows += list(executor.map(self.get_approximate_details_row, approximated_layers))
+        if spectrum_cache is not None:
+            spectrum_cache.evict()
+        rows.sort(key=lambda row: row[WeightWatcherDetailsColumns.LAYER_ID.value])
+        return DataFrame(rows, columns=DETAILS_COLUMNS)
+
+    def iterate_details(self, model, spectrum_cache: Optional[SpectrumCache] = None) -> Iterator[Dict[str, Any]]:
+        return self.iterate_layer_details(LayerWeightsExtractor.from_keras_model(model), spectrum_cache)
+
+    def iterate_layer_details(self, layers: Iterable[LayerWeights],
+                              spectrum_cache: Optional[SpectrumCache] = None) -> Iterator[Dict[str, Any]]:
+        # Yields the details row of every layer as soon as it is computed. Only the matrices of the current layer are
+        # held at a time, at the cost of the batched SVDs of analyze_layers.
+        for layer in layers:
+            if not self._is_supported(layer):
+                continue
+            if self._is_approximated(layer):
+                yield self.get_approximate_details_row(layer)
+                continue
+            spectrum, fit, fit_seconds = self._fit_layer_spectrum(
+                layer,
+                self._compute_layer_spectrum(layer, spectrum_cache, self._precision),
+                lambda: self._compute_layer_spectrum(layer, spectrum_cache, SpectrumPrecision.FLOAT64)
+            )
+            yield self._get_details_row(layer, spectrum, fit, fit_seconds)
+        if spectrum_cache is not None:
+            spectrum_cache.evict()
+
+    def _is_supported(self, layer: LayerWeights) -> bool:
+        if self._min_evals and layer.num_evals < self._min_evals:
+            return False
+        if self._max_evals and layer.num_evals > self._max_evals:
+            return False
+        return True
+
+    def _is_approximated(self, layer: LayerWeights) -> bool:
+        return self._approximate_min_rank is not None and layer.M >= self._approximate_min_rank
+
+    def _compute_and_fit_spectra(
+            self,
+            layers: List[LayerWeights],
+            executor: ThreadPoolExecutor,
+            spectrum_cache: Optional[SpectrumCache] = None
+    ) -> Tuple[List[LayerSpectrum], List[PowerLawFit], List[float]]:
+        spectra = self._compute_spectra(layers, executor, spectrum_cache, self._precision)
+        fits, fit_seconds = self._fit_power_laws(spectra, executor)
+        fallback_indices = [
+            layer_index for layer_index, (layer, spectrum, fit) in enumerate(zip(layers, spectra, fits))
+            if not self._is_accurate(layer, spectrum, fit)
+        ]
+        if not fallback_indices:
+            return spectra, fits, fit_seconds
+
+        logging.log(logging.INFO, f"Recomputing {len(fallback_indices)} of {len(layers)} float32 spectra in float64")
+        fallback_spectra = self._compute_spectra(
+            [layers[layer_index] for layer_index in fallback_indices],
+            executor,
+            spectrum_cache,
+            SpectrumPrecision.FLOAT64
+        )
+        fallback_fits, fallback_fit_seconds = self._fit_power_laws(fallback_spectra, executor)
+        for layer_index, spectrum, fit, seconds in zip(
+                fallback_indices, fallback_spectra, fallback_fits, fallback_fit_seconds
+        ):
+            # The time of the float32 attempt is counted for the layer as well
+            spectrum.seconds += spectra[layer_index].seconds
+            spectra[layer_index], fits[layer_index] = spectrum, fit
+            fit_seconds[layer_index] += seconds
+        return spectra, fits, fit_seconds
+
+    def _compute_spectra(self, layers: List[LayerWeights], executor: ThreadPoolExecutor,
+                         spectrum_cache: Optional[SpectrumCache] = None,
+                         precision: SpectrumPrecision = SpectrumPrecision.FLOAT64) -> List[LayerSpectrum]:
+        singular_values: List[Optional[ndarray]] = [None] * len(layers)
+        seconds = [0.0] * len(layers)
+        keys: List[Optional[str]] = [None] * len(layers)
+        if spectrum_cache is not None:
+            keys = list(executor.map(lambda layer: SpectrumCache.get_key(layer.kernel), layers))
+            singular_values = [self._get_cached_singular_values(spectrum_cache, key, precision) for key in keys]
+        missing_layer_indices = [layer_index for layer_index, sv in enumerate(singular_values) if sv is None]
+
+        # Same-shaped matrices of all layers are stacked into batched SVD calls, which run on the thread pool
+        tasks: List[List[int]] = []
+        for layer_indices in self._group_by_matrix_shape(layers, missing_layer_indices).values():
+            task, task_size = [], 0
+            for layer_index in layer_indices:
+                if task and task_size + layers[layer_index].rf > MAX_MATRICES_PER_TASK:
+                    tasks.append(task)
+                    task, task_size = [], 0
+                task.append(layer_index)
+                task_size += layers[layer_index].rf
+            tasks.append(task)
+
+        task_results = executor.map(
+            lambda task: self._compute_timed_singular_values(
+                [layers[layer_index] for layer_index in task],
+                precision
+            ),
+            tasks
+        )
+        for task, (task_singular_values, task_seconds) in zip(tasks, task_results):
+            # The time of a batched SVD is split over its layers by their number of matrices
+            task_size = sum(layers[layer_index].rf for layer_index in task)
+            for layer_index, layer_singular_values in zip(task, task_singular_values):
+                singular_values[layer_index] = layer_singular_values
+                seconds[layer_index] = task_seconds * layers[layer_index].rf / task_size
+                if spectrum_cache is not None:
+                    spectrum_cache.put(keys[layer_index], layer_singular_values)
+
+        return [
+            self._get_spectrum(layer, sv, layer_seconds)
+            for layer, sv, layer_seconds in zip(layers, singular_values, seconds)
+        ]
+
+    @staticmethod
+    def _group_by_matrix_shape(layers: List[LayerWeights], layer_indices: List[int]) -> Dict[Tuple[int, int], List[int]]:
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for layer_index in layer_indices:
+            groups.setdefault((layers[layer_index].N, layers[layer_index].M), []).append(layer_index)
+        return groups
+
+    def _compute_layer_spectrum(self, layer: LayerWeights, spectrum_cache: Optional[SpectrumCache],
+                                precision: SpectrumPrecision) -> LayerSpectrum:
+        key, singular_values = None, None
+        if spectrum_cache is not None:
+            key = SpectrumCache.get_key(layer.kernel)
+            singular_values = self._get_cached_singular_values(spectrum_cache, key, precision)
+        seconds = 0.0
+        if singular_values is None:
+            singular_values, seconds = self._compute_timed_singular_values([layer], precision)
+            singular_values = singular_values[0]
+            if spectrum_cache is not None:
+                spectrum_cache.put(key, singular_values)
+        return self._get_spectrum(layer, singular_values, seconds)
+
+    @staticmethod
+    def _get_cached_singular_values(spectrum_cache: SpectrumCache, key: str,
+                                    precision: SpectrumPrecision) -> Optional[ndarray]:
+        # The singular values are cached in the precision they were computed in. Float64 ones are used in both
+        # modes, float32 ones only in float32 mode; a float64 recomputation replaces them.
+        singular_values = spectrum_cache.get(key)
+        if singular_values is not None and precision is SpectrumPrecision.FLOAT64 and \
+                singular_values.dtype != numpy.float64:
+            return None
+        return singular_values
+
+    @staticmethod
+    def _compute_timed_singular_values(layers: List[LayerWeights],
+                                       precision: SpectrumPrecision) -> Tuple[List[ndarray], float]:
+        start = time.perf_counter()
+        singular_values = LayerAnalysisEngine._compute_singular_values(layers, precision)
+        return singular_values, time.perf_counter() - start
+
+    @staticmethod
+    def _compute_singular_values(layers: List[LayerWeights],
+                                 precision: SpectrumPrecision = SpectrumPrecision.FLOAT64) -> List[ndarray]:
+        stacked_matrices = numpy.concatenate([layer.get_matrices(precision.value) for layer in layers])
+        singular_values = numpy.linalg.svd(stacked_matrices, compute_uv=False)
+        split_indices = numpy.cumsum([layer.rf for layer in layers])[:-1]
+        return numpy.split(singular_values, split_indices)
+
+    @staticmethod
+    def _get_spectrum(layer: LayerWeights, singular_values: ndarray, seconds: float = 0.0) -> LayerSpectrum:
+        precision = SpectrumPrecision(singular_values.dtype.name)
+        singular_values = singular_values.astype(numpy.float64)
+        if layer.layer_type is LayerType.CONV2D:
+            singular_values = singular_values * math.sqrt(CONV2D_EVALS_SCALE)
+        # Rank loss per matrix, with the tolerance of numpy.linalg.matrix_rank
+        tolerances = singular_values.max(axis=1, keepdims=True) * layer.N * numpy.finfo(singular_values.dtype).eps
+        rank_loss = int(numpy.count_nonzero(singular_values <= tolerances))
+        evals = numpy.sort((singular_values * singular_values).ravel())
+        return LayerSpectrum(evals, float(singular_values.max()), rank_loss, seconds, precision)
+
+    def get_approximate_details_row(self, layer: LayerWeights) -> Dict[str, Any]:
+        spectrum, fit, fit_seconds = self._fit_layer_spectrum(
+            layer,
+            self._compute_gram_spectrum(layer, self._precision),
+            lambda: self._compute_gram_spectrum(layer, SpectrumPrecision.FLOAT64)
+        )
+        row = self._get_details_row(layer, spectrum, fit, fit_seconds)
+        row.update({
+            WeightWatcherDetailsColumns.APPROXIMATE.value: True,
+            WeightWatcherDetailsColumns.MATRIX_RANK.value: -1,
+            WeightWatcherDetailsColumns.WEAK_RANK_LOSS.value: -1,
+        })
+        return row
+
+    @staticmethod
+    def _compute_gram_spectrum(layer: LayerWeights, precision: SpectrumPrecision) -> LayerSpectrum:
+        start = time.perf_counter()
+        matrices = layer.get_matrices(precision.value)
+        if layer.layer_type is LayerType.CONV2D:
+            matrices = matrices * math.sqrt(CONV2D_EVALS_SCALE)
+        evals = numpy.concatenate([numpy.linalg.eigvalsh(matrix.T @ matrix) for matrix in matrices])
+        evals = numpy.sort(evals.astype(numpy.float64)).clip(min=0)
+        seconds = time.perf_counter() - start
+        return LayerSpectrum(evals, math.sqrt(evals[-1]), -1, seconds, precision)
+
+    def _fit_layer_spectrum(
+            self,
+            layer: LayerWeights,
+            spectrum: LayerSpectrum,
+            compute_float64_spectrum: Callable[[], LayerSpectrum]
+    ) -> Tuple[LayerSpectrum, PowerLawFit, float]:
+        (fit,), (fit_seconds,) = self._fit_power_laws([spectrum])
+        if self._is_accurate(layer, spectrum, fit):
+            return spectrum, fit, fit_seconds
+        float64_spectrum = compute_float64_spectrum()
+        # The time of the float32 attempt is counted for the layer as well
+        float64_spectrum.seconds += spectrum.seconds
+        (fit,), (float64_fit_seconds,) = self._fit_power_laws([float64_spectrum])
+        return float64_spectrum, fit, fit_seconds + float64_fit_seconds
+
+    def _is_accurate(self, layer: LayerWeights, spectrum: LayerSpectrum, fit: PowerLawFit) -> bool:
+        # Whether the metrics of a float32 spectrum are as good as those of the float64 one: the eigenvalues of the
+        # power law tail are within the tolerance and no singular value is close enough to the rank tolerances to
+        # change the rank metrics
+        if spectrum.precision is SpectrumPrecision.FLOAT64:
+            return True
+        evals = spectrum.evals
+        if self._is_approximated(layer):
+            eval_error = math.sqrt(layer.N) * FLOAT32_EPS * evals[-1]
+            return fit.status == FAILED or eval_error / fit.xmin <= self._float32_tail_tolerance
+
+        sv_error = math.sqrt(layer.N) * FLOAT32_EPS * spectrum.sv_max
+        if fit.status != FAILED:
+            xmin_error = 2 * math.sqrt(fit.xmin) * sv_error + sv_error * sv_error
+            if xmin_error / fit.xmin > self._float32_tail_tolerance:
+                return False
+        if math.sqrt(evals[0]) <= spectrum.sv_max * layer.N * FLOAT64_EPS + sv_error:
+            return False
+        eval_errors = 2 * numpy.sqrt(evals) * sv_error + sv_error * sv_error
+        return not numpy.any(numpy.abs(evals - WEAK_RANK_LOSS_TOLERANCE) <= eval_errors)
+
+    @staticmethod
+    def _fit_power_laws(spectra: List[LayerSpectrum],
+                        executor: Optional[ThreadPoolExecutor] = None) -> Tuple[List[PowerLawFit], List[float]]:
+        # The power laws of all layers are fitted in one batch. Like the time of a batched SVD, the time of the batch
+        # is split over its layers, by the number of candidate x tail entries of their KS distances.
+        start = time.perf_counter()
+        fits = PowerLawFitter.fit_batch([spectrum.evals for spectrum in spectra], executor)
+        seconds = time.perf_counter() - start
+        costs = [len(spectrum.evals) ** 2 for spectrum in spectra]
+        total_cost = sum(costs) or 1
+        return fits, [seconds * cost / total_cost for cost in costs]
+
+    def _get_details_row(self, layer: LayerWeights, spectrum: LayerSpectrum, fit: PowerLawFit,
+                         fit_seconds: float) -> Dict[str, Any]:
+        evals = spectrum.evals
+
+        norm = numpy.sum(evals)
+        spectral_norm = evals[-1]
+        log_spectral_norm = numpy.log10(spectral_norm)
+        sv = numpy.sqrt(evals)
+        matrix_rank = self._get_matrix_rank(sv, layer.N)
+
+        return {
+            WeightWatcherDetailsColumns.LAYER_ID.value: layer.layer_id,
+            WeightWatcherDetailsColumns.NAME.value: layer.name,
+            WeightWatcherDetailsColumns.D.value: fit.D,
+            WeightWatcherDetailsColumns.LAMBDA.value: -1,
+            WeightWatcherDetailsColumns.M.value: layer.M,
+            WeightWatcherDetailsColumns.N.value: layer.N,
+            WeightWatcherDetailsColumns.ALPHA.value: fit.alpha,
+            WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value: fit.alpha * log_spectral_norm,
+            WeightWatcherDetailsColumns.APPROXIMATE.value: False,
+            # weightwatcher picks the best fit by comparing the power law against other distributions (e.g. lognormal),
+            # which this engine does not fit, so the column is left empty instead of claiming a power law. Failed fits
+            # get weightwatcher's placeholder.
+            WeightWatcherDetailsColumns.BEST_FIT.value: UNKNOWN if fit.status == FAILED else None,
+            WeightWatcherDetailsColumns.ENTROPY.value: self._get_matrix_entropy(evals, matrix_rank),
+            WeightWatcherDetailsColumns.ESD_SECONDS.value: spectrum.seconds,
+            WeightWatcherDetailsColumns.FIT_SECONDS.value: fit_seconds,
+            WeightWatcherDetailsColumns.HAS_ESD.value: True,
+            WeightWatcherDetailsColumns.LAMBDA_MAX.value: spectral_norm,
+            WeightWatcherDetailsColumns.LAYER_TYPE.value: layer.layer_type.value,
+            WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value: numpy.log10(numpy.sum(evals ** fit.alpha)),
+            WeightWatcherDetailsColumns.LOG_NORM.value: numpy.log10(norm),
+            WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM.value: log_spectral_norm,
+            WeightWatcherDetailsColumns.MATRIX_RANK.value: matrix_rank,
+            WeightWatcherDetailsColumns.NORM.value: norm,
+            WeightWatcherDetailsColumns.NUM_EVALS.value: len(evals),
+            WeightWatcherDetailsColumns.NUM_PL_SPIKES.value: fit.num_pl_spikes,
+            WeightWatcherDetailsColumns.PRECISION.value: spectrum.precision.value,
+            WeightWatcherDetailsColumns.RANK_LOSS.value: spectrum.rank_loss,
+            WeightWatcherDetailsColumns.RF.value: layer.rf,
+            WeightWatcherDetailsColumns.SHAPE.value: "x".join(str(dimension) for dimension in layer.kernel.shape),
+            WeightWatcherDetailsColumns.SIGMA.value: fit.sigma,
+            WeightWatcherDetailsColumns.SPECTRAL_NORM.value: spectral_norm,
+            WeightWatcherDetailsColumns.STABLE_RANK.value: norm / spectral_norm,
+            WeightWatcherDetailsColumns.SV_MAX.value: spectrum.sv_max,
+            WeightWatcherDetailsColumns.WARNING.value: fit.status,
+            WeightWatcherDetailsColumns.WEAK_RANK_LOSS.value: int(numpy.count_nonzero(evals < WEAK_RANK_LOSS_TOLERANCE)),
+            WeightWatcherDetailsColumns.XMAX.value: fit.xmax,
+            WeightWatcherDetailsColumns.XMIN.value: fit.xmin,
+        }
+
+    @staticmethod
+    def _get_matrix_rank(sv: ndarray, N: int) -> int:
+        tolerance = sv.max() * N * numpy.finfo(sv.dtype).eps
+        return int(numpy.count_nonzero(sv > tolerance))
+
+    @staticmethod
+    def _get_matrix_entropy(evals: ndarray, matrix_rank: int) -> float:
+        p = evals / numpy.sum(evals)
+        p = p[p > 0]
+        rank = 1.000001 if matrix_rank == 1 else matrix_rank
+        return float(-numpy.sum(p * numpy.log(p)) / numpy.log(rank))
@@ -0,0 +1,131 @@
+import os.path
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterator, Optional, List
+
+import numpy
+from numpy import ndarray
+
+
+class LayerType(Enum):
+    DENSE = "LAYER_TYPE.DENSE"
+    CONV2D = "LAYER_TYPE.CONV2D"
+
+
+# Keras class names (including base classes) that weightwatcher maps to a layer type
+KerasLayerClassToLayerTypeMapping = {
+    "Dense": LayerType.DENSE,
+    "Conv2D": LayerType.CONV2D,
+}
+
+# Weights files do not record layer classes, so the type is derived from the dimensions of the layer's kernel
+KernelDimensionsToLayerTypeMapping = {
+    2: LayerType.DENSE,
+    4: LayerType.CONV2D,
+}
+
+KERNEL_WEIGHT_NAME = "kernel:0"
+WEIGHTS_FILE_EXTENSIONS = (".h5", ".hdf5")
+
+
+@dataclass
+class LayerWeights:
+    layer_id: int
+    name: str
+    layer_type: LayerType
+    kernel: ndarray
+
+    @property
+    def rf(self) -> int:
+        if self.layer_type is LayerType.CONV2D:
+            return self.kernel.shape[0] * self.kernel.shape[1]
+        return 1
+
+    @property
+    def N(self) -> int:
+        return max(self.kernel.shape[-2:])
+
+    @property
+    def M(self) -> int:
+        return min(self.kernel.shape[-2:])
+
+    @property
+    def num_evals(self) -> int:
+        return self.M * self.rf
+
+    @property
+    def matrices(self) -> ndarray:
+        return self.get_matrices(numpy.float64)
+
+    def get_matrices(self, dtype) -> ndarray:
+        # All N x M slices (N >= M) of the kernel stacked along the first axis, one per receptive field position
+        in_channels, out_channels = self.kernel.shape[-2:]
+        matrices = self.kernel.reshape(self.rf, in_channels, out_channels)
+        if in_channels < out_channels:
+            matrices = matrices.transpose(0, 2, 1)
+        return matrices.astype(dtype)
+
+
+class LayerWeightsExtractor:
+    @staticmethod
+    def from_keras_model(model) -> Iterator[LayerWeights]:
+        # Layer ids follow weightwatcher: every (sub)layer is counted, also the ones without weights
+        layer_id = 0
+        for layer in model.layers:
+            for sub_layer in getattr(layer, "submodules", None) or [layer]:
+                layer_type = LayerWeightsExtractor.get_layer_type(sub_layer)
+                if layer_type is not None:
+                    yield LayerWeights(layer_id, sub_layer.name, layer_type, sub_layer.get_weights()[0])
+                layer_id += 1
+
+    @staticmethod
+    def is_weights_file(path: str) -> bool:
+        # Only Keras' HDF5 format can be read without building the model
+        return os.path.isfile(path) and os.path.splitext(path)[1] in WEIGHTS_FILE_EXTENSIONS
+
+    @staticmethod
+    def from_weights_file(weights_path: str) -> Iterator[LayerWeights]:
+        # Reads the kernels straight from a Keras HDF5 weights file without building the model. Contiguous datasets are
+        # memory-mapped, so only the pages of the layer that is being analyzed are loaded. Layer ids follow the order
+        # of the layers in the file, where every kernel of a nested model counts as a layer of its own.
+        # h5py is only needed for this extraction path
+        import h5py
+        with h5py.File(weights_path, "r") as weights_file:
+            weights_group = weights_file["model_weights"] if "model_weights" in weights_file else weights_file
+            layer_id = 0
+            for layer_name in LayerWeightsExtractor._decode_names(weights_group.attrs["layer_names"]):
+                layer_group = weights_group[layer_name]
+                weight_names = LayerWeightsExtractor._decode_names(layer_group.attrs["weight_names"])
+                kernel_names = [
+                    weight_name for weight_name in weight_names if weight_name.split("/")[-1] == KERNEL_WEIGHT_NAME
+                ]
+                for kernel_name in kernel_names or [None]:
+                    layer_type = None if kernel_name is None else \
+                        KernelDimensionsToLayerTypeMapping.get(layer_group[kernel_name].ndim)
+                    if layer_type is not None:
+                        name_parts = kernel_name.split("/")
+                        yield LayerWeights(
+                            layer_id,
+                            name_parts[-2] if len(name_parts) > 1 else layer_name,
+                            layer_type,
+                            LayerWeightsExtractor._read_dataset(weights_path, layer_group[kernel_name])
+                        )
+                    layer_id += 1
+
+    @staticmethod
+    def _read_dataset(weights_path: str, dataset) -> ndarray:
+        offset = dataset.id.get_offset()
+        if offset is None or dataset.chunks is not None:
+            return dataset[()]
+        return numpy.memmap(weights_path, dtype=dataset.dtype, mode="r", offset=offset, shape=dataset.shape)
+
+    @staticmethod
+    def _decode_names(names) -> List[str]:
+        return [name.decode("utf8") if isinstance(name, bytes) else str(name) for name in names]
+
+    @staticmethod
+    def get_layer_type(layer) -> Optional[LayerType]:
+        for layer_class in type(layer).__mro__:
+            if layer_class.__name__ in KerasLayerClassToLayerTypeMapping:
+                return KerasLayerClassToLayerTypeMapping[layer_class.__name__]
+        return None
@@ -0,0 +1,27 @@
+import os
+import resource
+import sys
+from typing import Optional
+
+
+class MemoryUsage:
+    @staticmethod
+    def get_peak_rss_bytes() -> int:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+    @staticmethod
+    def get_current_rss_bytes() -> Optional[int]:
+        # Only available where procfs is, which covers the analysis nodes
+        try:
+            with open("/proc/self/statm") as statm_file:
+                return int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (FileNotFoundError, ValueError, IndexError):
+            return None
+
+    @staticmethod
+    def format_report() -> str:
+        current_rss = MemoryUsage.get_current_rss_bytes()
+        current = "unknown" if current_rss is None else f"{current_rss / 2 ** 20:.0f} MiB"
+        return f"RSS {current}, peak RSS {MemoryUsage.get_peak_rss_bytes() / 2 ** 20:.0f} MiB"
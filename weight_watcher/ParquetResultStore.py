@@ -0,0 +1,162 @@
+import os
+import tempfile
+from typing import List, Optional
+
+import pyarrow
+import pyarrow.dataset
+import pyarrow.parquet
+from pandas import DataFrame
+
+from .WeightWatcherResult import WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+from models import ModelIdentification
+
+DETAILS_DATASET_NAME = "details.parquet"
+SUMMARY_DATASET_NAME = "summary.parquet"
+PARTITION_FILE_NAME = "part-0.parquet"
+
+PARTITION_COLUMNS = [
+    WeightWatcherDetailsColumns.ARCHITECTURE.value,
+    WeightWatcherDetailsColumns.VARIANT.value,
+]
+
+DETAILS_SCHEMA = pyarrow.schema([
+    (WeightWatcherDetailsColumns.ARCHITECTURE.value, pyarrow.string()),
+    (WeightWatcherDetailsColumns.VARIANT.value, pyarrow.string()),
+    (WeightWatcherDetailsColumns.LAYER_ID.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.NAME.value, pyarrow.string()),
+    (WeightWatcherDetailsColumns.D.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.LAMBDA.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.M.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.N.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.ALPHA.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.APPROXIMATE.value, pyarrow.bool_()),
+    (WeightWatcherDetailsColumns.BEST_FIT.value, pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+    (WeightWatcherDetailsColumns.ENTROPY.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.ESD_SECONDS.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.FIT_SECONDS.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.HAS_ESD.value, pyarrow.bool_()),
+    (WeightWatcherDetailsColumns.LAMBDA_MAX.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.LAYER_TYPE.value, pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+    (WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.LOG_NORM.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.MATRIX_RANK.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.NORM.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.NUM_EVALS.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.NUM_PL_SPIKES.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.PRECISION.value, pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+    (WeightWatcherDetailsColumns.RANK_LOSS.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.RF.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.SHAPE.value, pyarrow.string()),
+    (WeightWatcherDetailsColumns.SIGMA.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.SPECTRAL_NORM.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.STABLE_RANK.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.SV_MAX.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.WARNING.value, pyarrow.dictionary(pyarrow.int8(), pyarrow.string())),
+    (WeightWatcherDetailsColumns.WEAK_RANK_LOSS.value, pyarrow.int64()),
+    (WeightWatcherDetailsColumns.XMAX.value, pyarrow.float64()),
+    (WeightWatcherDetailsColumns.XMIN.value, pyarrow.float64()),
+])
+
+SUMMARY_SCHEMA = pyarrow.schema([
+    (WeightWatcherSummaryColumns.ARCHITECTURE.value, pyarrow.string()),
+    (WeightWatcherSummaryColumns.VARIANT.value, pyarrow.string()),
+    (WeightWatcherSummaryColumns.LOG_NORM.value, pyarrow.float64()),
+    (WeightWatcherSummaryColumns.ALPHA.value, pyarrow.float64()),
+    (WeightWatcherSummaryColumns.ALPHA_WEIGHTED.value, pyarrow.float64()),
+    (WeightWatcherSummaryColumns.LOG_ALPHA_NORM.value, pyarrow.float64()),
+    (WeightWatcherSummaryColumns.LOG_SPECTRAL_NORM.value, pyarrow.float64()),
+    (WeightWatcherSummaryColumns.STABLE_RANK.value, pyarrow.float64()),
+])
+
+
+class ParquetResultStore:
+    # Keeps all details and summaries in two Parquet datasets that are hive-partitioned by architecture and variant,
+    # i.e. <base>/details.parquet/architecture=ConvNeXt/variant=Base/part-0.parquet
+    def __init__(self, results_base_path: str):
+        self._results_base_path = results_base_path
+
+    @staticmethod
+    def exists_at(results_base_path: str) -> bool:
+        return os.path.isdir(os.path.join(results_base_path, DETAILS_DATASET_NAME))
+
+    def exists(self, model_identification: ModelIdentification) -> bool:
+        return os.path.isfile(self._get_partition_path(DETAILS_DATASET_NAME, model_identification)) and \
+            os.path.isfile(self._get_partition_path(SUMMARY_DATASET_NAME, model_identification))
+
+    def write(self, model_identification: ModelIdentification, summary: DataFrame, details: DataFrame):
+        self._write_partition(DETAILS_DATASET_NAME, DETAILS_SCHEMA, model_identification, details)
+        self._write_partition(SUMMARY_DATASET_NAME, SUMMARY_SCHEMA, model_identification, summary)
+
+    def read_summaries(
+            self,
+            architectures: Optional[List[str]] = None,
+            variants: Optional[List[str]] = None
+    ) -> DataFrame:
+        return self._read_dataset(SUMMARY_DATASET_NAME, SUMMARY_SCHEMA, self._get_filter(architectures, variants))
+
+    def read_details(
+            self,
+            architectures: Optional[List[str]] = None,
+            variants: Optional[List[str]] = None,
+            layer_types: Optional[List[str]] = None
+    ) -> DataFrame:
+        return self._read_dataset(
+            DETAILS_DATASET_NAME,
+            DETAILS_SCHEMA,
+            self._get_filter(architectures, variants, layer_types)
+        )
+
+    @staticmethod
+    def _get_filter(
+            architectures: Optional[List[str]] = None,
+            variants: Optional[List[str]] = None,
+            layer_types: Optional[List[str]] = None
+    ):
+        # Partition filters prune whole directories, the layer type filter is pushed down to the row groups
+        dataset_filter = None
+        for column, values in [
+            (WeightWatcherDetailsColumns.ARCHITECTURE.value, architectures),
+            (WeightWatcherDetailsColumns.VARIANT.value, variants),
+            (WeightWatcherDetailsColumns.LAYER_TYPE.value, layer_types),
+        ]:
+            if values is None:
+                continue
+            column_filter = pyarrow.dataset.field(column).isin(values)
+            dataset_filter = column_filter if dataset_filter is None else dataset_filter & column_filter
+        return dataset_filter
+
+    def _read_dataset(self, dataset_name: str, schema: pyarrow.Schema, dataset_filter) -> DataFrame:
+        dataset_path = os.path.join(self._results_base_path, dataset_name)
+        if not os.path.isdir(dataset_path):
+            return schema.empty_table().to_pandas()
+        dataset = pyarrow.dataset.dataset(dataset_path, schema=schema, format="parquet", partitioning="hive")
+        return dataset.to_table(filter=dataset_filter).to_pandas()
+
+    def _write_partition(self, dataset_name: str, schema: pyarrow.Schema, model_identification: ModelIdentification,
+                         dataframe: DataFrame):
+        file_schema = pyarrow.schema([field for field in schema if field.name not in PARTITION_COLUMNS])
+        columns = [field.name for field in file_schema]
+        table = pyarrow.Table.from_pandas(
+            dataframe.reindex(columns=columns),
+            schema=file_schema,
+            preserve_index=False
+        )
+
+        partition_path = self._get_partition_path(dataset_name, model_identification)
+        os.makedirs(os.path.dirname(partition_path), exist_ok=True)
+        # Dataset discovery skips files starting with a dot, so readers never see the partially written file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(partition_path), prefix=".")
+        os.close(file_descriptor)
+        pyarrow.parquet.write_table(table, temporary_path)
+        os.replace(temporary_path, partition_path)
+
+    def _get_partition_path(self, dataset_name: str, model_identification: ModelIdentification) -> str:
+        return os.path.join(
+            self._results_base_path,
+            dataset_name,
+            f"{WeightWatcherDetailsColumns.ARCHITECTURE.value}={model_identification.architecture.name}",
+            f"{WeightWatcherDetailsColumns.VARIANT.value}={model_identification.variant.name}",
+            PARTITION_FILE_NAME
+        )
@@ -0,0 +1,51 @@
+import csv
+import os.path
+from typing import List, Dict, Any, Optional, IO
+
+import pandas
+from pandas import DataFrame
+
+from models import ModelIdentification
+
+PARTIAL_RESULTS_DIRECTORY = "partial"
+PARTIAL_DETAILS_FILE_NAME = "details.csv"
+
+
+class PartialDetailsWriter:
+    # Appends the details rows of a running analysis to <results>/partial/<architecture>/<variant>/details.csv.
+    # Every row is flushed right away, so the results of a long analysis can be inspected while it is still running.
+    def __init__(self, path: str, columns: List[str]):
+        self._path = path
+        self._columns = columns
+        self._file: Optional[IO] = None
+        self._writer: Optional[csv.DictWriter] = None
+
+    @staticmethod
+    def get_path(results_base_path: str, model_identification: ModelIdentification) -> str:
+        return os.path.join(
+            results_base_path,
+            PARTIAL_RESULTS_DIRECTORY,
+            model_identification.architecture.name,
+            model_identification.variant.name,
+            PARTIAL_DETAILS_FILE_NAME
+        )
+
+    def __enter__(self) -> "PartialDetailsWriter":
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._file = open(self._path, "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self._columns)
+        self._writer.writeheader()
+        self._file.flush()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        self._file = None
+        self._writer = None
+
+    def append(self, row: Dict[str, Any]):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def read(self) -> DataFrame:
+        return pandas.read_csv(self._path)
@@ -0,0 +1,159 @@
+import math
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy
+from numpy import ndarray
+
+# Thresholds as used by weightwatcher's analyze
+MIN_NUM_EVALS = 10
+EVALS_THRESH = 0.00001
+
+SUCCESS = "success"
+FAILED = "failed"
+OVER_TRAINED = "over-trained"
+UNDER_TRAINED = "under-trained"
+
+# Iterations of the bisection for alpha, which halves the bracket of every candidate at once
+ALPHA_BISECTION_STEPS = 60
+# Upper bound of the entries of the candidates x tail block that is evaluated at once for the KS distances. Blocks
+# that fit into the CPU caches are several times faster than larger ones.
+MAX_KS_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class XminCandidates:
+    # Sorted eigenvalues above the threshold, the index of the first occurrence of every candidate xmin in them and,
+    # per candidate, the mean of log(x / xmin) over its tail and log(xmax / xmin)
+    data: ndarray
+    log_data: ndarray
+    first_indices: ndarray
+    mean_logs: ndarray
+    log_ranges: ndarray
+
+
+@dataclass
+class PowerLawFit:
+    alpha: float
+    xmin: float
+    xmax: float
+    D: float
+    sigma: float
+    num_pl_spikes: int
+    status: str
+
+
+class PowerLawFitter:
+    # Clauset et al.: fit alpha by maximum likelihood for every candidate xmin and keep the xmin with the smallest
+    # Kolmogorov-Smirnov distance. Like weightwatcher, the power law is bounded above by xmax = lambda_max.
+    # The MLEs of all candidates come from suffix sums of the log eigenvalues and one bisection over all candidates
+    # (of all layers of a batch), so only the KS distances need a pass over the tail of every candidate.
+    @staticmethod
+    def fit(evals: ndarray) -> PowerLawFit:
+        return PowerLawFitter.fit_batch([evals])[0]
+
+    @staticmethod
+    def fit_batch(evals_per_layer: List[ndarray], executor: Optional[Executor] = None) -> List[PowerLawFit]:
+        # The KS distances of the layers are computed on the executor, if one is given
+        if not evals_per_layer:
+            return []
+        candidates = [PowerLawFitter._get_candidates(evals) for evals in evals_per_layer]
+        alphas = numpy.split(
+            PowerLawFitter._get_bounded_alphas(
+                numpy.concatenate([candidate.mean_logs for candidate in candidates]),
+                numpy.concatenate([candidate.log_ranges for candidate in candidates])
+            ),
+            numpy.cumsum([len(candidate.mean_logs) for candidate in candidates])[:-1]
+        )
+        map_function = map if executor is None else executor.map
+        return list(map_function(PowerLawFitter._select_fit, evals_per_layer, candidates, alphas))
+
+    @staticmethod
+    def _get_candidates(evals: ndarray) -> XminCandidates:
+        data = evals[evals > EVALS_THRESH]
+        if len(evals) < MIN_NUM_EVALS or len(data) == 0:
+            empty = numpy.zeros(0)
+            return XminCandidates(data, empty, numpy.zeros(0, dtype=numpy.int64), empty, empty)
+        _, first_indices = numpy.unique(data, return_index=True)
+        # The largest value has no tail to fit
+        first_indices = first_indices[:-1]
+        # The sums over the tails are accumulated in double precision, also for float32 spectra
+        log_data = numpy.log(data.astype(numpy.float64))
+        # Sum of the logs over the tail of every candidate in one pass
+        suffix_sums = numpy.cumsum(log_data[::-1])[::-1]
+        tail_lengths = len(data) - first_indices
+        log_xmins = log_data[first_indices]
+        mean_logs = suffix_sums[first_indices] / tail_lengths - log_xmins
+        log_ranges = math.log(float(evals[-1])) - log_xmins
+        return XminCandidates(data, log_data, first_indices, mean_logs, log_ranges)
+
+    @staticmethod
+    def _get_bounded_alphas(mean_logs: ndarray, log_ranges: ndarray) -> ndarray:
+        # The MLE a = alpha - 1 of a power law on [xmin, xmax] solves 1/a - t / (exp(a*t) - 1) = S, with
+        # t = log(xmax / xmin) and S the mean of log(x / xmin). The left side decreases from t/2 towards 0 and is
+        # below 1/a, so the root lies in (0, 1/S). Candidates without a root are NaN.
+        valid = (mean_logs > 0) & (mean_logs < log_ranges / 2)
+        mean_logs = numpy.where(valid, mean_logs, 1.0)
+        low = numpy.zeros_like(mean_logs)
+        high = 1.0 / mean_logs
+        with numpy.errstate(over="ignore", divide="ignore"):
+            for _ in range(ALPHA_BISECTION_STEPS):
+                a = (low + high) / 2
+                exponents = a * log_ranges
+                correction = numpy.where(exponents < 700, log_ranges / numpy.expm1(numpy.minimum(exponents, 700)), 0.0)
+                above = 1 / a - correction > mean_logs
+                low = numpy.where(above, a, low)
+                high = numpy.where(above, high, a)
+        return numpy.where(valid, 1 + (low + high) / 2, numpy.nan)
+
+    @staticmethod
+    def _select_fit(evals: ndarray, candidates: XminCandidates, alphas: ndarray) -> PowerLawFit:
+        xmax = float(evals[-1])
+        failed = PowerLawFit(-1, -1, xmax, -1, -1, -1, FAILED)
+        valid_candidates = numpy.flatnonzero(numpy.isfinite(alphas))
+        if len(valid_candidates) == 0:
+            return failed
+
+        first_indices = candidates.first_indices
+        distances = PowerLawFitter._get_ks_distances(
+            candidates.log_data,
+            first_indices[valid_candidates],
+            alphas[valid_candidates],
+            candidates.log_ranges[valid_candidates]
+        )
+        # The first minimum, i.e. the smallest xmin of equally good fits
+        best = valid_candidates[int(numpy.argmin(distances))]
+        D, alpha = float(distances.min()), float(alphas[best])
+        xmin = float(candidates.data[first_indices[best]])
+        tail_length = len(candidates.data) - first_indices[best]
+
+        status = SUCCESS
+        if alpha < 2.0:
+            status = OVER_TRAINED
+        elif alpha > 6.0:
+            status = UNDER_TRAINED
+        num_pl_spikes = int(len(evals) - numpy.searchsorted(evals, xmin))
+        return PowerLawFit(alpha, xmin, xmax, D, (alpha - 1) / math.sqrt(tail_length), num_pl_spikes, status)
+
+    @staticmethod
+    def _get_ks_distances(log_data: ndarray, first_indices: ndarray, alphas: ndarray, log_ranges: ndarray) -> ndarray:
+        # Maximum distance between the empirical CDF and the CDF of the bounded power law over the tail of every
+        # candidate. The candidates are evaluated in blocks against the tail of the first candidate of the block;
+        # the entries left of each candidate's own tail are masked out.
+        distances = numpy.empty(len(first_indices))
+        block_length = max(1, MAX_KS_BLOCK_SIZE // len(log_data))
+        for block_start in range(0, len(first_indices), block_length):
+            block = slice(block_start, block_start + block_length)
+            block_indices = first_indices[block]
+            tail_start = block_indices[0]
+            log_tail = log_data[tail_start:]
+            tail_lengths = (len(log_data) - block_indices)[:, None]
+            positions = numpy.arange(tail_start, len(log_data))[None, :] - block_indices[:, None]
+            exponents = (1 - alphas[block])[:, None]
+            log_ratios = log_tail[None, :] - log_data[block_indices][:, None]
+            theoretical_cdf = -numpy.expm1(exponents * log_ratios) / -numpy.expm1(exponents * log_ranges[block, None])
+            empirical_cdf = positions / tail_lengths
+            differences = numpy.where(positions >= 0, numpy.abs(theoretical_cdf - empirical_cdf), 0.0)
+            distances[block] = differences.max(axis=1)
+        return distances
@@ -0,0 +1,96 @@
+import json
+import logging
+import time
+import traceback
+from typing import Dict, Optional
+
+from .WeightWatcherResultService import WeightWatcherResultService, ResultStorageFormat
+from .WeightWatcherService import WeightWatcherService
+from .WorkQueue import WorkQueue, WorkItem, ClaimedWorkItem, DEFAULT_LEASE_SECONDS
+from models import ModelService, ModelRegistry, ModelDefinition
+from services import Instrumentation
+
+DEFAULT_POLL_SECONDS = 5.0
+
+
+class QueueWorker:
+    # Analyzes the items of a work queue until it is drained. Any number of workers can run on any number of nodes that
+    # share the queue and the results directory.
+    def __init__(self, work_queue: WorkQueue, result_service: WeightWatcherResultService,
+                 worker_id: Optional[str] = None, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self._work_queue = work_queue
+        self._result_service = result_service
+        self._worker_id = worker_id or WorkQueue.get_default_worker_id()
+        self._poll_seconds = poll_seconds
+        # One service per distinct set of options, as creating one imports weightwatcher
+        self._weight_watcher_services: Dict[str, WeightWatcherService] = {}
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    def run(self, max_items: Optional[int] = None) -> int:
+        # Waits as long as other workers hold items, as their leases may expire and the items come back
+        analyzed_items = 0
+        while max_items is None or analyzed_items < max_items:
+            self._work_queue.requeue_expired()
+            claimed_item = self._work_queue.claim(self._worker_id)
+            if claimed_item is None:
+                if self._work_queue.is_drained():
+                    break
+                time.sleep(self._poll_seconds)
+                continue
+            if self._analyze(claimed_item):
+                analyzed_items += 1
+        logging.log(logging.INFO, f"Worker {self._worker_id} analyzed {analyzed_items} models")
+        logging.log(logging.INFO, f"Stage timings: {Instrumentation.format_report()}")
+        return analyzed_items
+
+    def _analyze(self, claimed_item: ClaimedWorkItem) -> bool:
+        item = claimed_item.item
+        logging.log(logging.INFO, f"Worker {self._worker_id} claimed {item.model_identification} "
+                                  f"(attempt {item.attempts + 1})")
+        with self._work_queue.keep_alive(claimed_item):
+            try:
+                model_wrapper = self._get_model_wrapper(item)
+                result = self._get_weight_watcher_service(item).analyze_model_leased(model_wrapper)
+                if claimed_item.lease_lost.is_set():
+                    # Another worker analyzes the model again, its result is saved by that worker
+                    return False
+                self._result_service.save(result)
+                self._result_service.remove_partial(item.model_identification)
+            except Exception:
+                logging.exception(f"Analysis of {item.model_identification} failed")
+                self._work_queue.fail(claimed_item, traceback.format_exc())
+                return False
+        if not self._work_queue.complete(claimed_item):
+            logging.warning(f"Saved {item.model_identification}, but its lease expired before it was completed")
+        return True
+
+    def _get_weight_watcher_service(self, item: WorkItem) -> WeightWatcherService:
+        options_key = json.dumps(item.options, sort_keys=True)
+        if options_key not in self._weight_watcher_services:
+            self._weight_watcher_services[options_key] = WeightWatcherService.from_options(item.options)
+        return self._weight_watcher_services[options_key]
+
+    @staticmethod
+    def _get_model_wrapper(item: WorkItem):
+        if item.model_definition is not None:
+            try:
+                ModelRegistry.get(item.model_identification)
+            except TypeError:
+                ModelRegistry.register(ModelDefinition(**item.model_definition))
+        return ModelService.get(item.model_identification)
+
+
+def run_local_worker(queue_path: str, results_base_path: str, storage_format: ResultStorageFormat,
+                     lease_seconds: float = DEFAULT_LEASE_SECONDS, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                     log_level=logging.INFO) -> int:
+    # Entry point of the worker processes the coordinator starts on its own node
+    logging.basicConfig(level=log_level)
+    worker = QueueWorker(
+        WorkQueue(queue_path, lease_seconds),
+        WeightWatcherResultService(results_base_path, storage_format, update_index=False),
+        poll_seconds=poll_seconds
+    )
+    return worker.run()
@@ -0,0 +1,329 @@
+import json
+import os.path
+import tempfile
+import threading
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+import pandas
+from numpy import ndarray
+from pandas import DataFrame
+
+from .WeightWatcherResult import WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+from .WeightWatcherResultSchema import WeightWatcherResultSchema
+from models import ModelIdentification
+
+RESULT_INDEX_FILE_NAME = "index.json"
+
+INDEX_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+@dataclass
+class HistogramBins:
+    start: float
+    stop: float
+    log: bool = False
+    bins: int = 40
+
+    @property
+    def edges(self) -> ndarray:
+        if self.log:
+            return numpy.logspace(numpy.log10(self.start), numpy.log10(self.stop), self.bins + 1)
+        return numpy.linspace(self.start, self.stop, self.bins + 1)
+
+
+# Fixed bins per metric, so the histograms of all models can be added up. Values outside of the range are counted in
+# the first or the last bin.
+IndexMetricBins: Dict[str, HistogramBins] = {
+    WeightWatcherDetailsColumns.ALPHA.value: HistogramBins(0, 10),
+    WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value: HistogramBins(-5, 20),
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value: HistogramBins(-5, 30),
+    WeightWatcherDetailsColumns.NORM.value: HistogramBins(1e-4, 1e5, log=True),
+    WeightWatcherDetailsColumns.LOG_NORM.value: HistogramBins(-5, 5),
+    WeightWatcherDetailsColumns.SPECTRAL_NORM.value: HistogramBins(1e-4, 1e4, log=True),
+    WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM.value: HistogramBins(-5, 4),
+    WeightWatcherDetailsColumns.D.value: HistogramBins(0, 0.5),
+    WeightWatcherDetailsColumns.N.value: HistogramBins(10, 1e4, log=True),
+    WeightWatcherDetailsColumns.SIGMA.value: HistogramBins(0, 3),
+    WeightWatcherDetailsColumns.STABLE_RANK.value: HistogramBins(1, 1e3, log=True),
+    WeightWatcherDetailsColumns.NUM_PL_SPIKES.value: HistogramBins(1, 1e3, log=True),
+    WeightWatcherDetailsColumns.LAMBDA_MAX.value: HistogramBins(1e-4, 1e4, log=True),
+    WeightWatcherDetailsColumns.SV_MAX.value: HistogramBins(1e-2, 1e2, log=True),
+    WeightWatcherDetailsColumns.XMAX.value: HistogramBins(1e-4, 1e4, log=True),
+    WeightWatcherDetailsColumns.XMIN.value: HistogramBins(1e-4, 1e3, log=True),
+    WeightWatcherDetailsColumns.ENTROPY.value: HistogramBins(0, 1),
+}
+
+# weightwatcher reports -1 for these when no power law could be fitted, such layers are left out of their statistics
+FIT_METRIC_COLUMNS = [
+    WeightWatcherDetailsColumns.ALPHA.value,
+    WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherDetailsColumns.D.value,
+    WeightWatcherDetailsColumns.SIGMA.value,
+    WeightWatcherDetailsColumns.NUM_PL_SPIKES.value,
+    WeightWatcherDetailsColumns.XMIN.value,
+]
+
+INDEX_SUMMARY_COLUMNS = [
+    WeightWatcherSummaryColumns.LOG_NORM.value,
+    WeightWatcherSummaryColumns.ALPHA.value,
+    WeightWatcherSummaryColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherSummaryColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherSummaryColumns.LOG_SPECTRAL_NORM.value,
+    WeightWatcherSummaryColumns.STABLE_RANK.value,
+]
+
+LAYERS_COLUMN = "layers"
+MODELS_COLUMN = "models"
+
+
+@dataclass
+class MetricStatistics:
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    quantiles: List[float]
+    histogram: List[int]
+
+
+@dataclass
+class ResultIndexEntry:
+    architecture: str
+    variant: str
+    accuracy: float
+    layers: int
+    summary: Dict[str, float]
+    metrics: Dict[str, MetricStatistics] = field(default_factory=dict)
+
+
+class ResultIndex:
+    # Per-model summaries and statistics of the layer metrics, kept next to the results and updated whenever a result
+    # is saved. The per-architecture aggregates are derived from the model entries, so replacing a single model never
+    # needs the details of the others.
+    def __init__(self, index_path: str):
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, ResultIndexEntry] = self._load()
+
+    def __contains__(self, model_identification: ModelIdentification) -> bool:
+        return str(model_identification) in self._entries
+
+    @property
+    def model_names(self) -> List[str]:
+        return list(self._entries)
+
+    def get(self, model_identification: ModelIdentification) -> Optional[ResultIndexEntry]:
+        return self._entries.get(str(model_identification))
+
+    def update(self, model_identification: ModelIdentification, accuracy: float, summary: DataFrame,
+               details: DataFrame, save: bool = True):
+        entry = self.create_entry(model_identification, accuracy, summary, details)
+        with self._lock:
+            self._entries[str(model_identification)] = entry
+        if save:
+            self.save()
+
+    def invalidate(self, model_identification: ModelIdentification):
+        with self._lock:
+            removed = self._entries.pop(str(model_identification), None) is not None
+        if removed:
+            self.save()
+
+    def remove(self, model_names: List[str]):
+        with self._lock:
+            for model_name in model_names:
+                self._entries.pop(model_name, None)
+        self.save()
+
+    @staticmethod
+    def create_entry(model_identification: ModelIdentification, accuracy: float, summary: DataFrame,
+                     details: DataFrame) -> ResultIndexEntry:
+        metrics = details.reindex(columns=list(IndexMetricBins)).astype(numpy.float64)
+        if WeightWatcherDetailsColumns.ALPHA.value in details.columns:
+            failed_fits = (details[WeightWatcherDetailsColumns.ALPHA.value] == -1).to_numpy()
+            metrics.loc[failed_fits, FIT_METRIC_COLUMNS] = numpy.nan
+
+        # All statistics of all metrics in one pass, quantiles with the default interpolation of DataFrame.quantile
+        aggregates = metrics.agg(["count", "mean", "std", "min", "max"])
+        quantiles = metrics.quantile(INDEX_QUANTILES)
+        metric_statistics = {}
+        for metric, bins in IndexMetricBins.items():
+            values = metrics[metric].to_numpy()
+            values = values[numpy.isfinite(values)]
+            metric_statistics[metric] = MetricStatistics(
+                int(aggregates.at["count", metric]),
+                float(aggregates.at["mean", metric]),
+                float(aggregates.at["std", metric]),
+                float(aggregates.at["min", metric]),
+                float(aggregates.at["max", metric]),
+                [float(quantile) for quantile in quantiles[metric]],
+                ResultIndex._get_histogram(values, bins).tolist()
+            )
+
+        return ResultIndexEntry(
+            model_identification.architecture.name,
+            model_identification.variant.name,
+            numpy.nan if accuracy is None else float(accuracy),
+            len(details),
+            {column: float(summary[column].iloc[0]) for column in INDEX_SUMMARY_COLUMNS if column in summary.columns},
+            metric_statistics
+        )
+
+    def get_summaries(self, model_identifications: Optional[List[ModelIdentification]] = None) -> DataFrame:
+        # Same columns as the concatenated summaries of the results, plus the number of layers of every model. The
+        # rows follow the order of the given models, which have to be in the index.
+        if model_identifications is None:
+            entries = self._get_entries()
+        else:
+            entries = [self._entries[str(model_identification)] for model_identification in model_identifications]
+        rows = []
+        for entry in entries:
+            row = dict(entry.summary)
+            row.update({
+                WeightWatcherSummaryColumns.ACCURACY.value: entry.accuracy,
+                WeightWatcherSummaryColumns.ARCHITECTURE.value: entry.architecture,
+                WeightWatcherSummaryColumns.VARIANT.value: entry.variant,
+                LAYERS_COLUMN: entry.layers,
+            })
+            rows.append(row)
+        columns = INDEX_SUMMARY_COLUMNS + [
+            WeightWatcherSummaryColumns.ACCURACY.value,
+            WeightWatcherSummaryColumns.ARCHITECTURE.value,
+            WeightWatcherSummaryColumns.VARIANT.value,
+            LAYERS_COLUMN,
+        ]
+        return WeightWatcherResultSchema.apply_to_summary(DataFrame(rows, columns=columns))
+
+    def get_layer_counts(self) -> pandas.Series:
+        return pandas.Series({model_name: entry.layers for model_name, entry in self._entries.items()}, dtype="int64")
+
+    def get_model_aggregates(self, model_identifications: List[ModelIdentification],
+                             metrics: List[str]) -> DataFrame:
+        # One row per model with the mean, median, std, min and max of every metric over its layers
+        rows = []
+        for model_identification in model_identifications:
+            entry = self._entries.get(str(model_identification))
+            row = {}
+            for metric in metrics:
+                statistics = None if entry is None else entry.metrics.get(metric)
+                if statistics is None:
+                    continue
+                row.update({
+                    f"{metric}_mean": statistics.mean,
+                    f"{metric}_median": statistics.quantiles[INDEX_QUANTILES.index(0.5)],
+                    f"{metric}_std": statistics.std,
+                    f"{metric}_min": statistics.min,
+                    f"{metric}_max": statistics.max,
+                })
+            rows.append(row)
+        columns = [
+            f"{metric}_{aggregation}" for metric in metrics for aggregation in ["mean", "median", "std", "min", "max"]
+        ]
+        return DataFrame(rows, columns=columns, dtype=numpy.float64)
+
+    def get_architecture_aggregates(self, metrics: Optional[List[str]] = None) -> DataFrame:
+        # Means and standard deviations are pooled exactly from the model entries, the quantiles are interpolated from
+        # the summed histograms and are therefore approximate
+        metrics = list(IndexMetricBins) if metrics is None else metrics
+        rows = {}
+        for architecture, entries in self._group_by_architecture().items():
+            row = {MODELS_COLUMN: len(entries), LAYERS_COLUMN: sum(entry.layers for entry in entries)}
+            for metric in metrics:
+                statistics = [entry.metrics[metric] for entry in entries if entry.metrics[metric].count > 0]
+                row.update(self._pool_statistics(metric, statistics))
+            rows[architecture] = row
+        aggregates = DataFrame.from_dict(rows, orient="index")
+        aggregates.index.name = WeightWatcherSummaryColumns.ARCHITECTURE.value
+        return aggregates.sort_index()
+
+    def get_histograms(self, metric: str) -> Tuple[ndarray, Dict[str, ndarray]]:
+        # The bin edges and the summed histogram of every architecture
+        histograms = {}
+        for architecture, entries in sorted(self._group_by_architecture().items()):
+            histograms[architecture] = numpy.sum([entry.metrics[metric].histogram for entry in entries], axis=0)
+        return IndexMetricBins[metric].edges, histograms
+
+    def save(self):
+        with self._lock:
+            raw_entries = {model_name: asdict(entry) for model_name, entry in self._entries.items()}
+        index_directory = os.path.dirname(os.path.abspath(self._index_path))
+        os.makedirs(index_directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=index_directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as index_file:
+            json.dump(raw_entries, index_file)
+        os.replace(temporary_path, self._index_path)
+
+    @staticmethod
+    def _pool_statistics(metric: str, statistics: List[MetricStatistics]) -> Dict[str, float]:
+        pooled = {f"{metric}_{name}": numpy.nan for name in ["mean", "std", "min", "max"]}
+        pooled.update({f"{metric}_q{int(quantile * 100)}": numpy.nan for quantile in INDEX_QUANTILES})
+        count = sum(entry.count for entry in statistics)
+        if count == 0:
+            return pooled
+        counts = numpy.array([entry.count for entry in statistics], dtype=numpy.float64)
+        means = numpy.array([entry.mean for entry in statistics])
+        mean = float(numpy.sum(counts * means) / count)
+        # Within-model plus between-model sum of squares; models with a single layer have no std
+        stds = numpy.nan_to_num(numpy.array([entry.std for entry in statistics]))
+        sum_of_squares = numpy.sum((counts - 1) * stds ** 2) + numpy.sum(counts * (means - mean) ** 2)
+        pooled.update({
+            f"{metric}_mean": mean,
+            f"{metric}_std": float(numpy.sqrt(sum_of_squares / (count - 1))) if count > 1 else numpy.nan,
+            f"{metric}_min": min(entry.min for entry in statistics),
+            f"{metric}_max": max(entry.max for entry in statistics),
+        })
+        histogram = numpy.sum([entry.histogram for entry in statistics], axis=0)
+        for quantile in INDEX_QUANTILES:
+            pooled[f"{metric}_q{int(quantile * 100)}"] = ResultIndex._get_histogram_quantile(
+                histogram, IndexMetricBins[metric], quantile, pooled[f"{metric}_min"], pooled[f"{metric}_max"]
+            )
+        return pooled
+
+    @staticmethod
+    def _get_histogram(values: ndarray, bins: HistogramBins) -> ndarray:
+        edges = bins.edges
+        clipped_values = numpy.clip(values, edges[0], edges[-1])
+        return numpy.histogram(clipped_values, edges)[0]
+
+    @staticmethod
+    def _get_histogram_quantile(histogram: ndarray, bins: HistogramBins, quantile: float, minimum: float,
+                                maximum: float) -> float:
+        # Linear interpolation within the bin (in log space for log bins), clamped to the exact minimum and maximum
+        cumulative = numpy.cumsum(histogram)
+        target = quantile * cumulative[-1]
+        bin_index = int(numpy.searchsorted(cumulative, target))
+        bin_index = min(bin_index, len(histogram) - 1)
+        previous = cumulative[bin_index - 1] if bin_index > 0 else 0
+        fraction = (target - previous) / histogram[bin_index] if histogram[bin_index] > 0 else 0.5
+        edges = numpy.log10(bins.edges) if bins.log else bins.edges
+        value = edges[bin_index] + fraction * (edges[bin_index + 1] - edges[bin_index])
+        value = 10 ** value if bins.log else value
+        return float(numpy.clip(value, minimum, maximum))
+
+    def _group_by_architecture(self) -> Dict[str, List[ResultIndexEntry]]:
+        groups: Dict[str, List[ResultIndexEntry]] = {}
+        for entry in self._get_entries():
+            groups.setdefault(entry.architecture, []).append(entry)
+        return groups
+
+    def _get_entries(self) -> List[ResultIndexEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def _load(self) -> Dict[str, ResultIndexEntry]:
+        try:
+            with open(self._index_path) as index_file:
+                raw_entries = json.load(index_file)
+        except FileNotFoundError:
+            return {}
+        entries = {}
+        for model_name, raw_entry in raw_entries.items():
+            raw_entry["metrics"] = {
+                metric: MetricStatistics(**statistics) for metric, statistics in raw_entry["metrics"].items()
+            }
+            entries[model_name] = ResultIndexEntry(**raw_entry)
+        return entries
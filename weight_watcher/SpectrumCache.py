@@ -0,0 +1,72 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+import numpy
+from numpy import ndarray
+
+DEFAULT_MAX_SIZE_BYTES = 256 * 1024 * 1024
+SPECTRUM_FILE_EXTENSION = ".npy"
+
+
+class SpectrumCache:
+    # Content-addressed store of the singular values of a layer's matrices, keyed by a hash of the weight tensor.
+    # Entries are plain .npy files that are memory-mapped on read; the least recently used ones are evicted once all
+    # entries under root_path (e.g. the caches of all models) grow beyond max_size_bytes.
+    def __init__(self, cache_path: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES, root_path: Optional[str] = None):
+        self._cache_path = cache_path
+        self._max_size_bytes = max_size_bytes
+        self._root_path = cache_path if root_path is None else root_path
+
+    @staticmethod
+    def get_key(kernel: ndarray) -> str:
+        kernel = numpy.ascontiguousarray(kernel)
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{kernel.dtype.str}{kernel.shape}".encode())
+        digest.update(kernel.data)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[ndarray]:
+        path = self._get_path(key)
+        try:
+            singular_values = numpy.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        # Mark as recently used for the eviction
+        os.utime(path)
+        return singular_values
+
+    def put(self, key: str, singular_values: ndarray):
+        os.makedirs(self._cache_path, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self._cache_path, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as spectrum_file:
+            numpy.save(spectrum_file, singular_values)
+        os.replace(temporary_path, self._get_path(key))
+
+    def evict(self):
+        # Entries of other caches under the root may be removed by their own processes at the same time
+        entries = []
+        for directory_path, _, file_names in os.walk(self._root_path):
+            for file_name in file_names:
+                if not file_name.endswith(SPECTRUM_FILE_EXTENSION):
+                    continue
+                path = os.path.join(directory_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self._max_size_bytes:
+                break
+            size -= entry_size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._cache_path, key + SPECTRUM_FILE_EXTENSION)
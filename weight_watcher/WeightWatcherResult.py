@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
+from typing import Callable
 
 from pandas import DataFrame
 
-from models import ModelIdentification
+from models import ModelIdentification, Checkpoint
 
 
 class WeightWatcherDetailsColumns(Enum):
@@ -20,8 +21,11 @@ class WeightWatcherDetailsColumns(Enum):
     N = "N"
     ALPHA = "alpha"
     ALPHA_WEIGHTED = "alpha_weighted"
+    APPROXIMATE = "approximate"
     BEST_FIT = "best_fit"
     ENTROPY = "entropy"
+    ESD_SECONDS = "esd_seconds"
+    FIT_SECONDS = "fit_seconds"
     HAS_ESD = "has_esd"
     LAMBDA_MAX = "lambda_max"
     LAYER_TYPE = "layer_type"
@@ -32,8 +36,10 @@ class WeightWatcherDetailsColumns(Enum):
     NORM = "norm"
     NUM_EVALS = "num_evals"
     NUM_PL_SPIKES = "num_pl_spikes"
+    PRECISION = "precision"
     RANK_LOSS = "rank_loss"
     RF = "rf"
+    SHAPE = "shape"
     SIGMA = "sigma"
     SPECTRAL_NORM = "spectral_norm"
     STABLE_RANK = "stable_rank"
@@ -56,9 +62,40 @@ class WeightWatcherSummaryColumns(Enum):
     STABLE_RANK = "stable_rank"
 
 
+# Added to the summaries and details of checkpoint results, which are stored as a time series per training run
+class CheckpointColumns(Enum):
+    SERIES = "series"
+    STEP = "step"
+
+
 @dataclass
 class WeightWatcherResult:
     model_identification: ModelIdentification
     model_accuracy: float
     summary: DataFrame
     details: DataFrame
+
+
+@dataclass(eq=False, repr=False)
+class WeightWatcherResultHandle:
+    # Same interface as WeightWatcherResult, but holds only the identification and the summary; the details are
+    # fetched through the loader on every access, which is expected to cache them. No subclass of the result, as its
+    # generated methods (eq, repr, asdict) would load the details. Handles are compared by identity.
+    model_identification: ModelIdentification
+    model_accuracy: float
+    summary: DataFrame
+    details_loader: Callable[[], DataFrame] = field(repr=False)
+
+    @property
+    def details(self) -> DataFrame:
+        return self.details_loader()
+
+    def __repr__(self):
+        return f"WeightWatcherResultHandle({self.model_identification})"
+
+
+@dataclass
+class CheckpointResult:
+    checkpoint: Checkpoint
+    summary: DataFrame
+    details: DataFrame
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os.path
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Any
+
+from models import ModelIdentification, ModelWrapperBase
+
+HASH_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+@dataclass
+class WeightWatcherResultManifestEntry:
+    weights_hash: str
+    weights_file_size: int
+    weights_file_mtime: float
+    weightwatcher_version: str
+    engine: str
+    # Hash of WeightWatcherService.get_result_options, entries written before it was recorded never match
+    options_hash: Optional[str] = None
+
+
+class WeightWatcherResultManifest:
+    # Records the inputs every saved result was computed from, so that a batch run can skip models whose
+    # weights and analysis setup did not change since their results were written
+    def __init__(self, manifest_path: str):
+        self._manifest_path = manifest_path
+        self._entries: Dict[str, WeightWatcherResultManifestEntry] = self._load()
+
+    def get(self, model_identification: ModelIdentification) -> Optional[WeightWatcherResultManifestEntry]:
+        return self._entries.get(str(model_identification))
+
+    def update(self, model_identification: ModelIdentification, entry: WeightWatcherResultManifestEntry):
+        self._entries[str(model_identification)] = entry
+        self._save()
+
+    def invalidate(self, model_identification: ModelIdentification):
+        if self._entries.pop(str(model_identification), None) is not None:
+            self._save()
+
+    def create_entry(self, model_wrapper: ModelWrapperBase, weightwatcher_version: str, engine: str,
+                     result_options: Dict[str, Any]) -> Optional[WeightWatcherResultManifestEntry]:
+        # Returns None as long as the weights have not been downloaded, as there is nothing to compare against then
+        try:
+            weights_file_stat = os.stat(model_wrapper.weights_path)
+        except FileNotFoundError:
+            return None
+
+        # Hashing multi-GB weight files is slow, so the previous hash is reused while size and mtime are unchanged
+        previous_entry = self.get(model_wrapper.identification)
+        if previous_entry is not None and \
+                previous_entry.weights_file_size == weights_file_stat.st_size and \
+                previous_entry.weights_file_mtime == weights_file_stat.st_mtime:
+            weights_hash = previous_entry.weights_hash
+        else:
+            weights_hash = self.get_file_hash(model_wrapper.weights_path)
+
+        return WeightWatcherResultManifestEntry(
+            weights_hash,
+            weights_file_stat.st_size,
+            weights_file_stat.st_mtime,
+            weightwatcher_version,
+            engine,
+            self.get_options_hash(result_options)
+        )
+
+    @staticmethod
+    def get_options_hash(options: Dict[str, Any]) -> str:
+        # Independent of the order of the options
+        return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def get_file_hash(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self) -> Dict[str, WeightWatcherResultManifestEntry]:
+        try:
+            with open(self._manifest_path) as manifest_file:
+                raw_entries = json.load(manifest_file)
+        except FileNotFoundError:
+            return {}
+        return {key: WeightWatcherResultManifestEntry(**entry) for key, entry in raw_entries.items()}
+
+    def _save(self):
+        manifest_directory = os.path.dirname(os.path.abspath(self._manifest_path))
+        os.makedirs(manifest_directory, exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=manifest_directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as manifest_file:
+            json.dump({key: asdict(entry) for key, entry in self._entries.items()}, manifest_file, indent=4)
+        os.replace(temporary_path, self._manifest_path)
@@ -0,0 +1,171 @@
+import logging
+from typing import Dict, List
+
+import numpy
+import pandas
+from pandas import DataFrame
+from pandas.api.types import union_categoricals
+
+from .WeightWatcherResult import WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
+
+CATEGORY = "category"
+# Written by to_csv with the index of the frame, which older results still contain
+INDEX_COLUMN = "Unnamed: 0"
+
+DETAILS_DTYPES: Dict[str, str] = {
+    WeightWatcherDetailsColumns.ACCURACY.value: "float64",
+    WeightWatcherDetailsColumns.ARCHITECTURE.value: CATEGORY,
+    WeightWatcherDetailsColumns.VARIANT.value: CATEGORY,
+    WeightWatcherDetailsColumns.LAYER_ID.value: "int32",
+    WeightWatcherDetailsColumns.NAME.value: CATEGORY,
+    WeightWatcherDetailsColumns.D.value: "float64",
+    WeightWatcherDetailsColumns.LAMBDA.value: "float64",
+    WeightWatcherDetailsColumns.M.value: "int32",
+    WeightWatcherDetailsColumns.N.value: "int32",
+    WeightWatcherDetailsColumns.ALPHA.value: "float64",
+    WeightWatcherDetailsColumns.ALPHA_WEIGHTED.value: "float64",
+    WeightWatcherDetailsColumns.APPROXIMATE.value: "bool",
+    WeightWatcherDetailsColumns.BEST_FIT.value: CATEGORY,
+    WeightWatcherDetailsColumns.ENTROPY.value: "float64",
+    # Timings do not need double precision
+    WeightWatcherDetailsColumns.ESD_SECONDS.value: "float32",
+    WeightWatcherDetailsColumns.FIT_SECONDS.value: "float32",
+    WeightWatcherDetailsColumns.HAS_ESD.value: "bool",
+    WeightWatcherDetailsColumns.LAMBDA_MAX.value: "float64",
+    WeightWatcherDetailsColumns.LAYER_TYPE.value: CATEGORY,
+    WeightWatcherDetailsColumns.LOG_ALPHA_NORM.value: "float64",
+    WeightWatcherDetailsColumns.LOG_NORM.value: "float64",
+    WeightWatcherDetailsColumns.LOG_SPECTRAL_NORM.value: "float64",
+    WeightWatcherDetailsColumns.MATRIX_RANK.value: "int32",
+    WeightWatcherDetailsColumns.NORM.value: "float64",
+    WeightWatcherDetailsColumns.NUM_EVALS.value: "int32",
+    WeightWatcherDetailsColumns.NUM_PL_SPIKES.value: "int32",
+    WeightWatcherDetailsColumns.PRECISION.value: CATEGORY,
+    WeightWatcherDetailsColumns.RANK_LOSS.value: "int32",
+    WeightWatcherDetailsColumns.RF.value: "int32",
+    WeightWatcherDetailsColumns.SHAPE.value: CATEGORY,
+    WeightWatcherDetailsColumns.SIGMA.value: "float64",
+    WeightWatcherDetailsColumns.SPECTRAL_NORM.value: "float64",
+    WeightWatcherDetailsColumns.STABLE_RANK.value: "float64",
+    WeightWatcherDetailsColumns.SV_MAX.value: "float64",
+    WeightWatcherDetailsColumns.WARNING.value: CATEGORY,
+    WeightWatcherDetailsColumns.WEAK_RANK_LOSS.value: "int32",
+    WeightWatcherDetailsColumns.XMAX.value: "float64",
+    WeightWatcherDetailsColumns.XMIN.value: "float64",
+}
+
+SUMMARY_DTYPES: Dict[str, str] = {
+    WeightWatcherSummaryColumns.ACCURACY.value: "float64",
+    WeightWatcherSummaryColumns.ARCHITECTURE.value: CATEGORY,
+    WeightWatcherSummaryColumns.VARIANT.value: CATEGORY,
+    WeightWatcherSummaryColumns.LOG_NORM.value: "float64",
+    WeightWatcherSummaryColumns.ALPHA.value: "float64",
+    WeightWatcherSummaryColumns.ALPHA_WEIGHTED.value: "float64",
+    WeightWatcherSummaryColumns.LOG_ALPHA_NORM.value: "float64",
+    WeightWatcherSummaryColumns.LOG_SPECTRAL_NORM.value: "float64",
+    WeightWatcherSummaryColumns.STABLE_RANK.value: "float64",
+}
+
+# Columns that were added after results had already been stored, filled with these values when missing
+OPTIONAL_DETAILS_COLUMNS = {
+    WeightWatcherDetailsColumns.APPROXIMATE.value: False,
+    WeightWatcherDetailsColumns.ESD_SECONDS.value: numpy.nan,
+    WeightWatcherDetailsColumns.FIT_SECONDS.value: numpy.nan,
+    WeightWatcherDetailsColumns.SHAPE.value: numpy.nan,
+    WeightWatcherDetailsColumns.PRECISION.value: numpy.nan,
+}
+
+# Added by the result service on load, so they are not required in what is stored
+IDENTIFICATION_COLUMNS = [
+    WeightWatcherDetailsColumns.ACCURACY.value,
+    WeightWatcherDetailsColumns.ARCHITECTURE.value,
+    WeightWatcherDetailsColumns.VARIANT.value,
+]
+
+# Nullable counterparts for columns that contain missing values, e.g. the counts of layers weightwatcher skipped
+NULLABLE_DTYPES = {
+    "int32": "Int32",
+    "bool": "boolean",
+}
+
+
+class WeightWatcherResultSchema:
+    # Casts the result frames to compact dtypes: the repeated strings become categoricals and the counts narrow
+    # integers. Columns that are not part of the schema are kept as they are.
+    @staticmethod
+    def apply_to_details(details: DataFrame) -> DataFrame:
+        details = details.drop(columns=[INDEX_COLUMN], errors="ignore")
+        for column, default_value in OPTIONAL_DETAILS_COLUMNS.items():
+            if column not in details.columns:
+                details[column] = default_value
+        WeightWatcherResultSchema._validate(details, DETAILS_DTYPES, "details")
+        return WeightWatcherResultSchema._cast(details, DETAILS_DTYPES)
+
+    @staticmethod
+    def apply_to_summary(summary: DataFrame) -> DataFrame:
+        summary = summary.drop(columns=[INDEX_COLUMN], errors="ignore")
+        WeightWatcherResultSchema._validate(summary, SUMMARY_DTYPES, "summary")
+        return WeightWatcherResultSchema._cast(summary, SUMMARY_DTYPES)
+
+    @staticmethod
+    def get_csv_dtypes() -> Dict[str, str]:
+        # The string columns are parsed into categoricals directly. The integer columns are cast afterwards, as older
+        # results store them as floats.
+        return {column: dtype for column, dtype in DETAILS_DTYPES.items() if dtype == CATEGORY}
+
+    @staticmethod
+    def get_constant_categorical(value: str, length: int) -> pandas.Categorical:
+        return pandas.Categorical.from_codes(numpy.zeros(length, dtype=numpy.int8), categories=[value])
+
+    @staticmethod
+    def concat(frames: List[DataFrame], **kwargs) -> DataFrame:
+        # pandas.concat turns categoricals with different categories into object columns, so the categories are
+        # unified (and sorted, which keeps the order of groupby and factorize alphabetical) beforehand
+        frames = list(frames)
+        if not frames:
+            return DataFrame()
+        categorical_columns = [
+            column for column in frames[0].columns
+            if all(column in frame.columns and isinstance(frame[column].dtype, pandas.CategoricalDtype)
+                   for frame in frames)
+        ]
+        if categorical_columns:
+            frames = [frame.copy(deep=False) for frame in frames]
+            for column in categorical_columns:
+                categories = union_categoricals(
+                    [frame[column] for frame in frames],
+                    sort_categories=True
+                ).categories
+                for frame in frames:
+                    frame[column] = frame[column].cat.set_categories(categories)
+        return pandas.concat(frames, **kwargs)
+
+    @staticmethod
+    def _validate(dataframe: DataFrame, dtypes: Dict[str, str], name: str):
+        missing_columns = [
+            column for column in dtypes if column not in dataframe.columns and column not in IDENTIFICATION_COLUMNS
+        ]
+        if missing_columns:
+            raise ValueError(f"The {name} are missing the columns {missing_columns}")
+        unknown_columns = [column for column in dataframe.columns if column not in dtypes]
+        if unknown_columns:
+            logging.log(logging.DEBUG, f"The {name} have columns that are not in the schema: {unknown_columns}")
+
+    @staticmethod
+    def _cast(dataframe: DataFrame, dtypes: Dict[str, str]) -> DataFrame:
+        # The frame is rebuilt once from its converted columns. Converting on the numpy arrays avoids the overhead per
+        # column of DataFrame.astype, which is larger than the conversion itself for frames of a few hundred layers.
+        columns = {}
+        for column, values in dataframe.items():
+            dtype = dtypes.get(column)
+            if dtype == CATEGORY:
+                if not isinstance(values.dtype, pandas.CategoricalDtype):
+                    values = values.astype(CATEGORY)
+            elif dtype is not None and values.dtype != dtype:
+                array = values.to_numpy()
+                if dtype in NULLABLE_DTYPES and pandas.isna(array).any():
+                    values = values.astype(NULLABLE_DTYPES[dtype])
+                else:
+                    values = array.astype(dtype)
+            columns[column] = values
+        return DataFrame(columns, index=dataframe.index, copy=False)
@@ -1,64 +1,409 @@
+import functools
 import json
+import logging
 import os.path
+import tempfile
 from dataclasses import asdict
-from typing import List, Dict, Any
+from enum import Enum, auto
+from typing import List, Dict, Any, Callable, IO, Optional
 
 import pandas
 from pandas import DataFrame
 
-from .WeightWatcherResult import WeightWatcherResult, WeightWatcherSummaryColumns, WeightWatcherDetailsColumns
-from models import ModelIdentification, ModelService, ModelArchitecture
+from .DetailsCache import DetailsCache, DEFAULT_MAX_MEMORY_BYTES
+from .ParquetResultStore import ParquetResultStore, PARTITION_COLUMNS
+from .PartialDetailsWriter import PartialDetailsWriter, PARTIAL_RESULTS_DIRECTORY
+from .ResultIndex import ResultIndex, RESULT_INDEX_FILE_NAME
+from .WeightWatcherResult import WeightWatcherResult, WeightWatcherResultHandle, WeightWatcherSummaryColumns, \
+    WeightWatcherDetailsColumns
+from .WeightWatcherResultSchema import WeightWatcherResultSchema
+from models import ModelIdentification, ModelService, ModelArchitecture, ModelMetadataRegistry
+from services import Instrumentation, InstrumentationStage
+
+
+PARTIAL_SUMMARY_COLUMNS = [
+    WeightWatcherSummaryColumns.LOG_NORM.value,
+    WeightWatcherSummaryColumns.ALPHA.value,
+    WeightWatcherSummaryColumns.ALPHA_WEIGHTED.value,
+    WeightWatcherSummaryColumns.LOG_ALPHA_NORM.value,
+    WeightWatcherSummaryColumns.LOG_SPECTRAL_NORM.value,
+    WeightWatcherSummaryColumns.STABLE_RANK.value,
+]
+
+
+# Results of the analysis configs are stored under <results>/configs/<config name>, each like the results of a run
+CONFIG_RESULTS_DIRECTORY = "configs"
+
+
+class ResultStorageFormat(Enum):
+    CSV = auto()
+    PARQUET = auto()
 
 
 class WeightWatcherResultService:
-    def __init__(self, results_base_path: str):
+    def __init__(self, results_base_path: str, storage_format: ResultStorageFormat = ResultStorageFormat.CSV,
+                 details_cache_size: int = DEFAULT_MAX_MEMORY_BYTES, update_index: bool = True):
         self._results_base_path = results_base_path
+        self._storage_format = storage_format
+        self._parquet_store = ParquetResultStore(results_base_path)
+        self._details_cache = DetailsCache(details_cache_size)
+        self._result_index = ResultIndex(os.path.join(results_base_path, RESULT_INDEX_FILE_NAME))
+        # Processes that save next to others (e.g. queue workers) leave the index to one process, as concurrent
+        # writers would overwrite each other's entries. get_result_index adds the missing results later on.
+        self._update_index = update_index
+
+    @property
+    def results_base_path(self) -> str:
+        return self._results_base_path
+
+    @staticmethod
+    def detect_storage_format(results_base_path: str) -> ResultStorageFormat:
+        if ParquetResultStore.exists_at(results_base_path):
+            return ResultStorageFormat.PARQUET
+        return ResultStorageFormat.CSV
 
     def save(self, analysis_result: WeightWatcherResult):
+        with Instrumentation.timer(InstrumentationStage.SAVE, model=str(analysis_result.model_identification),
+                                   storage_format=self._storage_format.name):
+            self._save(analysis_result)
+            self._details_cache.invalidate(str(analysis_result.model_identification))
+            if self._update_index:
+                self._result_index.update(
+                    analysis_result.model_identification,
+                    analysis_result.model_accuracy,
+                    analysis_result.summary,
+                    analysis_result.details
+                )
+
+    def get_config_result_service(self, config_name: str) -> "WeightWatcherResultService":
+        return WeightWatcherResultService(
+            os.path.join(self._results_base_path, CONFIG_RESULTS_DIRECTORY, config_name),
+            self._storage_format,
+            update_index=self._update_index
+        )
+
+    def invalidate(self, model_identification: ModelIdentification):
+        # Called before a model is re-analyzed, so neither the index nor the cache serve its previous result
+        self._result_index.invalidate(model_identification)
+        self._details_cache.invalidate(str(model_identification))
+
+    def get_result_index(self) -> ResultIndex:
+        # Adds the results that were stored before the index existed and drops the ones that no longer exist. Only
+        # the details of the added results are read.
+        handles = self.load_all_handles()
+        stored_models = {str(handle.model_identification) for handle in handles}
+        removed_models = [
+            model_name for model_name in self._result_index.model_names if model_name not in stored_models
+        ]
+        missing_handles = [handle for handle in handles if handle.model_identification not in self._result_index]
+        for handle in missing_handles:
+            self._result_index.update(
+                handle.model_identification,
+                handle.model_accuracy,
+                handle.summary,
+                self._load_details(handle.model_identification),
+                save=False
+            )
+        if removed_models or missing_handles:
+            logging.log(logging.INFO, f"Updated the result index: added {len(missing_handles)} and removed "
+                                      f"{len(removed_models)} models")
+            self._result_index.remove(removed_models)
+        return self._result_index
+
+    def _save(self, analysis_result: WeightWatcherResult):
+        if self._storage_format is ResultStorageFormat.PARQUET:
+            self._parquet_store.write(
+                analysis_result.model_identification,
+                WeightWatcherResultSchema.apply_to_summary(analysis_result.summary),
+                WeightWatcherResultSchema.apply_to_details(analysis_result.details)
+            )
+            return
+
         base_path = self._get_results_base_path(analysis_result.model_identification)
         os.makedirs(base_path, exist_ok=True)
-        analysis_result.details.to_csv(os.path.join(base_path, "details.csv"))
-        with open(os.path.join(base_path, "summary.json"), "w") as summary_file:
-            json.dump(analysis_result.summary, summary_file, indent=4)
+        summary = analysis_result.summary.iloc[0].to_dict()
+        details = WeightWatcherResultSchema.apply_to_details(analysis_result.details)
+        # Both files are replaced atomically, so an interrupted save never leaves a truncated result behind
+        self._write_atomically(
+            os.path.join(base_path, "details.csv"),
+            lambda details_file: details.to_csv(details_file, index=False)
+        )
+        self._write_atomically(
+            os.path.join(base_path, "summary.json"),
+            lambda summary_file: json.dump(summary, summary_file, indent=4)
+        )
 
     def save_many(self, analysis_results: List[WeightWatcherResult]):
         for analysis_result in analysis_results:
             self.save(analysis_result)
 
-    def load(self, model_identification: ModelIdentification) -> WeightWatcherResult:
+    def exists(self, model_identification: ModelIdentification) -> bool:
+        if self._storage_format is ResultStorageFormat.PARQUET:
+            return self._parquet_store.exists(model_identification)
+
         base_path = self._get_results_base_path(model_identification)
+        return os.path.isfile(os.path.join(base_path, "details.csv")) and \
+            os.path.isfile(os.path.join(base_path, "summary.json"))
+
+    def load(self, model_identification: ModelIdentification) -> WeightWatcherResult:
+        summary = self._load_summary(model_identification)
+        details = self._load_details(model_identification)
+        return WeightWatcherResult(model_identification, summary[WeightWatcherSummaryColumns.ACCURACY.value].iloc[0],
+                                   summary, details)
+
+    @Instrumentation.timed(InstrumentationStage.LOAD)
+    def load_all(
+            self,
+            architectures: Optional[List[ModelArchitecture]] = None,
+            variant_names: Optional[List[str]] = None,
+            layer_types: Optional[List[str]] = None
+    ) -> List[WeightWatcherResult]:
+        architecture_names = None if architectures is None else [architecture.name for architecture in architectures]
+        if self._storage_format is ResultStorageFormat.PARQUET:
+            return self._load_all_from_parquet(architecture_names, variant_names, layer_types)
+
+        results = []
+        for model_identification in self._list_csv_results(architecture_names, variant_names):
+            result = self.load(model_identification)
+            if layer_types is not None:
+                layer_type_mask = result.details[WeightWatcherDetailsColumns.LAYER_TYPE.value].isin(layer_types)
+                result.details = result.details[layer_type_mask]
+            results.append(result)
+        return results
+
+    @Instrumentation.timed(InstrumentationStage.LOAD)
+    def load_all_handles(
+            self,
+            architectures: Optional[List[ModelArchitecture]] = None,
+            variant_names: Optional[List[str]] = None,
+            include_partial: bool = False
+    ) -> List[WeightWatcherResultHandle]:
+        # Only the summaries are read; the details are loaded on first access and kept in the bounded details cache
+        architecture_names = None if architectures is None else [architecture.name for architecture in architectures]
+        if self._storage_format is ResultStorageFormat.PARQUET:
+            summaries = self._parquet_store.read_summaries(architecture_names, variant_names)
+            identified_summaries = [
+                (self._get_model_identification(architecture_name, variant_name), summary.reset_index(drop=True))
+                for (architecture_name, variant_name), summary in summaries.groupby(PARTITION_COLUMNS, sort=False)
+            ]
+            identified_summaries = [
+                (model_identification, summary) for model_identification, summary in identified_summaries
+                if model_identification is not None
+            ]
+            identified_summaries = [
+                (model_identification, WeightWatcherResultSchema.apply_to_summary(
+                    self._add_identification_columns(summary, model_identification)
+                ))
+                for model_identification, summary in identified_summaries
+            ]
+        else:
+            identified_summaries = [
+                (model_identification, self._load_summary(model_identification))
+                for model_identification in self._list_csv_results(architecture_names, variant_names)
+            ]
+
+        handles = [
+            WeightWatcherResultHandle(
+                model_identification,
+                summary[WeightWatcherSummaryColumns.ACCURACY.value].iloc[0],
+                summary,
+                functools.partial(self._get_cached_details, model_identification)
+            )
+            for model_identification, summary in identified_summaries
+        ]
+        if include_partial:
+            complete_models = {str(model_identification) for model_identification, _ in identified_summaries}
+            handles += [
+                handle for handle in self.load_partial_handles(architectures, variant_names)
+                if str(handle.model_identification) not in complete_models
+            ]
+        return handles
+
+    def load_partial_handles(
+            self,
+            architectures: Optional[List[ModelArchitecture]] = None,
+            variant_names: Optional[List[str]] = None
+    ) -> List[WeightWatcherResultHandle]:
+        # Results of analyses that are still running (or were interrupted). Their details are re-read on every access
+        # and the summary is the mean of the layers analyzed so far.
+        architecture_names = None if architectures is None else [architecture.name for architecture in architectures]
+        handles = []
+        partial_results_path = os.path.join(self._results_base_path, PARTIAL_RESULTS_DIRECTORY)
+        if not os.path.isdir(partial_results_path):
+            return handles
+        for model_identification in self._list_result_directories(partial_results_path, architecture_names,
+                                                                  variant_names):
+            details_path = PartialDetailsWriter.get_path(self._results_base_path, model_identification)
+            try:
+                details = self._load_partial_details(model_identification, details_path)
+            except FileNotFoundError:
+                continue
+            summary = DataFrame([details[PARTIAL_SUMMARY_COLUMNS].mean()])
+            summary = WeightWatcherResultSchema.apply_to_summary(
+                self._add_identification_columns(summary, model_identification)
+            )
+            handles.append(WeightWatcherResultHandle(
+                model_identification,
+                summary[WeightWatcherSummaryColumns.ACCURACY.value].iloc[0],
+                summary,
+                functools.partial(self._load_partial_details, model_identification, details_path)
+            ))
+        return handles
+
+    def remove_partial(self, model_identification: ModelIdentification):
         try:
-            details = pandas.read_csv(os.path.join(base_path, "details.csv"))
-            summary = pandas.read_json(os.path.join(base_path, "summary.json"), orient="index").transpose()
+            os.remove(PartialDetailsWriter.get_path(self._results_base_path, model_identification))
         except FileNotFoundError:
-            raise ValueError()
-        model_wrapper = ModelService.get(model_identification)
-        summary[WeightWatcherSummaryColumns.ACCURACY.value] = model_wrapper.top_1_accuracy
-        summary[WeightWatcherSummaryColumns.ARCHITECTURE.value] = model_identification.architecture.name
-        summary[WeightWatcherSummaryColumns.VARIANT.value] = model_identification.variant.name
-
-        details[WeightWatcherDetailsColumns.ACCURACY.value] = model_wrapper.top_1_accuracy
-        details[WeightWatcherDetailsColumns.ARCHITECTURE.value] = model_identification.architecture.name
-        details[WeightWatcherDetailsColumns.VARIANT.value] = model_identification.variant.name
-        return WeightWatcherResult(model_identification, model_wrapper.top_1_accuracy, summary, details)
-
-    def load_all(self) -> List[WeightWatcherResult]:
+            pass
+
+    def _load_partial_details(self, model_identification: ModelIdentification, details_path: str) -> DataFrame:
+        details = pandas.read_csv(details_path, dtype=WeightWatcherResultSchema.get_csv_dtypes())
+        details = self._add_identification_columns(details, model_identification)
+        return WeightWatcherResultSchema.apply_to_details(details)
+
+    def _get_cached_details(self, model_identification: ModelIdentification) -> DataFrame:
+        return self._details_cache.get(
+            str(model_identification),
+            functools.partial(self._load_details, model_identification)
+        )
+
+    def _load_summary(self, model_identification: ModelIdentification) -> DataFrame:
+        if self._storage_format is ResultStorageFormat.PARQUET:
+            summary = self._parquet_store.read_summaries(
+                [model_identification.architecture.name],
+                [model_identification.variant.name]
+            )
+            if len(summary) == 0:
+                raise ValueError()
+        else:
+            base_path = self._get_results_base_path(model_identification)
+            try:
+                summary = pandas.read_json(os.path.join(base_path, "summary.json"), orient="index").transpose()
+            except FileNotFoundError:
+                raise ValueError()
+        summary = self._add_identification_columns(summary, model_identification)
+        return WeightWatcherResultSchema.apply_to_summary(summary)
+
+    def _load_details(self, model_identification: ModelIdentification) -> DataFrame:
+        if self._storage_format is ResultStorageFormat.PARQUET:
+            details = self._parquet_store.read_details(
+                [model_identification.architecture.name],
+                [model_identification.variant.name]
+            )
+        else:
+            base_path = self._get_results_base_path(model_identification)
+            try:
+                details = pandas.read_csv(
+                    os.path.join(base_path, "details.csv"),
+                    dtype=WeightWatcherResultSchema.get_csv_dtypes()
+                )
+            except FileNotFoundError:
+                raise ValueError()
+        details = self._add_identification_columns(details, model_identification)
+        return WeightWatcherResultSchema.apply_to_details(details)
+
+    def _load_all_from_parquet(
+            self,
+            architecture_names: Optional[List[str]] = None,
+            variant_names: Optional[List[str]] = None,
+            layer_types: Optional[List[str]] = None
+    ) -> List[WeightWatcherResult]:
+        summaries = self._parquet_store.read_summaries(architecture_names, variant_names)
+        details = self._parquet_store.read_details(architecture_names, variant_names, layer_types)
+        details_per_model = dict(list(details.groupby(PARTITION_COLUMNS, sort=False)))
+
         results = []
-        for architecture_name in os.listdir(self._results_base_path):
-            architecture_path = os.path.join(self._results_base_path, architecture_name)
+        for (architecture_name, variant_name), summary in summaries.groupby(PARTITION_COLUMNS, sort=False):
+            model_identification = self._get_model_identification(architecture_name, variant_name)
+            if model_identification is None:
+                continue
+            summary = self._add_identification_columns(summary.reset_index(drop=True), model_identification)
+            model_details = details_per_model.get((architecture_name, variant_name), details.iloc[0:0])
+            model_details = self._add_identification_columns(model_details.reset_index(drop=True), model_identification)
+            summary = WeightWatcherResultSchema.apply_to_summary(summary)
+            model_details = WeightWatcherResultSchema.apply_to_details(model_details)
+            results.append(WeightWatcherResult(
+                model_identification,
+                summary[WeightWatcherSummaryColumns.ACCURACY.value].iloc[0],
+                summary,
+                model_details
+            ))
+        return results
+
+    def _list_csv_results(
+            self,
+            architecture_names: Optional[List[str]] = None,
+            variant_names: Optional[List[str]] = None
+    ) -> List[ModelIdentification]:
+        return self._list_result_directories(self._results_base_path, architecture_names, variant_names)
+
+    @staticmethod
+    def _list_result_directories(
+            base_path: str,
+            architecture_names: Optional[List[str]] = None,
+            variant_names: Optional[List[str]] = None
+    ) -> List[ModelIdentification]:
+        model_identifications = []
+        for architecture_name in os.listdir(base_path):
+            architecture_path = os.path.join(base_path, architecture_name)
             if not os.path.isdir(architecture_path):
                 continue
+            if architecture_names is not None and architecture_name not in architecture_names:
+                continue
 
             try:
-                architecture = ModelArchitecture[architecture_name]
-            except KeyError:
+                architecture = ModelService.get_architecture_by_name(architecture_name)
+            except ValueError:
                 continue
 
             for variant_name in os.listdir(architecture_path):
-                variant = ModelService.get_model_variant_by_name(architecture, variant_name)
-                model_identification = ModelIdentification(architecture, variant)
-                results.append(self.load(model_identification))
-        return results
+                if variant_names is not None and variant_name not in variant_names:
+                    continue
+                try:
+                    variant = ModelService.get_model_variant_by_name(architecture, variant_name)
+                except ValueError:
+                    logging.warning(f"Skipping the results in {os.path.join(architecture_path, variant_name)}, "
+                                    f"'{architecture_name}:{variant_name}' is not a registered model")
+                    continue
+                model_identifications.append(ModelIdentification(architecture, variant))
+        return model_identifications
+
+    @staticmethod
+    def _get_model_identification(architecture_name: str, variant_name: str) -> Optional[ModelIdentification]:
+        # Results of models that are not registered in this process (e.g. variants registered at runtime by another
+        # run) are skipped instead of failing the whole load
+        try:
+            architecture = ModelService.get_architecture_by_name(architecture_name)
+            return ModelIdentification(architecture, ModelService.get_model_variant_by_name(architecture, variant_name))
+        except ValueError:
+            logging.warning(f"Skipping the results of '{architecture_name}:{variant_name}', it is not a registered "
+                            f"model")
+            return None
+
+    @staticmethod
+    def _add_identification_columns(dataframe: DataFrame, model_identification: ModelIdentification) -> DataFrame:
+        # Summary and details share the names of these columns
+        dataframe[WeightWatcherDetailsColumns.ACCURACY.value] = \
+            ModelMetadataRegistry.get(model_identification).top_1_accuracy
+        # Created as categoricals right away, converting repeated strings afterwards is much slower
+        dataframe[WeightWatcherDetailsColumns.ARCHITECTURE.value] = WeightWatcherResultSchema.get_constant_categorical(
+            model_identification.architecture.name, len(dataframe)
+        )
+        dataframe[WeightWatcherDetailsColumns.VARIANT.value] = WeightWatcherResultSchema.get_constant_categorical(
+            model_identification.variant.name, len(dataframe)
+        )
+        return dataframe
+
+    @staticmethod
+    def _write_atomically(path: str, write: Callable[[IO], Any]):
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w", newline="") as temporary_file:
+                write(temporary_file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
 
     def _get_results_base_path(self, model_identification: ModelIdentification):
         base_path = os.path.join(
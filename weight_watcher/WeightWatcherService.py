@@ -1,32 +1,335 @@
 import logging
-from typing import List
+import multiprocessing
+import os.path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from enum import Enum, auto
+from typing import List, Iterator, Iterable, Optional, Dict, Any
 
 import pandas
-import weightwatcher as ww
+from pandas import DataFrame
 
-from .WeightWatcherResult import WeightWatcherResult
-from models import ModelWrapperBase
+from .AnalysisConfig import AnalysisConfig
+from .LayerAnalysisEngine import LayerAnalysisEngine, SpectrumPrecision, DETAILS_COLUMNS
+from .LayerWeights import LayerWeights, LayerWeightsExtractor
+from .MemoryUsage import MemoryUsage
+from .PartialDetailsWriter import PartialDetailsWriter
+from .SpectrumCache import SpectrumCache, DEFAULT_MAX_SIZE_BYTES
+from .WeightWatcherResult import WeightWatcherResult, WeightWatcherDetailsColumns
+from models import ModelWrapperBase, ModelIdentification, ModelService, ModelRegistry, ModelDefinition
+from services import Instrumentation, InstrumentationStage
+
+
+class WeightWatcherEngine(Enum):
+    WEIGHTWATCHER = auto()
+    LAYER_PARALLEL = auto()
+
+
+class WeightsSource(Enum):
+    KERAS_MODEL = auto()
+    WEIGHTS_FILE = auto()
 
 
 class WeightWatcherService:
-    def __init__(self, log_level=logging.WARNING):
+    def __init__(self, log_level=logging.WARNING, engine: WeightWatcherEngine = WeightWatcherEngine.WEIGHTWATCHER,
+                 engine_threads: Optional[int] = None, spectrum_cache_path: Optional[str] = None,
+                 spectrum_cache_size: int = DEFAULT_MAX_SIZE_BYTES, partial_results_path: Optional[str] = None,
+                 weights_source: WeightsSource = WeightsSource.KERAS_MODEL, approximate_min_rank: Optional[int] = None,
+                 precision: SpectrumPrecision = SpectrumPrecision.FLOAT64):
+        if spectrum_cache_path is not None and engine is not WeightWatcherEngine.LAYER_PARALLEL:
+            raise ValueError(f"The spectrum cache requires the '{WeightWatcherEngine.LAYER_PARALLEL.name}' engine")
+        if partial_results_path is not None and engine is not WeightWatcherEngine.LAYER_PARALLEL:
+            raise ValueError(f"Streaming the details requires the '{WeightWatcherEngine.LAYER_PARALLEL.name}' engine")
+        if weights_source is WeightsSource.WEIGHTS_FILE and engine is not WeightWatcherEngine.LAYER_PARALLEL:
+            raise ValueError(f"Reading weights files requires the '{WeightWatcherEngine.LAYER_PARALLEL.name}' engine")
+        if approximate_min_rank is not None and engine is not WeightWatcherEngine.LAYER_PARALLEL:
+            raise ValueError(f"The approximation requires the '{WeightWatcherEngine.LAYER_PARALLEL.name}' engine")
+        if precision is not SpectrumPrecision.FLOAT64 and engine is not WeightWatcherEngine.LAYER_PARALLEL:
+            raise ValueError(
+                f"The {precision.value} mode requires the '{WeightWatcherEngine.LAYER_PARALLEL.name}' engine"
+            )
         self._log_level = log_level
+        self._engine = engine
+        self._engine_threads = engine_threads
+        self._spectrum_cache_path = spectrum_cache_path
+        self._spectrum_cache_size = spectrum_cache_size
+        self._partial_results_path = partial_results_path
+        self._weights_source = weights_source
+        self._approximate_min_rank = approximate_min_rank
+        self._precision = precision
+        # weightwatcher pulls in TensorFlow and PyTorch, so it is only imported when an analysis service is created
+        import weightwatcher as ww
         self._weight_watcher = ww.WeightWatcher(log_level=log_level)
+        self._layer_analysis_engine = LayerAnalysisEngine(
+            max_workers=engine_threads,
+            approximate_min_rank=approximate_min_rank,
+            precision=precision
+        )
+
+    @property
+    def engine(self) -> WeightWatcherEngine:
+        return self._engine
+
+    def get_options(self) -> Dict[str, Any]:
+        # The configuration as JSON, from which from_options creates an equal service, e.g. on another node
+        return {
+            "log_level": self._log_level,
+            "engine": self._engine.name,
+            "engine_threads": self._engine_threads,
+            "spectrum_cache_path": self._spectrum_cache_path,
+            "spectrum_cache_size": self._spectrum_cache_size,
+            "partial_results_path": self._partial_results_path,
+            "weights_source": self._weights_source.name,
+            "approximate_min_rank": self._approximate_min_rank,
+            "precision": self._precision.name,
+        }
+
+    def get_result_options(self) -> Dict[str, Any]:
+        # The part of the options that changes the results, unlike e.g. the number of threads or the cache paths.
+        # Results computed with other result options are outdated.
+        return {
+            "engine": self._engine.name,
+            "weights_source": self._weights_source.name,
+            **self._layer_analysis_engine.get_result_options(),
+        }
+
+    def get_config_result_options(self, config: AnalysisConfig) -> Dict[str, Any]:
+        # Same as get_result_options, with the engine settings of the config instead of the service's
+        return {
+            "engine": self._engine.name,
+            "weights_source": self._weights_source.name,
+            **config.create_engine().get_result_options(),
+            "randomize": config.randomize,
+        }
+
+    @staticmethod
+    def from_options(options: Dict[str, Any]) -> "WeightWatcherService":
+        return WeightWatcherService(**{
+            **options,
+            "engine": WeightWatcherEngine[options["engine"]],
+            "weights_source": WeightsSource[options["weights_source"]],
+            "precision": SpectrumPrecision[options["precision"]],
+        })
+
+    @property
+    def weightwatcher_version(self) -> str:
+        import weightwatcher as ww
+        return ww.__version__
 
     def analyze_model(self, model_wrapper: ModelWrapperBase) -> WeightWatcherResult:
         logging.log(logging.INFO, f"Analyzing {model_wrapper.identification}")
-        result = self._get_details_and_summary(model_wrapper)
+        model_name = str(model_wrapper.identification)
+        analysis_timer = Instrumentation.timer(
+            InstrumentationStage.ANALYSIS,
+            model=model_name,
+            engine=self._engine.name
+        )
+        with analysis_timer as event, Instrumentation.profile(model_name):
+            result = self._get_details_and_summary(model_wrapper)
+            event["layers"] = len(result.details)
+        self._record_layer_timings(model_name, result.details)
         logging.log(logging.INFO, f"Summary {model_wrapper.identification}: {result.summary}")
         return result
 
-    def analyze_models(self, model_wrappers: List[ModelWrapperBase]) -> List[WeightWatcherResult]:
-        results = []
-        for model_wrapper in model_wrappers:
-            results.append(self.analyze_model(model_wrapper))
+    def analyze_model_leased(self, model_wrapper: ModelWrapperBase) -> WeightWatcherResult:
+        # The model only lives for the duration of the analysis, so memory stays flat across a sweep
+        with model_wrapper.lease():
+            result = self.analyze_model(model_wrapper)
+        logging.log(logging.INFO, f"Released {model_wrapper.identification}: {MemoryUsage.format_report()}")
+        return result
+
+    def analyze_model_configs(self, model_wrapper: ModelWrapperBase,
+                              configs: List[AnalysisConfig]) -> Dict[str, WeightWatcherResult]:
+        # Compares engine settings on one model: the layers are extracted once, shared read-only by all configs and
+        # the configs are analyzed in parallel. The result of each config is returned under its name.
+        if self._engine is not WeightWatcherEngine.LAYER_PARALLEL:
+            raise ValueError(f"Analyzing configs requires the '{WeightWatcherEngine.LAYER_PARALLEL.name}' engine")
+        AnalysisConfig.verify_unique_names(configs)
+        config_names = [config.name for config in configs]
+
+        logging.log(logging.INFO, f"Analyzing {model_wrapper.identification} with the configs {config_names}")
+        model_name = str(model_wrapper.identification)
+        analysis_timer = Instrumentation.timer(
+            InstrumentationStage.ANALYSIS,
+            model=model_name,
+            engine=self._engine.name,
+            configs=len(configs)
+        )
+        with analysis_timer as event, Instrumentation.profile(model_name):
+            with model_wrapper.lease():
+                layers = list(self._get_layers(model_wrapper))
+            logging.log(logging.INFO, f"Extracted {len(layers)} layers of {model_wrapper.identification}: "
+                                      f"{MemoryUsage.format_report()}")
+            config_details = self.analyze_layers_with_configs(
+                layers,
+                configs,
+                self._get_spectrum_cache(model_wrapper.identification),
+                self._engine_threads
+            )
+            event["layers"] = len(layers)
+
+        results = {}
+        for config, details in zip(configs, config_details):
+            self._record_layer_timings(f"{model_name}[{config.name}]", details)
+            summary = pandas.DataFrame([self._weight_watcher.get_summary(details)])
+            results[config.name] = WeightWatcherResult(
+                model_wrapper.identification,
+                model_wrapper.top_1_accuracy,
+                summary,
+                details
+            )
         return results
 
+    @staticmethod
+    def analyze_layers_with_configs(layers: List[LayerWeights], configs: List[AnalysisConfig],
+                                    spectrum_cache: Optional[SpectrumCache] = None,
+                                    engine_threads: Optional[int] = None) -> List[DataFrame]:
+        # The details of every config, in the order of the configs. The configs run in parallel on read-only views of
+        # the same kernels and split the engine threads (default: one per CPU) between them, so running them side by
+        # side never uses more threads than a single analysis.
+        layers = [WeightWatcherService._get_read_only_layer(layer) for layer in layers]
+        config_threads = max(1, (engine_threads or os.cpu_count() or 1) // len(configs))
+        with ThreadPoolExecutor(len(configs), thread_name_prefix="config-analysis") as executor:
+            return list(executor.map(
+                lambda config: config.create_engine(config_threads).analyze_layers(
+                    config.get_layers(layers),
+                    spectrum_cache
+                ),
+                configs
+            ))
+
+    def analyze_models(self, model_wrappers: List[ModelWrapperBase], processes: int = 1) -> List[WeightWatcherResult]:
+        return list(self.iterate_analyses(model_wrappers, processes))
+
+    def iterate_analyses(self, model_wrappers: List[ModelWrapperBase], processes: int = 1) -> Iterator[WeightWatcherResult]:
+        # Results are yielded as soon as each analysis finishes; a failing model is logged and skipped.
+        # Workers only receive the model identification and build their own Keras model.
+        if processes <= 1:
+            for model_wrapper in model_wrappers:
+                try:
+                    result = self.analyze_model_leased(model_wrapper)
+                except Exception:
+                    logging.exception(f"Analysis of {model_wrapper.identification} failed")
+                    continue
+                yield result
+            return
+
+        # TensorFlow does not survive a fork once it has been initialized, hence the spawn context
+        with ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker,
+                initargs=(self._log_level, self._engine, self._engine_threads, self._spectrum_cache_path,
+                          self._spectrum_cache_size, self._partial_results_path, self._weights_source,
+                          self._approximate_min_rank, self._precision, ModelRegistry.get_runtime_definitions())
+        ) as executor:
+            futures = {
+                executor.submit(_analyze_in_worker, model_wrapper.identification): model_wrapper.identification
+                for model_wrapper in model_wrappers
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception:
+                    logging.exception(f"Analysis of {futures[future]} failed")
+
     def _get_details_and_summary(self, model_wrapper: ModelWrapperBase) -> WeightWatcherResult:
-        details = self._weight_watcher.analyze(model=model_wrapper.model)
-        summary = pandas.DataFrame(self._weight_watcher.get_summary(details))
+        if self._partial_results_path is not None:
+            details = self._stream_details(model_wrapper)
+        elif self._engine is WeightWatcherEngine.LAYER_PARALLEL:
+            details = self._layer_analysis_engine.analyze_layers(
+                self._get_layers(model_wrapper),
+                self._get_spectrum_cache(model_wrapper.identification)
+            )
+        else:
+            details = self._weight_watcher.analyze(model=self._build_model(model_wrapper))
+        summary = pandas.DataFrame([self._weight_watcher.get_summary(details)])
         return WeightWatcherResult(model_wrapper.identification, model_wrapper.top_1_accuracy, summary, details)
 
+    def _stream_details(self, model_wrapper: ModelWrapperBase) -> DataFrame:
+        # Every layer is written to the partial results as soon as it is analyzed; the full details are read back
+        # once the model is done. The partial file is removed by the result service after the result is saved.
+        path = PartialDetailsWriter.get_path(self._partial_results_path, model_wrapper.identification)
+        with PartialDetailsWriter(path, DETAILS_COLUMNS) as details_writer:
+            for row in self._layer_analysis_engine.iterate_layer_details(
+                    self._get_layers(model_wrapper),
+                    self._get_spectrum_cache(model_wrapper.identification)
+            ):
+                details_writer.append(row)
+        return details_writer.read()
+
+    def _get_layers(self, model_wrapper: ModelWrapperBase) -> Iterable[LayerWeights]:
+        model_name = str(model_wrapper.identification)
+        if self._weights_source is WeightsSource.WEIGHTS_FILE:
+            if LayerWeightsExtractor.is_weights_file(model_wrapper.weights_path):
+                return Instrumentation.iterate(
+                    InstrumentationStage.WEIGHT_EXTRACTION,
+                    LayerWeightsExtractor.from_weights_file(model_wrapper.weights_path),
+                    model=model_name,
+                    source=WeightsSource.WEIGHTS_FILE.name
+                )
+            # Keras downloads the weights file when the model is built for the first time
+            logging.log(logging.INFO, f"No weights file at '{model_wrapper.weights_path}', "
+                                      f"building the Keras model of {model_wrapper.identification} instead")
+        return Instrumentation.iterate(
+            InstrumentationStage.WEIGHT_EXTRACTION,
+            LayerWeightsExtractor.from_keras_model(self._build_model(model_wrapper)),
+            model=model_name,
+            source=WeightsSource.KERAS_MODEL.name
+        )
+
+    @staticmethod
+    def _get_read_only_layer(layer: LayerWeights) -> LayerWeights:
+        # A read-only view of the kernel, so the configs that run in parallel can share it without copies
+        kernel = layer.kernel.view()
+        kernel.flags.writeable = False
+        return LayerWeights(layer.layer_id, layer.name, layer.layer_type, kernel)
+
+    @staticmethod
+    def _build_model(model_wrapper: ModelWrapperBase):
+        # Only the first access builds the model, a model that is already built is recorded with (almost) no time
+        with Instrumentation.timer(InstrumentationStage.MODEL_BUILD, model=str(model_wrapper.identification)):
+            return model_wrapper.model
+
+    @staticmethod
+    def _record_layer_timings(model_name: str, details: DataFrame):
+        # Summed over the layers, so with engine threads these exceed the wall time of the analysis.
+        # weightwatcher itself does not report per-layer timings, so with its engine only the analysis stage of the
+        # whole model is recorded.
+        for stage, column in [
+            (InstrumentationStage.ESD, WeightWatcherDetailsColumns.ESD_SECONDS.value),
+            (InstrumentationStage.POWER_LAW_FIT, WeightWatcherDetailsColumns.FIT_SECONDS.value),
+        ]:
+            if column in details.columns:
+                Instrumentation.record(stage, float(details[column].sum()), model=model_name, layers=len(details))
+
+    def _get_spectrum_cache(self, model_identification: ModelIdentification) -> Optional[SpectrumCache]:
+        if self._spectrum_cache_path is None:
+            return None
+        cache_path = os.path.join(
+            self._spectrum_cache_path,
+            model_identification.architecture.name,
+            model_identification.variant.name,
+            "esd"
+        )
+        return SpectrumCache(cache_path, self._spectrum_cache_size, self._spectrum_cache_path)
+
+
+_worker_service: Optional[WeightWatcherService] = None
+
+
+def _initialize_worker(log_level, engine: WeightWatcherEngine, engine_threads: Optional[int],
+                       spectrum_cache_path: Optional[str], spectrum_cache_size: int,
+                       partial_results_path: Optional[str], weights_source: WeightsSource,
+                       approximate_min_rank: Optional[int], precision: SpectrumPrecision,
+                       runtime_model_definitions: List[ModelDefinition]):
+    global _worker_service
+    logging.basicConfig(level=log_level)
+    # Models registered at runtime in the parent process are unknown to the spawned worker otherwise
+    for model_definition in runtime_model_definitions:
+        ModelRegistry.register(model_definition, replace=True)
+    _worker_service = WeightWatcherService(log_level, engine, engine_threads, spectrum_cache_path, spectrum_cache_size,
+                                           partial_results_path, weights_source, approximate_min_rank, precision)
+
+
+def _analyze_in_worker(model_identification: ModelIdentification) -> WeightWatcherResult:
+    return _worker_service.analyze_model_leased(ModelService.get(model_identification))
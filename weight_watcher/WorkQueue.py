@@ -0,0 +1,262 @@
+import contextlib
+import json
+import logging
+import os.path
+import re
+import socket
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional, Any, Iterator
+
+from models import ModelIdentification, ModelArchitecture, ModelVariant
+
+PENDING_DIRECTORY = "pending"
+CLAIMED_DIRECTORY = "claimed"
+LEASES_DIRECTORY = "leases"
+DONE_DIRECTORY = "done"
+FAILED_DIRECTORY = "failed"
+QUEUE_DIRECTORIES = [PENDING_DIRECTORY, CLAIMED_DIRECTORY, LEASES_DIRECTORY, DONE_DIRECTORY, FAILED_DIRECTORY]
+
+ITEM_FILE_EXTENSION = ".json"
+LEASE_FILE_EXTENSION = ".lease"
+# Separates the item from the worker in the names of claimed items and leases, e.g. "ConvNeXt_Base@node1-4242.json"
+WORKER_SEPARATOR = "@"
+
+DEFAULT_LEASE_SECONDS = 300.0
+# Items whose lease expired this often (e.g. because the model crashes every worker) are moved to the failed items
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+@dataclass
+class WorkItem:
+    architecture: str
+    variant: str
+    # Arguments of the WeightWatcherService that analyzes the model, see WeightWatcherService.get_options
+    options: Dict[str, Any]
+    # The model's registry entry, so workers also know models that were registered at runtime by the coordinator
+    model_definition: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def model_identification(self) -> ModelIdentification:
+        return ModelIdentification(ModelArchitecture(self.architecture), ModelVariant(self.variant))
+
+    @property
+    def item_id(self) -> str:
+        # Only characters that are safe in file names on every shared filesystem
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{self.architecture}_{self.variant}")
+
+
+@dataclass
+class ClaimedWorkItem:
+    item: WorkItem
+    worker_id: str
+    claimed_path: str
+    lease_path: str
+    # Set by the heartbeat once the lease was found expired and the item re-queued
+    lease_lost: threading.Event = field(default_factory=threading.Event)
+
+
+class WorkQueue:
+    # A work queue in a directory on shared storage, so workers on any number of nodes can take part without a broker:
+    #   pending/<item>.json              waiting to be claimed
+    #   claimed/<item>@<worker>.json     being analyzed by the worker
+    #   leases/<item>@<worker>.lease     touched by the worker's heartbeat, its mtime is the last sign of life
+    #   done/<item>.json, failed/<item>.json
+    # Items move between the directories by rename, which is atomic on POSIX filesystems and NFS, so exactly one worker
+    # wins a claim. Leases are compared against the local clock, so they have to be much longer than the clock skew
+    # between the nodes.
+    def __init__(self, queue_path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self._queue_path = queue_path
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        for directory in QUEUE_DIRECTORIES:
+            os.makedirs(os.path.join(queue_path, directory), exist_ok=True)
+
+    @property
+    def queue_path(self) -> str:
+        return self._queue_path
+
+    @property
+    def lease_seconds(self) -> float:
+        return self._lease_seconds
+
+    @staticmethod
+    def get_default_worker_id() -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{socket.gethostname()}-{os.getpid()}")
+
+    def put(self, item: WorkItem) -> bool:
+        # Returns False if the item is already waiting or being analyzed. A previous outcome of the item is dropped.
+        if os.path.exists(self._get_item_path(PENDING_DIRECTORY, item.item_id)) or self._get_claims(item.item_id):
+            return False
+        for directory in [DONE_DIRECTORY, FAILED_DIRECTORY]:
+            self._remove(self._get_item_path(directory, item.item_id))
+        self._write_item(self._get_item_path(PENDING_DIRECTORY, item.item_id), item)
+        return True
+
+    def claim(self, worker_id: str) -> Optional[ClaimedWorkItem]:
+        for item_id in self._list_item_ids(PENDING_DIRECTORY):
+            claim_name = f"{item_id}{WORKER_SEPARATOR}{worker_id}"
+            claimed_path = os.path.join(self._queue_path, CLAIMED_DIRECTORY, claim_name + ITEM_FILE_EXTENSION)
+            lease_path = os.path.join(self._queue_path, LEASES_DIRECTORY, claim_name + LEASE_FILE_EXTENSION)
+            # The lease exists before the claim, so a claimed item never looks abandoned
+            with open(lease_path, "w") as lease_file:
+                lease_file.write(worker_id)
+            try:
+                os.rename(self._get_item_path(PENDING_DIRECTORY, item_id), claimed_path)
+            except FileNotFoundError:
+                # Another worker was faster
+                self._remove(lease_path)
+                continue
+            try:
+                item = self._read_item(claimed_path)
+            except (OSError, ValueError):
+                logging.exception(f"Work item '{item_id}' is unreadable")
+                self._remove(claimed_path)
+                self._remove(lease_path)
+                continue
+            return ClaimedWorkItem(item, worker_id, claimed_path, lease_path)
+        return None
+
+    @contextlib.contextmanager
+    def keep_alive(self, claimed_item: ClaimedWorkItem) -> Iterator[ClaimedWorkItem]:
+        # Touches the lease in the background while the item is worked on
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(self._lease_seconds / 3):
+                try:
+                    os.utime(claimed_item.lease_path)
+                except FileNotFoundError:
+                    logging.warning(f"The lease of {claimed_item.item.model_identification} expired, "
+                                    f"it was re-queued")
+                    claimed_item.lease_lost.set()
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, name=f"lease-{claimed_item.item.item_id}", daemon=True)
+        heartbeat_thread.start()
+        try:
+            yield claimed_item
+        finally:
+            stopped.set()
+            heartbeat_thread.join()
+
+    def complete(self, claimed_item: ClaimedWorkItem) -> bool:
+        # Returns False if the lease was lost in the meantime; the item is then analyzed again by another worker
+        try:
+            os.rename(claimed_item.claimed_path, self._get_item_path(DONE_DIRECTORY, claimed_item.item.item_id))
+        except FileNotFoundError:
+            return False
+        finally:
+            self._remove(claimed_item.lease_path)
+        return True
+
+    def fail(self, claimed_item: ClaimedWorkItem, error: str):
+        claimed_item.item.error = error
+        self._write_item(self._get_item_path(FAILED_DIRECTORY, claimed_item.item.item_id), claimed_item.item)
+        self._remove(claimed_item.claimed_path)
+        self._remove(claimed_item.lease_path)
+
+    def requeue_expired(self) -> int:
+        # Any process may call this; the rename out of claimed/ decides which one re-queues an item
+        requeued_items = 0
+        now = time.time()
+        for claim_name in self._list_item_ids(CLAIMED_DIRECTORY):
+            lease_path = os.path.join(self._queue_path, LEASES_DIRECTORY, claim_name + LEASE_FILE_EXTENSION)
+            try:
+                lease_age = now - os.stat(lease_path).st_mtime
+            except FileNotFoundError:
+                lease_age = float("inf")
+            if lease_age <= self._lease_seconds:
+                continue
+
+            item_id = claim_name.rpartition(WORKER_SEPARATOR)[0]
+            # Hidden files are skipped when listing, so the item is invisible while it is rewritten
+            requeue_path = os.path.join(self._queue_path, PENDING_DIRECTORY, f".{claim_name}.requeue")
+            try:
+                os.rename(os.path.join(self._queue_path, CLAIMED_DIRECTORY, claim_name + ITEM_FILE_EXTENSION),
+                          requeue_path)
+            except FileNotFoundError:
+                continue
+            self._remove(lease_path)
+            item = self._read_item(requeue_path)
+            item.attempts += 1
+            if item.attempts >= self._max_attempts:
+                item.error = f"The lease expired {item.attempts} times"
+                self._write_item(self._get_item_path(FAILED_DIRECTORY, item_id), item)
+                logging.warning(f"Giving up on {item.model_identification}: {item.error}")
+            else:
+                self._write_item(self._get_item_path(PENDING_DIRECTORY, item_id), item)
+                logging.log(logging.INFO, f"Re-queued {item.model_identification}, the lease of "
+                                          f"{claim_name.rpartition(WORKER_SEPARATOR)[2]} expired")
+                requeued_items += 1
+            self._remove(requeue_path)
+        return requeued_items
+
+    def get_counts(self) -> Dict[str, int]:
+        return {
+            directory: len(self._list_item_ids(directory))
+            for directory in [PENDING_DIRECTORY, CLAIMED_DIRECTORY, DONE_DIRECTORY, FAILED_DIRECTORY]
+        }
+
+    def is_drained(self) -> bool:
+        return not self._list_item_ids(PENDING_DIRECTORY) and not self._list_item_ids(CLAIMED_DIRECTORY)
+
+    def get_done(self) -> List[WorkItem]:
+        return self._read_items(DONE_DIRECTORY)
+
+    def get_failed(self) -> List[WorkItem]:
+        return self._read_items(FAILED_DIRECTORY)
+
+    def acknowledge(self, item: WorkItem):
+        # Removes the record of a done item once the coordinator has processed it
+        self._remove(self._get_item_path(DONE_DIRECTORY, item.item_id))
+
+    def _get_claims(self, item_id: str) -> List[str]:
+        return [
+            claim_name for claim_name in self._list_item_ids(CLAIMED_DIRECTORY)
+            if claim_name.rpartition(WORKER_SEPARATOR)[0] == item_id
+        ]
+
+    def _read_items(self, directory: str) -> List[WorkItem]:
+        items = []
+        for item_id in self._list_item_ids(directory):
+            try:
+                items.append(self._read_item(self._get_item_path(directory, item_id)))
+            except FileNotFoundError:
+                continue
+        return items
+
+    def _list_item_ids(self, directory: str) -> List[str]:
+        return sorted(
+            entry.name[:-len(ITEM_FILE_EXTENSION)]
+            for entry in os.scandir(os.path.join(self._queue_path, directory))
+            if entry.name.endswith(ITEM_FILE_EXTENSION) and not entry.name.startswith(".")
+        )
+
+    def _get_item_path(self, directory: str, item_id: str) -> str:
+        return os.path.join(self._queue_path, directory, item_id + ITEM_FILE_EXTENSION)
+
+    @staticmethod
+    def _read_item(path: str) -> WorkItem:
+        with open(path) as item_file:
+            return WorkItem(**json.load(item_file))
+
+    @staticmethod
+    def _write_item(path: str, item: WorkItem):
+        # Written to a hidden file first, so no worker reads a partially written item
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+        with os.fdopen(file_descriptor, "w") as item_file:
+            json.dump(asdict(item), item_file, indent=4)
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
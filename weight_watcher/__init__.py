@@ -1,3 +1,21 @@
-from .WeightWatcherService import WeightWatcherService
-from .WeightWatcherResult import WeightWatcherResult, WeightWatcherDetailsColumns, WeightWatcherSummaryColumns
-from .WeightWatcherResultService import WeightWatcherResultService
+from .WeightWatcherService import WeightWatcherService, WeightWatcherEngine, WeightsSource
+from .LayerAnalysisEngine import LayerAnalysisEngine, SpectrumPrecision
+from .AnalysisConfig import AnalysisConfig
+from .PowerLawFitter import PowerLawFitter, PowerLawFit
+from .LayerWeights import LayerWeights, LayerWeightsExtractor, LayerType
+from .SpectrumCache import SpectrumCache
+from .WeightWatcherResult import WeightWatcherResult, WeightWatcherResultHandle, WeightWatcherDetailsColumns, \
+    WeightWatcherSummaryColumns, CheckpointResult, CheckpointColumns
+from .WeightWatcherResultSchema import WeightWatcherResultSchema
+from .WeightWatcherResultService import WeightWatcherResultService, ResultStorageFormat
+from .ParquetResultStore import ParquetResultStore
+from .DetailsCache import DetailsCache
+from .ResultIndex import ResultIndex, ResultIndexEntry, MetricStatistics, IndexMetricBins
+from .WeightWatcherResultManifest import WeightWatcherResultManifest, WeightWatcherResultManifestEntry
+from .AnalysisRunner import AnalysisRunner
+from .ConfigAnalysisRunner import ConfigAnalysisRunner
+from .WorkQueue import WorkQueue, WorkItem
+from .QueueWorker import QueueWorker
+from .CheckpointAnalysisService import CheckpointAnalysisService
+from .CheckpointResultService import CheckpointResultService
+from .MemoryUsage import MemoryUsage